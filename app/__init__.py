@@ -1,27 +1,52 @@
 """Application factory for the reservations API."""
 
 from flask import Flask
-from .extensions import db, ma, migrate
+from .extensions import (
+    async_db, capacity_rules, db, group_commit, idempotency, metrics, replicas, response_cache,
+)
 from .routes.restaurants import restaurants_bp
 from .routes.reservations import reservations_bp
-from config import DevConfig
+from .routes.capacity_rules import capacity_rules_bp
+from .routes.reports import reports_bp
+from config import get_config
+from .database import configure_engines
+from .commands import db_cli, holds_cli, idempotency_cli, replica_cli, reservations_cli, restaurants_cli
 from .error_handlers import register_error_handlers
 from flask_cors import CORS
 
 
-def create_app():
+def create_app(config=None):
+    """Build the application, applying ``config`` overrides before extensions bind."""
+
     app = Flask(__name__)
     CORS(app)
-    app.config.from_object(DevConfig)
+    app.config.from_object(get_config())
+    if config:
+        app.config.update(config)
 
     db.init_app(app)
-    ma.init_app(app)
-    migrate.init_app(app, db)
+    configure_engines(app, db)
+    response_cache.init_app(app)
+    async_db.init_app(app)
+    capacity_rules.init_app(app)
+    idempotency.init_app(app)
+    group_commit.init_app(app)
+    replicas.init_app(app)
+    metrics.init_app(app)
 
     app.register_blueprint(restaurants_bp)
     app.register_blueprint(reservations_bp)
+    app.register_blueprint(capacity_rules_bp)
+    app.register_blueprint(reports_bp)
 
     register_error_handlers(app)
+    # Flask-Migrate solo se carga al usar 'flask db' (ver app/commands.py)
+    app.cli.add_command(db_cli)
+    app.cli.add_command(holds_cli)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(reservations_cli)
+    app.cli.add_command(restaurants_cli)
+    app.cli.add_command(replica_cli)
 
     @app.route('/')
     def hello():
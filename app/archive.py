@@ -0,0 +1,71 @@
+"""Moving old reservations out of the live ``reservations`` table.
+
+``flask reservations archive`` moves reservations dated before a horizon
+(``ARCHIVE_AFTER_DAYS`` days ago by default) into ``reservations_archive``,
+one batch per transaction, so the list and count queries of the API only
+walk the current bookings. The capacity counters of archived dates are left
+as they are: the slots stay taken.
+
+On Postgres ``reservations_archive`` is partitioned by year on ``date``;
+the partition for each archived year is created on demand.
+"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import delete, func, insert, select, text
+
+from .extensions import db
+from .models import ArchivedReservation, Reservation
+
+ARCHIVE_BATCH = 1000
+
+
+def archive_horizon(days):
+    """First date kept in ``reservations`` when archiving everything older than ``days``."""
+
+    return date.today() - timedelta(days=days)
+
+
+def _ensure_partitions(years):
+    """Create the yearly partitions of ``reservations_archive`` for ``years`` (Postgres only)."""
+
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    table = ArchivedReservation.__tablename__
+    for year in sorted(years):
+        db.session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {table}_{year} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        ))
+
+
+def archive_reservations(before, batch_size=ARCHIVE_BATCH):
+    """Move up to ``batch_size`` reservations dated before ``before``; returns how many.
+
+    One ``DELETE ... RETURNING`` takes the oldest rows out of ``reservations``
+    and a batched insert copies them to the archive. The caller commits.
+    """
+
+    # La reserva más reciente nunca se archiva: SQLite reutilizaría su id
+    newest = select(func.max(Reservation.id)).scalar_subquery()
+    oldest = (
+        select(Reservation.id)
+        .where(Reservation.date < before, Reservation.id < newest)
+        .order_by(Reservation.id)
+        .limit(batch_size)
+    )
+    rows = db.session.execute(
+        delete(Reservation)
+        .where(Reservation.id.in_(oldest))
+        .returning(
+            Reservation.id, Reservation.restaurant_id, Reservation.date,
+            Reservation.table_number, Reservation.created_at,
+        )
+    ).all()
+    if rows:
+        _ensure_partitions({row.date.year for row in rows})
+        db.session.execute(
+            insert(ArchivedReservation).values(archived_at=func.now()),
+            [row._asdict() for row in rows],
+        )
+    return len(rows)
@@ -0,0 +1,93 @@
+"""ASGI serving mode: async views on the event loop, everything else over WSGI.
+
+Requires the packages in ``requirements-async.txt`` (asgiref, aiosqlite and
+an ASGI server such as uvicorn; asyncpg for PostgreSQL).
+"""
+
+import io
+
+from flask import request
+from werkzeug.exceptions import HTTPException
+
+from .extensions import async_db
+
+
+class AsyncApp:
+    """ASGI application wrapping a Flask app built by ``create_app``.
+
+    GET requests whose view has an async variant (see ``variant_of``) run on
+    the event loop and read through ``AsyncSession``, so a slow query does
+    not hold a worker thread. Any other request is handed to asgiref's
+    ``WsgiToAsgi`` and served by the regular sync view, which keeps the
+    blueprints, hooks and error handlers identical in both modes.
+    """
+
+    def __init__(self, app):
+        from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+        self.app = app
+        self.wsgi = WsgiToAsgi(app)
+        self._instance = WsgiToAsgiInstance
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            environ = self._environ(scope)
+            view = self._async_view(environ)
+            if view is not None:
+                return await self._serve(view, environ, send)
+        await self.wsgi(scope, receive, send)
+
+    def _environ(self, scope):
+        instance = self._instance(self.app)
+        instance.scope = scope
+        return instance.build_environ(scope, io.BytesIO())
+
+    def _async_view(self, environ):
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None
+        return getattr(self.app.view_functions.get(endpoint), 'async_variant', None)
+
+    async def _serve(self, view, environ, send):
+        app = self.app
+        with app.request_context(environ):
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    rv = await view(**request.view_args)
+            except Exception as error:
+                rv = app.handle_user_exception(error)
+            response = app.finalize_request(rv)
+
+            await send({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': [
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in response.headers.items()
+                ],
+            })
+            try:
+                if hasattr(response.response, '__aiter__'):
+                    async for chunk in response.response:
+                        await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+                    await send({'type': 'http.response.body'})
+                else:
+                    await send({'type': 'http.response.body', 'body': response.get_data()})
+            finally:
+                # Como en WSGI: las métricas de un stream se registran al cerrarlo
+                response.close()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                with self.app.app_context():
+                    await async_db.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -0,0 +1,80 @@
+"""Async engine and sessions for the ASGI serving mode (see ``app/asgi.py``)."""
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from .database import _pragma_listener
+from .replicas import REPLICA_BIND, reading_replica
+
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg'}
+
+
+def async_url(url):
+    """Swap the driver of a sync database URL for its async counterpart."""
+
+    backend = url.get_backend_name()
+    try:
+        return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    except KeyError:
+        raise RuntimeError(f"No async driver for {backend}")
+
+
+def variant_of(view):
+    """Register the decorated coroutine as ``view``'s implementation in the ASGI mode.
+
+    The sync view keeps serving the endpoint under WSGI; ``AsyncApp`` looks
+    the variant up through the view function, so both share one URL rule.
+    """
+
+    def decorator(coroutine):
+        view.async_variant = coroutine
+        return coroutine
+    return decorator
+
+
+class AsyncDatabase:
+    """``AsyncEngine`` on the same databases as ``db``, built on first use.
+
+    The engines are created lazily so their pools bind to the event loop of
+    the ASGI server; apps served over WSGI never build them nor import the
+    async drivers. Like ``RoutingSession`` in the sync mode, sessions opened
+    inside a view decorated with :meth:`app.replicas.Replicas.reads` use the
+    ``replica`` bind, unless the client is pinned to the primary.
+    """
+
+    def init_app(self, app):
+        app.extensions['async_db'] = {'engines': {}}
+
+    def _engine(self, bind=None):
+        from .extensions import db
+
+        engines = current_app.extensions['async_db']['engines']
+        if bind not in engines:
+            engine = create_async_engine(
+                async_url(db.engines[bind].url),
+                **current_app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+            )
+            pragmas = current_app.config.get('SQLITE_PRAGMAS')
+            if pragmas and engine.dialect.name == 'sqlite':
+                event.listen(engine.sync_engine, 'connect', _pragma_listener(pragmas))
+            engines[bind] = engine
+        return engines[bind]
+
+    @property
+    def engine(self):
+        """The ``AsyncEngine`` of the primary database."""
+
+        return self._engine()
+
+    def session(self):
+        """A new ``AsyncSession``; use it as ``async with async_db.session() as session``."""
+
+        bind = REPLICA_BIND if reading_replica() else None
+        return AsyncSession(self._engine(bind), expire_on_commit=False)
+
+    async def dispose(self):
+        engines = current_app.extensions['async_db']['engines']
+        while engines:
+            _, engine = engines.popitem()
+            await engine.dispose()
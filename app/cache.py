@@ -0,0 +1,169 @@
+"""Response cache for read-mostly endpoints with write-driven invalidation.
+
+Entries are keyed by endpoint namespace, a per-namespace *generation* and the
+normalized query string. Writes call :meth:`ResponseCache.invalidate`, which
+bumps the generation so every older entry becomes unreachable and ages out
+through the TTL/LRU policy. The storage backend is pluggable: the in-process
+:class:`MemoryBackend` (default) or :class:`RedisBackend`, which lets every
+worker share the same entries and generations.
+
+With a read replica, the replica may not have the write yet when the
+generation is bumped, so for ``REPLICA_STICKY_SECONDS`` after an
+invalidation responses read from the replica are served but not stored.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, make_response, request
+
+from .replicas import REPLICA_BIND, STICKY_SECONDS, reading_replica
+
+
+class MemoryBackend:
+    """Thread-safe in-process TTL + LRU store."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisBackend:
+    """Store shared by every worker, on Redis or anything with its client API.
+
+    ``client`` only needs ``get``, ``set(key, value, ex=ttl)`` and ``incr``.
+    """
+
+    def __init__(self, client, prefix='restaurant-backend:'):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND='redis' requires the redis package") from exc
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+
+class ResponseCache:
+    """Flask extension caching whole ``200`` responses of decorated views."""
+
+    def init_app(self, app):
+        backend = app.config.get('RESPONSE_CACHE_BACKEND', 'memory')
+        if backend == 'memory':
+            store = MemoryBackend(app.config.get('RESPONSE_CACHE_MAXSIZE', 256))
+        elif backend == 'redis':
+            store = RedisBackend.from_url(app.config['RESPONSE_CACHE_REDIS_URL'])
+        elif isinstance(backend, str):
+            raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend}")
+        else:
+            store = backend
+        app.extensions['response_cache'] = store
+
+    @property
+    def backend(self):
+        return current_app.extensions['response_cache']
+
+    def _key(self, namespace):
+        generation = self.backend.counter(f"{namespace}:generation")
+        args = json.dumps(sorted(request.args.items(multi=True)), ensure_ascii=False)
+        return f"{namespace}:{generation}:{args}"
+
+    def invalidate(self, namespace):
+        """Drop every cached response of ``namespace``."""
+
+        self.backend.incr(f"{namespace}:generation")
+        if REPLICA_BIND in (current_app.config.get('SQLALCHEMY_BINDS') or {}):
+            window = current_app.config.get('REPLICA_STICKY_SECONDS', STICKY_SECONDS)
+            self.backend.set(f"{namespace}:replica_lag", '1', window)
+
+    def cached(self, namespace, unless=None):
+        """Cache a ``GET`` view per query string, with ETag/``If-None-Match`` support.
+
+        Requests for which ``unless()`` is true skip the cache entirely.
+        """
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if unless is not None and unless():
+                    return view(*args, **kwargs)
+                ttl = current_app.config.get('RESPONSE_CACHE_TTL', 60)
+                key = self._key(namespace)
+                stored = self.backend.get(key) if ttl else None
+                if stored is not None:
+                    entry = json.loads(stored)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    entry = _entry(response)
+                    # Una réplica atrasada guardaría la versión anterior bajo la nueva generación
+                    lagging = reading_replica() and self.backend.get(f"{namespace}:replica_lag")
+                    if ttl and not lagging:
+                        self.backend.set(key, json.dumps(entry), ttl)
+                response = Response(entry['body'], mimetype=entry['mimetype'], headers=entry['headers'])
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+
+def _entry(response):
+    """Materialize ``response`` (streamed or not) into a cacheable dict with its ETag."""
+
+    body = response.get_data(as_text=True)
+    headers = [
+        (name, value) for name, value in response.headers
+        if name.lower() not in ('content-type', 'content-length')
+    ]
+    headers.append(('ETag', f'"{hashlib.sha1(body.encode()).hexdigest()}"'))
+    return {'body': body, 'mimetype': response.mimetype, 'headers': headers}
@@ -0,0 +1,604 @@
+"""Atomic admission of reservations under the capacity rules.
+
+Capacity is tracked in two counter tables, ``daily_capacity`` (per restaurant
+and day, with a bitmap of the booked tables) and ``daily_totals`` (per day),
+so every check is a primary-key upsert instead of a ``COUNT(*)`` over the
+reservations table. The limits come from the cached capacity rules
+(``app/rules.py``).
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, bindparam, delete, exists, insert, literal, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from .changes import DELETE, INSERT, UPDATE, record_changes
+from .extensions import capacity_rules, db
+from .models import DailyCapacity, DailyTotal, Hold, Reservation, Restaurant
+# Límites por defecto cuando ninguna regla aplica
+from .rules import MAX_PER_DAY, MAX_PER_RESTAURANT, MAX_TABLES
+
+BULK_ATTEMPTS = 3
+HOLD_SWEEP_BATCH = 500
+
+RESTAURANT_NOT_FOUND = "El restaurante no existe"
+TABLE_RANGE = "El número de mesa debe estar entre 1 y {max_tables}"
+TABLE_TAKEN = "La mesa {table_number} ya está reservada para ese restaurante en esa fecha"
+RESTAURANT_FULL = "No hay más cupo en este restaurante para esa fecha"
+DAY_FULL = "No hay más cupo total para esa fecha"
+BULK_CONFLICT = "Las reservas cambiaron durante la carga, intenta de nuevo"
+
+_UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+class CapacityError(Exception):
+    """Raised when a reservation cannot be admitted."""
+
+    def __init__(self, description):
+        super().__init__(description)
+        self.description = description
+
+
+def table_bit(table_number):
+    """Return the ``tables_mask`` bit that marks ``table_number`` as booked."""
+
+    return 1 << (table_number - 1)
+
+
+def _upsert(model):
+    # create_app ya rechazó cualquier otro motor (ver app/database.py)
+    return _UPSERT_DIALECTS[db.session.get_bind().dialect.name](model)
+
+
+def _claim_restaurant_slots(restaurant_id, date, tables_mask, count=1):
+    """Add ``count`` bookings covering ``tables_mask`` to the restaurant/day counter.
+
+    The update only applies while every table in the mask is free and the
+    counter stays within the restaurant's cap for that day; returns whether
+    it was applied.
+    """
+
+    limit = capacity_rules.current().per_restaurant(restaurant_id, date)
+    if count > limit:
+        return False
+    candidate = select(
+        literal(restaurant_id), literal(date), literal(count), literal(tables_mask)
+    ).where(exists().where(Restaurant.id == restaurant_id))
+    statement = _upsert(DailyCapacity).from_select(
+        ['restaurant_id', 'date', 'booked_count', 'tables_mask'], candidate
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=['restaurant_id', 'date'],
+        set_={
+            'booked_count': DailyCapacity.booked_count + count,
+            'tables_mask': DailyCapacity.tables_mask.op('|')(tables_mask),
+        },
+        where=(DailyCapacity.booked_count + count <= limit)
+        & (DailyCapacity.tables_mask.op('&')(tables_mask) == 0),
+    ).returning(DailyCapacity.booked_count)
+    return db.session.execute(statement).first() is not None
+
+
+def _claim_day_slots(date, count=1):
+    """Add ``count`` bookings to the global counter for ``date`` if it stays under the cap."""
+
+    limit = capacity_rules.current().per_day(date)
+    if count > limit:
+        return False
+    statement = _upsert(DailyTotal).values(date=date, booked_count=count)
+    statement = statement.on_conflict_do_update(
+        index_elements=['date'],
+        set_={'booked_count': DailyTotal.booked_count + count},
+        where=DailyTotal.booked_count + count <= limit,
+    ).returning(DailyTotal.booked_count)
+    return db.session.execute(statement).first() is not None
+
+
+def _restaurant_rejection(restaurant_id, date, table_number):
+    """Explain why the restaurant/day counter refused a slot."""
+
+    counter = db.session.get(DailyCapacity, (restaurant_id, date))
+    if counter is None:
+        return RESTAURANT_FULL if db.session.get(Restaurant, restaurant_id) else RESTAURANT_NOT_FOUND
+    if counter.tables_mask & table_bit(table_number):
+        return TABLE_TAKEN.format(table_number=table_number)
+    return RESTAURANT_FULL
+
+
+def claim_slot(restaurant_id, date, table_number):
+    """Reserve one slot in both counters or raise :class:`CapacityError`.
+
+    Checks run in the order the API reports them: restaurant existence, free
+    table, restaurant cap, global cap. The session is rolled back on failure.
+    """
+
+    if not _claim_restaurant_slots(restaurant_id, date, table_bit(table_number)):
+        reason = _restaurant_rejection(restaurant_id, date, table_number)
+        db.session.rollback()
+        raise CapacityError(reason)
+    if not _claim_day_slots(date):
+        db.session.rollback()
+        raise CapacityError(DAY_FULL)
+
+
+def _release_restaurant_slot(restaurant_id, date, table_number):
+    bit = table_bit(table_number)
+    db.session.execute(
+        update(DailyCapacity)
+        .where(DailyCapacity.restaurant_id == restaurant_id, DailyCapacity.date == date)
+        .values(
+            booked_count=DailyCapacity.booked_count - 1,
+            tables_mask=DailyCapacity.tables_mask.op('&')(~bit),
+        )
+    )
+
+
+def _release_day_slot(date):
+    db.session.execute(
+        update(DailyTotal)
+        .where(DailyTotal.date == date)
+        .values(booked_count=DailyTotal.booked_count - 1)
+    )
+
+
+def release_slot(restaurant_id, date, table_number):
+    """Give back the slot held by a reservation that is deleted or moved."""
+
+    _release_restaurant_slot(restaurant_id, date, table_number)
+    _release_day_slot(date)
+
+
+def _swap_table(restaurant_id, date, old_table, new_table):
+    """Move a booking to another table of the same restaurant and day, if it is free."""
+
+    new_bit = table_bit(new_table)
+    statement = (
+        update(DailyCapacity)
+        .where(
+            DailyCapacity.restaurant_id == restaurant_id,
+            DailyCapacity.date == date,
+            DailyCapacity.tables_mask.op('&')(new_bit) == 0,
+        )
+        .values(tables_mask=DailyCapacity.tables_mask.op('&')(~table_bit(old_table)).op('|')(new_bit))
+        .returning(DailyCapacity.booked_count)
+    )
+    return db.session.execute(statement).first() is not None
+
+
+def _lock_reservation(reservation_id):
+    """Return the current row of a reservation, locking it for the transaction.
+
+    A no-op ``UPDATE ... RETURNING`` takes the SQLite write lock (or the
+    Postgres row lock) and reads the row in the same round-trip, so a
+    concurrent move cannot release the same slot twice.
+    """
+
+    statement = (
+        update(Reservation)
+        .where(Reservation.id == reservation_id)
+        .values(id=Reservation.id)
+        .returning(*Reservation.__table__.c)
+    )
+    return db.session.execute(statement).first()
+
+
+def counter_locks(restaurant_keys, dates):
+    """``SELECT ... FOR UPDATE`` statements over the given counters, in key order."""
+
+    return (
+        select(DailyCapacity.restaurant_id)
+        .where(tuple_(DailyCapacity.restaurant_id, DailyCapacity.date).in_(sorted(restaurant_keys)))
+        .order_by(DailyCapacity.restaurant_id, DailyCapacity.date)
+        .with_for_update(),
+        select(DailyTotal.date)
+        .where(DailyTotal.date.in_(sorted(dates)))
+        .order_by(DailyTotal.date)
+        .with_for_update(),
+    )
+
+
+def _lock_counters(restaurant_keys, dates):
+    """Lock the existing counter rows a transaction will touch, sorted by key.
+
+    A move releases one place and claims another, so two opposite moves
+    would otherwise take the same rows in opposite order and deadlock on
+    Postgres. SQLite serializes writers with its database lock and skips it.
+    """
+
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return
+    restaurants, days = counter_locks(restaurant_keys, dates)
+    db.session.execute(restaurants).all()
+    if dates:
+        db.session.execute(days).all()
+
+
+def move_reservation(reservation_id, restaurant_id=None, date=None, table_number=None):
+    """Move a reservation, enforcing the same rules as a new booking.
+
+    Only the counters that actually change are touched: a table change on the
+    same restaurant and day is a single guarded bitmap update, and the global
+    counter is left alone unless the date changes. Returns the updated row,
+    or ``None`` if the reservation does not exist; raises
+    :class:`CapacityError` (after rolling back) when the target is not
+    available. The caller commits.
+    """
+
+    current = _lock_reservation(reservation_id)
+    if current is None:
+        return None
+    old = (current.restaurant_id, current.date, current.table_number)
+    target = (
+        current.restaurant_id if restaurant_id is None else restaurant_id,
+        current.date if date is None else date,
+        current.table_number if table_number is None else table_number,
+    )
+    if target == old:
+        return current
+    max_tables = capacity_rules.current().tables(target[0], target[1])
+    if not 1 <= target[2] <= max_tables:
+        db.session.rollback()
+        raise CapacityError(TABLE_RANGE.format(max_tables=max_tables))
+
+    if target[:2] == old[:2]:
+        if not _swap_table(*old, target[2]):
+            db.session.rollback()
+            raise CapacityError(TABLE_TAKEN.format(table_number=target[2]))
+    else:
+        _lock_counters({old[:2], target[:2]}, {old[1], target[1]} if target[1] != old[1] else set())
+        _release_restaurant_slot(*old)
+        if not _claim_restaurant_slots(target[0], target[1], table_bit(target[2])):
+            reason = _restaurant_rejection(*target)
+            db.session.rollback()
+            raise CapacityError(reason)
+        if target[1] != old[1]:
+            _release_day_slot(old[1])
+            if not _claim_day_slots(target[1]):
+                db.session.rollback()
+                raise CapacityError(DAY_FULL)
+
+    statement = (
+        update(Reservation)
+        .where(Reservation.id == reservation_id)
+        .values(restaurant_id=target[0], date=target[1], table_number=target[2])
+        .returning(*Reservation.__table__.c)
+    )
+    try:
+        row = db.session.execute(statement).one()
+    except IntegrityError:
+        db.session.rollback()
+        raise CapacityError(TABLE_TAKEN.format(table_number=target[2]))
+    events = [(UPDATE, *row[:4])]
+    if target[:2] != old[:2]:
+        # Quien sigue solo el restaurante o la fecha de origen debe ver que la reserva se fue
+        events.insert(0, (DELETE, reservation_id, *old))
+    record_changes(events)
+    return row
+
+
+def cancel_reservation(reservation_id):
+    """Delete a reservation and release its slot; returns whether it existed."""
+
+    statement = (
+        delete(Reservation)
+        .where(Reservation.id == reservation_id)
+        .returning(Reservation.restaurant_id, Reservation.date, Reservation.table_number)
+    )
+    row = db.session.execute(statement).first()
+    if row is None:
+        return False
+    release_slot(*row)
+    record_changes([(DELETE, reservation_id, *row)])
+    return True
+
+
+def admit_reservation(restaurant_id, date, table_number):
+    """Insert a reservation if the capacity rules allow it.
+
+    The slot is claimed through the counter upserts, whose row locks (or the
+    SQLite write lock) serialize concurrent bookings of the same day; the
+    ``uq_reservations_table`` constraint remains as a last line of defence.
+    The caller commits; on rejection the session is rolled back and
+    :class:`CapacityError` is raised with the user-facing message.
+    """
+
+    claim_slot(restaurant_id, date, table_number)
+    statement = (
+        insert(Reservation)
+        .values(restaurant_id=restaurant_id, date=date, table_number=table_number)
+        .returning(*Reservation.__table__.c)
+    )
+    try:
+        row = db.session.execute(statement).one()
+    except IntegrityError:
+        db.session.rollback()
+        raise CapacityError(TABLE_TAKEN.format(table_number=table_number))
+    record_changes([(INSERT, *row[:4])])
+    return row
+
+
+
+def _bulk_snapshot(candidates):
+    """Read, in three queries, the state every candidate of a batch depends on."""
+
+    restaurant_ids = {restaurant_id for restaurant_id, _, _ in candidates}
+    dates = {date for _, date, _ in candidates}
+    existing = set(db.session.scalars(
+        select(Restaurant.id).where(Restaurant.id.in_(restaurant_ids))
+    ))
+    counters = {
+        (restaurant_id, date): (booked_count, tables_mask)
+        for restaurant_id, date, booked_count, tables_mask in db.session.execute(
+            select(
+                DailyCapacity.restaurant_id, DailyCapacity.date,
+                DailyCapacity.booked_count, DailyCapacity.tables_mask,
+            ).where(DailyCapacity.restaurant_id.in_(restaurant_ids), DailyCapacity.date.in_(dates))
+        )
+    }
+    totals = dict(db.session.execute(
+        select(DailyTotal.date, DailyTotal.booked_count).where(DailyTotal.date.in_(dates))
+    ).all())
+    return existing, counters, totals
+
+
+def _plan_bulk(candidates):
+    """Decide in memory which candidates fit, applying the same rules as :func:`claim_slot`.
+
+    Returns the per-candidate rejection messages (``None`` when accepted) and
+    the counter increments the accepted ones need.
+    """
+
+    existing, counters, totals = _bulk_snapshot(candidates)
+    rules = capacity_rules.current()
+    restaurant_deltas = {}
+    day_deltas = {}
+    rejections = []
+    for restaurant_id, date, table_number in candidates:
+        booked_count, tables_mask = counters.get((restaurant_id, date), (0, 0))
+        bit = table_bit(table_number)
+        if restaurant_id not in existing:
+            rejections.append(RESTAURANT_NOT_FOUND)
+        elif tables_mask & bit:
+            rejections.append(TABLE_TAKEN.format(table_number=table_number))
+        elif booked_count >= rules.per_restaurant(restaurant_id, date):
+            rejections.append(RESTAURANT_FULL)
+        elif totals.get(date, 0) >= rules.per_day(date):
+            rejections.append(DAY_FULL)
+        else:
+            rejections.append(None)
+            counters[(restaurant_id, date)] = (booked_count + 1, tables_mask | bit)
+            totals[date] = totals.get(date, 0) + 1
+            count, mask = restaurant_deltas.get((restaurant_id, date), (0, 0))
+            restaurant_deltas[(restaurant_id, date)] = (count + 1, mask | bit)
+            day_deltas[date] = day_deltas.get(date, 0) + 1
+    return rejections, restaurant_deltas, day_deltas
+
+
+def admit_many(candidates):
+    """Admit a batch of ``(restaurant_id, date, table_number)`` tuples in one transaction.
+
+    Candidates are checked in order against one snapshot of the counters, so
+    later items see the slots taken by earlier ones. The accepted ones are
+    written with one guarded upsert per restaurant/day and per day and a
+    single ``executemany`` insert. If the counters moved since the snapshot,
+    a guard fails and the batch is planned again, up to ``BULK_ATTEMPTS``
+    times before raising :class:`CapacityError`. The counters are claimed in
+    sorted key order, so two batches (or a batch and a group-commit flush)
+    never lock the same rows in opposite order.
+
+    Returns, aligned with ``candidates``, the inserted row or the rejection
+    message of each one. The caller commits.
+    """
+
+    for _ in range(BULK_ATTEMPTS):
+        rejections, restaurant_deltas, day_deltas = _plan_bulk(candidates)
+        # Siempre en el mismo orden de claves: dos lotes concurrentes no se bloquean en cruz
+        applied = all(
+            _claim_restaurant_slots(restaurant_id, date, mask, count)
+            for (restaurant_id, date), (count, mask) in sorted(restaurant_deltas.items())
+        ) and all(_claim_day_slots(date, count) for date, count in sorted(day_deltas.items()))
+        if applied:
+            break
+        db.session.rollback()
+    else:
+        raise CapacityError(BULK_CONFLICT)
+
+    accepted = [
+        {'restaurant_id': restaurant_id, 'date': date, 'table_number': table_number}
+        for (restaurant_id, date, table_number), rejection in zip(candidates, rejections)
+        if rejection is None
+    ]
+    rows = iter(())
+    if accepted:
+        statement = insert(Reservation).returning(
+            *Reservation.__table__.c, sort_by_parameter_order=True
+        )
+        try:
+            inserted = db.session.execute(statement, accepted).all()
+        except IntegrityError:
+            db.session.rollback()
+            raise CapacityError(BULK_CONFLICT)
+        record_changes([(INSERT, *row[:4]) for row in inserted])
+        rows = iter(inserted)
+    return [next(rows) if rejection is None else rejection for rejection in rejections]
+
+
+def _now():
+    """Current UTC time as a naive ``datetime``, like the ``DateTime`` columns store it."""
+
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def place_hold(restaurant_id, date, table_number, ttl):
+    """Claim a slot for ``ttl`` seconds without creating the reservation yet.
+
+    The slot is taken from the same counters as a booking, so holds count
+    against both caps and block their table until they are confirmed,
+    released or swept. Returns the hold row; the caller commits.
+    """
+
+    claim_slot(restaurant_id, date, table_number)
+    statement = (
+        insert(Hold)
+        .values(
+            restaurant_id=restaurant_id, date=date, table_number=table_number,
+            expires_at=_now() + timedelta(seconds=ttl),
+        )
+        .returning(*Hold.__table__.c)
+    )
+    return db.session.execute(statement).one()
+
+
+def confirm_hold(hold_id):
+    """Turn a live hold into a reservation, keeping the slot it already claimed.
+
+    The hold is deleted with a guard on ``expires_at``, so a confirmation
+    racing the sweeper either wins the slot or finds nothing. Returns the
+    reservation row, or ``None`` when there is no live hold with that id.
+    The caller commits.
+    """
+
+    hold = db.session.execute(
+        delete(Hold)
+        .where(Hold.id == hold_id, Hold.expires_at > _now())
+        .returning(Hold.restaurant_id, Hold.date, Hold.table_number)
+    ).first()
+    if hold is None:
+        return None
+    statement = (
+        insert(Reservation)
+        .values(restaurant_id=hold.restaurant_id, date=hold.date, table_number=hold.table_number)
+        .returning(*Reservation.__table__.c)
+    )
+    try:
+        row = db.session.execute(statement).one()
+    except IntegrityError:
+        db.session.rollback()
+        raise CapacityError(TABLE_TAKEN.format(table_number=hold.table_number))
+    record_changes([(INSERT, *row[:4])])
+    return row
+
+
+def release_hold(hold_id):
+    """Delete a hold and give its slot back; returns whether it existed."""
+
+    row = db.session.execute(
+        delete(Hold)
+        .where(Hold.id == hold_id)
+        .returning(Hold.restaurant_id, Hold.date, Hold.table_number)
+    ).first()
+    if row is None:
+        return False
+    release_slot(*row)
+    return True
+
+
+def _release_many(rows):
+    """Give back the slots of many ``(restaurant_id, date, table_number)`` rows.
+
+    Releases are aggregated per restaurant/day and per day and applied with
+    one ``executemany`` update per counter table, in key order like
+    :func:`admit_many`, so concurrent batches lock the rows in the same order.
+    """
+
+    if not rows:
+        return
+    restaurant_deltas = {}
+    day_deltas = {}
+    for restaurant_id, date, table_number in rows:
+        count, mask = restaurant_deltas.get((restaurant_id, date), (0, 0))
+        restaurant_deltas[(restaurant_id, date)] = (count + 1, mask | table_bit(table_number))
+        day_deltas[date] = day_deltas.get(date, 0) + 1
+    db.session.execute(
+        update(DailyCapacity.__table__)
+        .where(
+            DailyCapacity.restaurant_id == bindparam('r_id'),
+            DailyCapacity.date == bindparam('r_date'),
+        )
+        .values(
+            booked_count=DailyCapacity.booked_count - bindparam('r_count'),
+            tables_mask=DailyCapacity.tables_mask.op('&')(bindparam('r_keep')),
+        ),
+        [
+            {'r_id': restaurant_id, 'r_date': date, 'r_count': count, 'r_keep': ~mask}
+            for (restaurant_id, date), (count, mask) in sorted(restaurant_deltas.items())
+        ],
+    )
+    db.session.execute(
+        update(DailyTotal.__table__)
+        .where(DailyTotal.date == bindparam('r_date'))
+        .values(booked_count=DailyTotal.booked_count - bindparam('r_count')),
+        [{'r_date': date, 'r_count': count} for date, count in sorted(day_deltas.items())],
+    )
+
+
+def sweep_holds(batch_size=HOLD_SWEEP_BATCH):
+    """Release up to ``batch_size`` expired holds; returns how many were released.
+
+    One ``DELETE ... RETURNING`` removes the oldest expired holds and two
+    batched updates give their slots back. The caller commits.
+    """
+
+    expired = select(Hold.id).where(Hold.expires_at <= _now()).order_by(Hold.expires_at).limit(batch_size)
+    rows = db.session.execute(
+        delete(Hold)
+        .where(Hold.id.in_(expired))
+        .returning(Hold.restaurant_id, Hold.date, Hold.table_number)
+    ).all()
+    _release_many(rows)
+    return len(rows)
+
+
+def availability_statement(restaurant_id, start, end):
+    """Day totals joined with the restaurant's counters for ``[start, end]``."""
+
+    return (
+        select(
+            DailyTotal.date, DailyTotal.booked_count,
+            DailyCapacity.booked_count, DailyCapacity.tables_mask,
+        )
+        .outerjoin(DailyCapacity, and_(
+            DailyCapacity.date == DailyTotal.date,
+            DailyCapacity.restaurant_id == restaurant_id,
+        ))
+        .where(DailyTotal.date.between(start, end))
+    )
+
+
+def availability_days(restaurant_id, rows, start, end):
+    """Turn the rows of ``availability_statement`` into one entry per day."""
+
+    rules = capacity_rules.current()
+    booked = {day: (total or 0, count or 0, mask or 0) for day, total, count, mask in rows}
+
+    days = []
+    day = start
+    while day <= end:
+        total, count, mask = booked.get(day, (0, 0, 0))
+        restaurant_remaining = max(rules.per_restaurant(restaurant_id, day) - count, 0)
+        global_remaining = max(rules.per_day(day) - total, 0)
+        free_tables = []
+        if restaurant_remaining and global_remaining:
+            tables = rules.tables(restaurant_id, day)
+            free_tables = [n for n in range(1, tables + 1) if not mask & table_bit(n)]
+        days.append({
+            'date': day.isoformat(),
+            'free_tables': free_tables,
+            'restaurant_remaining': restaurant_remaining,
+            'global_remaining': global_remaining,
+        })
+        day += timedelta(days=1)
+    return days
+
+
+def availability(restaurant_id, start, end):
+    """Free tables and remaining capacity of a restaurant for each day in ``[start, end]``.
+
+    Answered from the counter tables with one outer join; days without
+    counter rows have every table free. ``free_tables`` is empty when either
+    cap is exhausted, since none of them could be booked.
+    """
+
+    rows = db.session.execute(availability_statement(restaurant_id, start, end)).all()
+    return availability_days(restaurant_id, rows, start, end)
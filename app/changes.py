@@ -0,0 +1,115 @@
+"""Append-only log of reservation changes, for clients that sync incrementally.
+
+Every insert, update and delete of a reservation appends a row to
+``reservation_changes`` in the same transaction, so a change is visible
+exactly when the reservation is. Clients read the events after the last
+``seq`` they saw (``GET /reservations/changes?since=``) or follow them as
+Server-Sent Events, and apply ``insert``/``update`` as an upsert by
+``reservation_id`` and ``delete`` as a removal. A reservation moved to
+another restaurant or date produces a ``delete`` at its old place followed
+by an ``update`` at the new one, so feeds filtered by restaurant or date
+see it leave.
+
+:func:`record_changes` only queues the events on the session; they are
+appended from its ``before_commit`` hook, as the last statement before
+``COMMIT``. On Postgres that statement first takes a transaction-level
+advisory lock, so sequence numbers are handed out in commit order and a
+reader never skips a change that commits late. Taking it at the very end
+means a writer holds it only for that insert and its own commit, not while
+it checks capacity or serializes the response; it still makes the commits
+of all reservation writers go one at a time, so their throughput is capped
+at about one insert plus commit (with its WAL flush) per lock holder.
+SQLite already serializes writers.
+"""
+
+import json
+
+from sqlalchemy import event, func, insert, select
+
+from .extensions import db
+from .models import ReservationChange
+from .replicas import RoutingSession
+from .serializers import serialize_change
+
+INSERT = 'insert'
+UPDATE = 'update'
+DELETE = 'delete'
+CHANGES_PAGE_SIZE = 500
+# Clave del advisory lock de Postgres que ordena las escrituras del log
+CHANGE_LOG_LOCK = 7_231_001
+# Eventos de la transacción en curso, en session.info
+PENDING_CHANGES = 'pending_reservation_changes'
+
+
+def record_changes(events):
+    """Queue ``(operation, reservation_id, restaurant_id, date, table_number)`` events for this transaction.
+
+    They are appended in one insert when the caller commits, and dropped if it
+    rolls back.
+    """
+
+    if events:
+        db.session.info.setdefault(PENDING_CHANGES, []).extend(events)
+
+
+@event.listens_for(RoutingSession, 'before_commit')
+def _append_changes(session):
+    events = session.info.pop(PENDING_CHANGES, None)
+    if not events:
+        return
+    if session.get_bind().dialect.name == 'postgresql':
+        # Se toma lo más tarde posible: solo lo retienen el insert y el COMMIT
+        session.execute(select(func.pg_advisory_xact_lock(CHANGE_LOG_LOCK)))
+    session.execute(insert(ReservationChange), [
+        {
+            'operation': operation, 'reservation_id': reservation_id,
+            'restaurant_id': restaurant_id, 'date': date, 'table_number': table_number,
+        }
+        for operation, reservation_id, restaurant_id, date, table_number in events
+    ])
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _drop_changes(session, transaction):
+    # Un rollback (o cerrar la sesión sin commit) descarta los eventos de la transacción
+    if transaction.parent is None:
+        session.info.pop(PENDING_CHANGES, None)
+
+
+def latest_statement():
+    """The ``seq`` of the newest change, or 0."""
+
+    return select(func.coalesce(func.max(ReservationChange.seq), 0))
+
+
+def changes_statement(since, head, restaurant_id=None, date=None, limit=CHANGES_PAGE_SIZE):
+    """Changes with ``since < seq <= head``, oldest first, optionally for one restaurant and/or date.
+
+    Bounding by ``head`` (read before this query) lets the caller advance its
+    cursor to ``head`` when fewer than ``limit`` changes come back, even if
+    none of them matched the filters.
+    """
+
+    statement = (
+        select(*ReservationChange.__table__.c)
+        .where(ReservationChange.seq > since, ReservationChange.seq <= head)
+        .order_by(ReservationChange.seq)
+        .limit(limit)
+    )
+    if restaurant_id is not None:
+        statement = statement.where(ReservationChange.restaurant_id == restaurant_id)
+    if date is not None:
+        statement = statement.where(ReservationChange.date == date)
+    return statement
+
+
+def next_cursor(rows, head, limit=CHANGES_PAGE_SIZE):
+    """Where the next read should start: the last row of a full page, else ``head``."""
+
+    return rows[-1].seq if len(rows) == limit else head
+
+
+def sse_event(row):
+    """Format a change as a Server-Sent Event whose ``id`` is its ``seq``."""
+
+    return f"id: {row.seq}\nevent: {row.operation}\ndata: {json.dumps(serialize_change(row))}\n\n"
@@ -0,0 +1,48 @@
+"""Per-connection tuning of the SQLAlchemy engines."""
+
+from sqlalchemy import event
+
+# Los contadores de cupo usan INSERT ... ON CONFLICT DO UPDATE ... WHERE ... RETURNING
+SUPPORTED_DIALECTS = ('sqlite', 'postgresql')
+
+
+def check_dialects(engines):
+    """Refuse to start on a database the capacity counters cannot run on."""
+
+    for engine in engines:
+        if engine.dialect.name not in SUPPORTED_DIALECTS:
+            raise RuntimeError(
+                f"Unsupported database {engine.dialect.name!r}: "
+                f"the reservation counters need one of {', '.join(SUPPORTED_DIALECTS)}"
+            )
+
+def _pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return set_pragmas
+
+
+def configure_engines(app, db):
+    """Check the app's engines and apply ``SQLITE_PRAGMAS`` to the SQLite ones.
+
+    Unsupported databases fail here, at startup, instead of on every booking.
+
+    WAL lets readers run alongside the single writer, ``synchronous=NORMAL``
+    drops the fsync on each commit (WAL stays consistent, the last commits
+    may be lost on power failure), ``busy_timeout`` makes writers wait for
+    the lock instead of failing and ``mmap_size`` serves reads from the page
+    cache.
+    """
+
+    with app.app_context():
+        check_dialects(db.engines.values())
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _pragma_listener(pragmas))
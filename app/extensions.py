@@ -1,9 +1,24 @@
-"""Initialize Flask extensions used by the application."""
+"""Initialize Flask extensions used by the application.
+
+Flask-Migrate and Flask-Marshmallow are left out on purpose: they are only
+imported when needed (see ``app/commands.py`` and ``app/schema_cache.py``).
+"""
 
 from flask_sqlalchemy import SQLAlchemy
-from flask_marshmallow import Marshmallow
-from flask_migrate import Migrate
 
-db = SQLAlchemy()
-ma = Marshmallow()
-migrate = Migrate()
+from .async_db import AsyncDatabase
+from .cache import ResponseCache
+from .group_commit import GroupCommit
+from .idempotency import Idempotency
+from .metrics import Metrics
+from .replicas import Replicas, RoutingSession
+from .rules import CapacityRules
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+response_cache = ResponseCache()
+async_db = AsyncDatabase()
+metrics = Metrics()
+capacity_rules = CapacityRules()
+idempotency = Idempotency()
+group_commit = GroupCommit()
+replicas = Replicas()
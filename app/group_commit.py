@@ -0,0 +1,137 @@
+"""Group commit of new reservations under burst load.
+
+With ``GROUP_COMMIT_ENABLED`` each ``POST /reservations`` hands its validated
+candidate to a per-app queue instead of opening its own write transaction.
+A background thread collects the candidates that arrive within
+``GROUP_COMMIT_WINDOW_MS`` of the first one (at most
+``GROUP_COMMIT_MAX_BATCH``), admits them in arrival order with
+:func:`app.capacity.admit_many` and commits once. Every request waits for the
+outcome of its own candidate, so it still answers only after its reservation
+is committed, or with the same rejection it would have got on its own.
+
+If the batch keeps losing the counters to other writers (``admit_many``
+raises :class:`CapacityError`), its candidates are admitted one by one, and
+an error in one of them only fails that request. An error in the batch
+itself fails all of its requests, since none of them was committed.
+
+Requests wait for their outcome without a timeout: answering 503 while the
+batch may still commit would leave the client unsure whether it booked.
+The committer resolves every queued request, also when its batch fails, so
+the wait is bounded by the batch itself (and the server's own timeout).
+The queue lives in the worker process: each worker groups its own requests.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from flask import current_app
+
+WINDOW_MS = 5
+MAX_BATCH = 200
+
+
+class CommitQueue:
+    """Pending candidates of one app and the thread that commits them."""
+
+    def __init__(self, app):
+        self.app = app
+        self.window = app.config.get('GROUP_COMMIT_WINDOW_MS', WINDOW_MS) / 1000
+        self.max_batch = app.config.get('GROUP_COMMIT_MAX_BATCH', MAX_BATCH)
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        # Se arranca con la primera petición (y de nuevo tras un fork del servidor)
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+                self.thread.start()
+
+    def _collect(self):
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                with self.app.app_context():
+                    outcomes = self._flush([candidate for candidate, _ in batch])
+            except Exception as err:
+                # Falló el lote entero: no se confirmó ninguna de sus reservas
+                outcomes = [err] * len(batch)
+            for (_, future), outcome in zip(batch, outcomes):
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome)
+
+    def _flush(self, candidates):
+        from .capacity import CapacityError, admit_many, admit_reservation
+        from .extensions import db
+
+        try:
+            outcomes = admit_many(candidates)
+            db.session.commit()
+        except CapacityError:
+            db.session.rollback()
+        else:
+            return [CapacityError(outcome) if isinstance(outcome, str) else outcome for outcome in outcomes]
+
+        # El lote chocó con otros escritores: cada reserva en su propia transacción,
+        # y un error solo afecta a la petición de esa reserva
+        outcomes = []
+        for candidate in candidates:
+            try:
+                row = admit_reservation(*candidate)
+                db.session.commit()
+            except Exception as err:
+                db.session.rollback()
+                outcomes.append(err)
+            else:
+                outcomes.append(row)
+        return outcomes
+
+
+class GroupCommit:
+    """Flask extension batching the commits of ``POST /reservations``."""
+
+    def init_app(self, app):
+        if app.config.get('GROUP_COMMIT_ENABLED', False):
+            app.extensions['group_commit'] = CommitQueue(app)
+
+    @property
+    def enabled(self):
+        return 'group_commit' in current_app.extensions
+
+    def admit(self, restaurant_id, date, table_number):
+        """Queue a candidate and wait, without a timeout, for the committed row.
+
+        Raises :class:`CapacityError` with the rejection message, like
+        :func:`app.capacity.admit_reservation`, or the error that made its
+        transaction fail.
+        """
+
+        from .extensions import db
+
+        commits = current_app.extensions['group_commit']
+        commits.start()
+        future = Future()
+        # La conexión vuelve al pool mientras la petición espera a su lote
+        db.session.close()
+        commits.pending.put(((restaurant_id, date, table_number), future))
+        return future.result()
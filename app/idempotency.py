@@ -0,0 +1,181 @@
+"""``Idempotency-Key`` support for the creation endpoints.
+
+The first request with a given key claims it with an insert into
+``idempotency_keys`` (committed before the view runs, so a concurrent retry
+sees it) and, once the view has answered, stores its status and body there
+and in an in-process LRU. Retries with the same key and payload get that
+stored response back, marked with ``Idempotent-Replayed: true``, without
+running the view or touching the capacity counters. Keys expire after
+``IDEMPOTENCY_TTL`` seconds and are purged in batches by
+``flask idempotency purge``.
+
+A claim that still has no response after ``IDEMPOTENCY_LEASE`` seconds is
+taken as abandoned (its worker died before storing the answer), and a retry
+with the same payload claims it again instead of getting ``409``.
+"""
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from flask import Response, abort, current_app, make_response, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import HTTPException
+
+from .cache import MemoryBackend
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+PURGE_BATCH = 1000
+
+KEY_REUSED = "La clave de idempotencia ya se usó con otra petición"
+IN_PROGRESS = "Una petición con esta clave de idempotencia todavía está en curso"
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Idempotency:
+    """Flask extension replaying stored responses for repeated idempotency keys."""
+
+    def init_app(self, app):
+        app.extensions['idempotency'] = MemoryBackend(app.config.get('IDEMPOTENCY_CACHE_SIZE', 1024))
+
+    @property
+    def recent(self):
+        return current_app.extensions['idempotency']
+
+    @property
+    def ttl(self):
+        return current_app.config.get('IDEMPOTENCY_TTL', 86400)
+
+    @property
+    def lease(self):
+        return current_app.config.get('IDEMPOTENCY_LEASE', 60)
+
+    def _fingerprint(self):
+        digest = hashlib.sha256(request.endpoint.encode())
+        digest.update(request.get_data())
+        return digest.hexdigest()
+
+    def _claim(self, key, fingerprint):
+        """Insert the key as in progress; return the stored row if it was already there."""
+
+        from .extensions import db
+        from .models import IdempotencyKey
+
+        for _ in range(2):
+            try:
+                db.session.execute(
+                    insert(IdempotencyKey).values(key=key, fingerprint=fingerprint, created_at=_now())
+                )
+                db.session.commit()
+                return None
+            except IntegrityError:
+                db.session.rollback()
+            row = db.session.execute(
+                select(
+                    IdempotencyKey.fingerprint, IdempotencyKey.status_code,
+                    IdempotencyKey.body, IdempotencyKey.mimetype, IdempotencyKey.created_at,
+                ).where(IdempotencyKey.key == key)
+            ).first()
+            if row is None or row.created_at <= _now() - timedelta(seconds=self.ttl):
+                # La clave expiró y todavía no se ha purgado: se reemplaza
+                db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+                db.session.commit()
+                continue
+            abandoned = row.created_at <= _now() - timedelta(seconds=self.lease)
+            if row.status_code is None and row.fingerprint == fingerprint and abandoned:
+                # Quien la reclamó murió sin guardar la respuesta: se reclama de nuevo,
+                # solo si nadie se adelantó (misma created_at)
+                claimed = db.session.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.key == key)
+                    .where(IdempotencyKey.status_code.is_(None))
+                    .where(IdempotencyKey.created_at == row.created_at)
+                    .values(created_at=_now())
+                ).rowcount
+                db.session.commit()
+                if claimed:
+                    return None
+                continue
+            return row
+        abort(409, description=IN_PROGRESS)
+
+    def _store(self, key, response):
+        from .extensions import db
+        from .models import IdempotencyKey
+
+        # La vista ya confirmó (o descartó) su transacción
+        db.session.rollback()
+        if response.status_code >= 500:
+            # Un error del servidor no se repite: el cliente puede reintentar
+            db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+        else:
+            db.session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .values(
+                    status_code=response.status_code,
+                    body=response.get_data(as_text=True),
+                    mimetype=response.mimetype,
+                )
+            )
+        db.session.commit()
+
+    def _replay(self, fingerprint, stored_fingerprint, status_code, body, mimetype):
+        if stored_fingerprint != fingerprint:
+            abort(422, description=KEY_REUSED)
+        if status_code is None:
+            abort(409, description=IN_PROGRESS)
+        response = Response(body, status=status_code, mimetype=mimetype)
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+
+    def idempotent(self, view):
+        """Answer repeated ``Idempotency-Key`` requests from the stored response."""
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(HEADER)
+            if key is None:
+                return view(*args, **kwargs)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                abort(400, description=f"'{HEADER}' debe tener entre 1 y {MAX_KEY_LENGTH} caracteres")
+
+            fingerprint = self._fingerprint()
+            cached = self.recent.get(key)
+            if cached is not None:
+                return self._replay(fingerprint, *cached)
+            stored = self._claim(key, fingerprint)
+            if stored is not None:
+                return self._replay(fingerprint, *stored[:4])
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except HTTPException as err:
+                response = make_response(current_app.handle_user_exception(err))
+            except Exception:
+                self._store(key, Response(status=500))
+                raise
+            self._store(key, response)
+            if response.status_code < 500:
+                entry = (fingerprint, response.status_code, response.get_data(as_text=True), response.mimetype)
+                self.recent.set(key, entry, self.ttl)
+            return response
+        return wrapper
+
+    def purge(self, batch_size=PURGE_BATCH):
+        """Delete up to ``batch_size`` expired keys; returns how many. The caller commits."""
+
+        from .extensions import db
+        from .models import IdempotencyKey
+
+        expired = (
+            select(IdempotencyKey.key)
+            .where(IdempotencyKey.created_at <= _now() - timedelta(seconds=self.ttl))
+            .limit(batch_size)
+        )
+        return db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(expired))).rowcount
@@ -0,0 +1,231 @@
+"""Per-request latency and SQL instrumentation, exported in Prometheus format.
+
+Every request records its duration, the number of SQL statements it ran and
+the time spent in them, as histograms labelled by endpoint and method. SQL
+is measured with ``before_cursor_execute``/``after_cursor_execute`` on every
+engine. The registry is in-process, so each worker exposes its own series at
+``/metrics``; optionally the same numbers go back to the client in a
+``Server-Timing`` header, and a sample of slow requests is profiled with
+cProfile.
+
+Streamed responses (lists without ``limit``, SSE, CSV) run most of their SQL
+after the view returns, so they are recorded when the response is closed,
+once the body has been sent. Their headers are already gone by then, so
+they carry no ``Server-Timing``.
+"""
+
+import bisect
+import cProfile
+import os
+from functools import partial
+import random
+import threading
+import time
+
+from flask import Response, current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Prometheus histogram with one series per label tuple."""
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, values, amount):
+        series = self._series.get(values)
+        if series is None:
+            series = self._series[values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, amount)] += 1
+        series[1] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total) in sorted(self._series.items()):
+            labels = ','.join(f'{label}="{value}"' for label, value in zip(self.labels, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Prometheus counter with one series per label tuple."""
+
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series = {}
+
+    def inc(self, values):
+        self._series[values] = self._series.get(values, 0) + 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, count in sorted(self._series.items()):
+            labels = ','.join(f'{label}="{value}"' for label, value in zip(self.labels, values))
+            lines.append(f"{self.name}{{{labels}}} {count}")
+        return lines
+
+
+class Registry:
+    """The metrics of one app; ``record`` and ``render`` are thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter(
+            'http_requests_total', 'Requests by endpoint, method and status.',
+            ('endpoint', 'method', 'status'),
+        )
+        self.latency = Histogram(
+            'http_request_duration_seconds', 'Time until the response body was produced.',
+            ('endpoint', 'method'), LATENCY_BUCKETS,
+        )
+        self.statements = Histogram(
+            'http_request_sql_statements', 'SQL statements executed per request.',
+            ('endpoint', 'method'), STATEMENT_BUCKETS,
+        )
+        self.sql_time = Histogram(
+            'http_request_sql_duration_seconds', 'Time spent in SQL per request.',
+            ('endpoint', 'method'), LATENCY_BUCKETS,
+        )
+
+    def record(self, endpoint, method, status, elapsed, statements, sql_time):
+        with self._lock:
+            self.requests.inc((endpoint, method, status))
+            self.latency.observe((endpoint, method), elapsed)
+            self.statements.observe((endpoint, method), statements)
+            self.sql_time.observe((endpoint, method), sql_time)
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in (self.requests, self.latency, self.statements, self.sql_time):
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class RequestTimer:
+    """Per-request counters kept in ``g`` while the request runs."""
+
+    __slots__ = ('started', 'statements', 'sql_time', 'profiler')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.sql_time = 0.0
+        self.profiler = None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None or not has_app_context():
+        return
+    timer = g.get('_metrics')
+    if timer is not None:
+        timer.statements += 1
+        timer.sql_time += time.perf_counter() - context._metrics_started
+
+
+def _listen():
+    # A nivel de clase: cubre los engines de db y el AsyncEngine del modo ASGI
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+class Metrics:
+    """Flask extension wiring the request hooks, the SQL events and ``/metrics``.
+
+    Configuration:
+
+    - ``METRICS_ENABLED``: turn the whole instrumentation off.
+    - ``METRICS_SERVER_TIMING``: add ``Server-Timing: app, db`` to responses.
+    - ``METRICS_PROFILE_SAMPLE_RATE``: fraction of requests run under cProfile;
+      the stats are written to ``METRICS_PROFILE_DIR`` (relative to the
+      instance folder) when the request took at least
+      ``METRICS_PROFILE_THRESHOLD_MS``.
+    """
+
+    def init_app(self, app):
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        app.extensions['metrics'] = Registry()
+        _listen()
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.add_url_rule('/metrics', 'metrics', self._export)
+
+    @property
+    def registry(self):
+        return current_app.extensions['metrics']
+
+    def _start(self):
+        timer = g._metrics = RequestTimer()
+        rate = current_app.config.get('METRICS_PROFILE_SAMPLE_RATE', 0)
+        if rate and random.random() < rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Otro perfilador ya está activo en el proceso
+                return
+            timer.profiler = profiler
+
+    def _finish(self, response):
+        timer = g.get('_metrics')
+        if timer is None:
+            return response
+        config = current_app.config
+        endpoint = request.endpoint or 'unmatched'
+        finish = partial(
+            self._record, self.registry, (endpoint, request.method, response.status_code), timer,
+            os.path.join(current_app.instance_path, config.get('METRICS_PROFILE_DIR', 'profiles')),
+            config.get('METRICS_PROFILE_THRESHOLD_MS', 200),
+        )
+        if response.is_streamed:
+            # El cuerpo (y su SQL) se genera después de este hook: se mide al cerrar la respuesta
+            response.call_on_close(finish)
+            return response
+
+        g.pop('_metrics')
+        elapsed = finish()
+        if config.get('METRICS_SERVER_TIMING'):
+            response.headers['Server-Timing'] = (
+                f'app;dur={elapsed * 1000:.2f}, '
+                f'db;dur={timer.sql_time * 1000:.2f};desc="{timer.statements} queries"'
+            )
+        return response
+
+    def _record(self, registry, labels, timer, profile_dir, profile_threshold_ms):
+        """Store the request in ``registry``; runs without the request context when streamed."""
+
+        elapsed = time.perf_counter() - timer.started
+        if timer.profiler is not None:
+            timer.profiler.disable()
+            if elapsed * 1000 >= profile_threshold_ms:
+                os.makedirs(profile_dir, exist_ok=True)
+                name = f"{labels[0]}-{time.time_ns()}.prof"
+                timer.profiler.dump_stats(os.path.join(profile_dir, name))
+        registry.record(*labels, elapsed, timer.statements, timer.sql_time)
+        return elapsed
+
+    def _export(self):
+        return Response(self.registry.render(), content_type=CONTENT_TYPE)
@@ -2,20 +2,128 @@
 
 from .extensions import db
 
+# Texto de búsqueda de un restaurante en Postgres (ver app/search.py): en minúsculas y
+# sin tildes, con search_unaccent (unaccent no es IMMUTABLE y no sirve en un índice).
+# Las consultas deben usar exactamente estas expresiones para aprovechar los índices GIN
+RESTAURANT_SEARCH_TEXT = (
+    "search_unaccent(lower(coalesce(name, '') || ' ' || "
+    "coalesce(description, '') || ' ' || coalesce(city, '')))"
+)
+RESTAURANT_SEARCH_DOCUMENT = f"to_tsvector('simple'::regconfig, {RESTAURANT_SEARCH_TEXT})"
+
 class Restaurant(db.Model):
     __tablename__ = 'restaurants'
+    __table_args__ = (
+        db.Index(
+            'ix_restaurants_search', db.text(RESTAURANT_SEARCH_DOCUMENT), postgresql_using='gin',
+        ).ddl_if(dialect='postgresql'),
+        db.Index(
+            'ix_restaurants_search_trgm', db.literal_column(RESTAURANT_SEARCH_TEXT).label('search_text'),
+            postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'},
+        ).ddl_if(dialect='postgresql'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     address = db.Column(db.String(200))
-    city = db.Column(db.String(50))
+    city = db.Column(db.String(50), index=True)
     image_url = db.Column(db.String(300))
     reservations = db.relationship('Reservation', backref='restaurant', lazy=True)
 
+# Índices para el filtro por prefijo (name LIKE 'x%'): SQLite solo usa un índice
+# para LIKE si es NOCASE, y Postgres necesita la clase de operadores *_pattern_ops.
+db.Index('ix_restaurants_name_nocase', db.collate(Restaurant.name, 'NOCASE')).ddl_if(dialect='sqlite')
+db.Index(
+    'ix_restaurants_name_pattern', Restaurant.name,
+    postgresql_ops={'name': 'varchar_pattern_ops'},
+).ddl_if(dialect='postgresql')
+
 class Reservation(db.Model):
     __tablename__ = 'reservations'
+    __table_args__ = (
+        db.UniqueConstraint('restaurant_id', 'date', 'table_number', name='uq_reservations_table'),
+        db.Index('ix_reservations_date', 'date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), nullable=False)
-    date = db.Column(db.String(20), nullable=False)  # formato YYYY-MM-DD
+    date = db.Column(db.Date, nullable=False)
     table_number = db.Column(db.Integer, nullable=False) 
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+class ReservationChange(db.Model):
+    """One insert, update or delete of a reservation; ``seq`` follows commit order."""
+
+    __tablename__ = 'reservation_changes'
+    __table_args__ = (
+        db.Index('ix_reservation_changes_restaurant', 'restaurant_id', 'seq'),
+        # Sin AUTOINCREMENT, SQLite podría reutilizar un seq
+        {'sqlite_autoincrement': True},
+    )
+    seq = db.Column(db.Integer, primary_key=True)
+    operation = db.Column(db.String(6), nullable=False)
+    reservation_id = db.Column(db.Integer, nullable=False)
+    restaurant_id = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    table_number = db.Column(db.Integer, nullable=False)
+    changed_at = db.Column(db.DateTime, server_default=db.func.now())
+
+class ArchivedReservation(db.Model):
+    """A reservation moved out of ``reservations`` by ``flask reservations archive``."""
+
+    __tablename__ = 'reservations_archive'
+    # En Postgres se particiona por año; la clave de partición debe ir en la clave primaria
+    __table_args__ = {'postgresql_partition_by': 'RANGE (date)'}
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    date = db.Column(db.Date, primary_key=True)
+    restaurant_id = db.Column(db.Integer, nullable=False)
+    table_number = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+class DailyCapacity(db.Model):
+    """Booked slots of one restaurant on one day, kept in sync with reservations."""
+
+    __tablename__ = 'daily_capacity'
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    booked_count = db.Column(db.Integer, nullable=False, default=0)
+    tables_mask = db.Column(db.BigInteger, nullable=False, default=0)  # bit n-1 = mesa n ocupada
+
+class DailyTotal(db.Model):
+    """Booked slots across every restaurant on one day."""
+
+    __tablename__ = 'daily_totals'
+    date = db.Column(db.Date, primary_key=True)
+    booked_count = db.Column(db.Integer, nullable=False, default=0)
+
+class Hold(db.Model):
+    """A slot claimed in the counters until ``expires_at``, pending confirmation."""
+
+    __tablename__ = 'holds'
+    id = db.Column(db.Integer, primary_key=True)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    table_number = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class CapacityRule(db.Model):
+    """Table count and caps for a restaurant and/or date (see ``app/rules.py``)."""
+
+    __tablename__ = 'capacity_rules'
+    id = db.Column(db.Integer, primary_key=True)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), index=True)
+    date = db.Column(db.Date)
+    max_tables = db.Column(db.Integer)
+    max_per_restaurant = db.Column(db.Integer)
+    max_per_day = db.Column(db.Integer)
+
+class IdempotencyKey(db.Model):
+    """Response stored for an ``Idempotency-Key``; ``status_code`` is NULL while in progress."""
+
+    __tablename__ = 'idempotency_keys'
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)
+    body = db.Column(db.Text)
+    mimetype = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,163 @@
+"""Keyset pagination and chunked JSON/CSV streaming for list endpoints."""
+
+import csv
+import io
+import json
+
+from flask import Response, abort, request, stream_with_context
+
+from .extensions import async_db, db
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 500
+FORMATS = ('json', 'ndjson')
+
+
+def page_args():
+    """Read ``limit``, ``after`` and ``format`` from the query string.
+
+    ``limit`` is ``None`` when the client did not ask for a page, in which
+    case the whole result is streamed.
+    """
+
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    output = request.args.get('format', 'json')
+    if limit is not None:
+        if not limit.isdigit() or not (1 <= int(limit) <= MAX_PAGE_SIZE):
+            abort(400, description=f"'limit' debe estar entre 1 y {MAX_PAGE_SIZE}")
+        limit = int(limit)
+    if after is not None:
+        if not after.isdigit():
+            abort(400, description="'after' debe ser un id numérico")
+        after = int(after)
+    if output not in FORMATS:
+        abort(400, description=f"Formato no soportado: {output}")
+    return limit, after, output
+
+
+def keyset(statement, column, after):
+    """Order ``statement`` by the unique ``column`` and skip rows up to ``after``."""
+
+    if after is not None:
+        statement = statement.where(column > after)
+    return statement.order_by(column)
+
+
+def _mimetype(output):
+    return 'application/x-ndjson' if output == 'ndjson' else 'application/json'
+
+
+def _encode(items, output):
+    if output == 'ndjson':
+        return ''.join(json.dumps(item) + '\n' for item in items)
+    return ','.join(json.dumps(item) for item in items)
+
+
+def stream(statement, serialize, output):
+    """Stream the rows of ``statement`` as a JSON array or NDJSON.
+
+    Rows are fetched with ``yield_per`` and encoded ``STREAM_CHUNK_SIZE`` at a
+    time, so only one chunk of rows and dicts is alive at any moment.
+    """
+
+    def generate():
+        rows = db.session.execute(statement.execution_options(yield_per=STREAM_CHUNK_SIZE))
+        if output == 'json':
+            yield '['
+        chunk = []
+        first = True
+        for row in rows:
+            chunk.append(serialize(row))
+            if len(chunk) == STREAM_CHUNK_SIZE:
+                yield ('' if first or output == 'ndjson' else ',') + _encode(chunk, output)
+                first = False
+                chunk = []
+        if chunk:
+            yield ('' if first or output == 'ndjson' else ',') + _encode(chunk, output)
+        if output == 'json':
+            yield ']'
+
+    return Response(stream_with_context(generate()), mimetype=_mimetype(output))
+
+
+def stream_csv(statement, header):
+    """Stream the rows of ``statement`` as CSV, ``STREAM_CHUNK_SIZE`` rows per chunk."""
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        rows = db.session.execute(statement.execution_options(yield_per=STREAM_CHUNK_SIZE))
+        for chunk in rows.partitions():
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(stream_with_context(generate()), mimetype='text/csv')
+
+
+def _page_response(rows, column, limit, serialize, output):
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    body = _encode([serialize(row) for row in rows], output)
+    if output == 'json':
+        body = f'[{body}]'
+    response = Response(body, mimetype=_mimetype(output))
+    if has_more:
+        response.headers['X-Next-Cursor'] = str(getattr(rows[-1], column.key))
+    return response
+
+
+def page(statement, column, limit, serialize, output):
+    """Return one keyset page, with the next cursor in ``X-Next-Cursor``."""
+
+    rows = db.session.execute(statement.limit(limit + 1)).all()
+    return _page_response(rows, column, limit, serialize, output)
+
+
+def ranked_page(statement, limit, after, serialize, output):
+    """Return one page of a ranked result; the cursor is the number of rows already sent.
+
+    Ranked orders have no unique column to seek on, so this pages with
+    ``OFFSET``; it is meant for short, relevance-ordered results such as search.
+    """
+
+    offset = after or 0
+    rows = db.session.execute(statement.limit(limit + 1).offset(offset)).all()
+    body = _encode([serialize(row) for row in rows[:limit]], output)
+    if output == 'json':
+        body = f'[{body}]'
+    response = Response(body, mimetype=_mimetype(output))
+    if len(rows) > limit:
+        response.headers['X-Next-Cursor'] = str(offset + limit)
+    return response
+
+
+async def apage(statement, column, limit, serialize, output):
+    """``page`` for async views, read through an ``AsyncSession``."""
+
+    async with async_db.session() as session:
+        rows = (await session.execute(statement.limit(limit + 1))).all()
+    return _page_response(rows, column, limit, serialize, output)
+
+
+def astream(statement, serialize, output):
+    """``stream`` for async views; the body is an async generator served by ``AsyncApp``."""
+
+    async def generate():
+        async with async_db.session() as session:
+            result = await session.stream(statement.execution_options(yield_per=STREAM_CHUNK_SIZE))
+            if output == 'json':
+                yield '['
+            first = True
+            async for rows in result.partitions():
+                yield ('' if first or output == 'ndjson' else ',') + _encode(map(serialize, rows), output)
+                first = False
+            if output == 'json':
+                yield ']'
+
+    return Response(generate(), mimetype=_mimetype(output))
@@ -0,0 +1,92 @@
+"""Routing of the read-only endpoints to a replica database.
+
+With a ``replica`` entry in ``SQLALCHEMY_BINDS`` (set from
+``DATABASE_REPLICA_URL``), views decorated with :meth:`Replicas.reads` run
+their queries on that bind. Everything else, including the capacity checks
+of the write endpoints and the loading of the capacity rules, stays on the
+primary (``db.engine``).
+
+Every successful write sets the ``REPLICA_STICKY_COOKIE`` cookie for
+``REPLICA_STICKY_SECONDS``. While a client sends it back, its reads go to the
+primary too, so it sees its own writes despite the replication lag.
+"""
+
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+STICKY_COOKIE = 'read_primary'
+STICKY_SECONDS = 10
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def reading_replica():
+    """Whether the current view runs its queries on the replica."""
+
+    return has_app_context() and g.get('_read_replica', False)
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session sending the queries of replica views to the ``replica`` bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and reading_replica():
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class Replicas:
+    """Flask extension marking replica reads and pinning writers to the primary."""
+
+    def init_app(self, app):
+        from .extensions import db
+
+        # La réplica copia las tablas de la primaria: create_all/drop_all no la tocan
+        db.metadatas.pop(REPLICA_BIND, None)
+        if REPLICA_BIND in (app.config.get('SQLALCHEMY_BINDS') or {}):
+            app.after_request(self._pin)
+
+    @property
+    def enabled(self):
+        return REPLICA_BIND in (current_app.config.get('SQLALCHEMY_BINDS') or {})
+
+    def pinned(self):
+        """Whether this client wrote recently and must read from the primary."""
+
+        return self.enabled and STICKY_COOKIE in request.cookies
+
+    def reads(self, view):
+        """Run the queries of ``view`` on the replica, unless the client is pinned."""
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if self.enabled and not self.pinned():
+                g._read_replica = True
+            return view(*args, **kwargs)
+        return wrapper
+
+    def _pin(self, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE, '1', httponly=True, samesite='Lax',
+                max_age=current_app.config.get('REPLICA_STICKY_SECONDS', STICKY_SECONDS),
+            )
+        return response
+
+
+def sync_sqlite_replica():
+    """Copy the primary SQLite database onto the replica file (for local testing)."""
+
+    from .extensions import db
+
+    primary, replica = db.engine, db.engines[REPLICA_BIND]
+    if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        raise RuntimeError("La copia de la réplica solo funciona entre dos archivos SQLite")
+    source, target = primary.raw_connection(), replica.raw_connection()
+    try:
+        source.driver_connection.backup(target.driver_connection)
+    finally:
+        source.close()
+        target.close()
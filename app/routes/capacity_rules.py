@@ -0,0 +1,99 @@
+"""Endpoints to manage the capacity rules (tables and caps per restaurant and date)."""
+
+from flask import Blueprint, request, abort
+from app.models import CapacityRule, Restaurant
+from app.schema_cache import build_schema, cached_schema
+from app.extensions import capacity_rules, db
+from app.capacity import RESTAURANT_NOT_FOUND
+from marshmallow import ValidationError
+from sqlalchemy import select
+from werkzeug.exceptions import HTTPException
+
+capacity_rules_bp = Blueprint('capacity_rules', __name__, url_prefix='/capacity-rules')
+
+LIMIT_FIELDS = ('max_tables', 'max_per_restaurant', 'max_per_day')
+
+
+def _check_rule(rule):
+    """Reject rules without limits, duplicated scopes or unknown restaurants."""
+
+    if all(getattr(rule, field) is None for field in LIMIT_FIELDS):
+        abort(400, description=f"Debes indicar al menos uno de: {', '.join(LIMIT_FIELDS)}")
+    if rule.restaurant_id is not None:
+        if rule.max_per_day is not None:
+            abort(400, description="'max_per_day' solo aplica a reglas sin restaurante")
+        if db.session.get(Restaurant, rule.restaurant_id) is None:
+            abort(400, description=RESTAURANT_NOT_FOUND)
+    duplicate = db.session.scalar(
+        select(CapacityRule.id)
+        .where(CapacityRule.restaurant_id.is_not_distinct_from(rule.restaurant_id))
+        .where(CapacityRule.date.is_not_distinct_from(rule.date))
+        .where(CapacityRule.id.is_distinct_from(rule.id))
+    )
+    if duplicate is not None:
+        abort(409, description=f"Ya existe la regla {duplicate} para ese restaurante y fecha")
+
+# LISTAR
+@capacity_rules_bp.route('', methods=['GET'])
+def list_capacity_rules():
+    rules = db.session.scalars(select(CapacityRule).order_by(CapacityRule.id)).all()
+    return cached_schema('CapacityRuleSchema', many=True).dump(rules), 200
+
+# CREAR
+@capacity_rules_bp.route('', methods=['POST'])
+def create_capacity_rule():
+    try:
+        with db.session.no_autoflush:
+            rule = cached_schema('CapacityRuleSchema').load(request.json or {}, session=db.session)
+            _check_rule(rule)
+        db.session.add(rule)
+        db.session.commit()
+        capacity_rules.invalidate()
+        return cached_schema('CapacityRuleSchema').dump(rule), 201
+    except ValidationError as err:
+        abort(400, description=err.messages)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        abort(500, description=f"Error al crear la regla de cupo. Detalle: {str(e)}")
+
+# ACTUALIZAR
+@capacity_rules_bp.route('/<int:rule_id>', methods=['PUT'])
+def update_capacity_rule(rule_id):
+    try:
+        rule = db.session.get(CapacityRule, rule_id)
+        if rule is None:
+            abort(404, description="Regla de cupo no encontrada")
+        with db.session.no_autoflush:
+            # Esquema propio: con 'instance' no se puede usar el compartido
+            build_schema('CapacityRuleSchema').load(
+                request.json or {}, instance=rule, session=db.session, partial=True
+            )
+            _check_rule(rule)
+        db.session.commit()
+        capacity_rules.invalidate()
+        return cached_schema('CapacityRuleSchema').dump(rule), 200
+    except ValidationError as err:
+        db.session.rollback()
+        abort(400, description=err.messages)
+    except HTTPException as http_exc:
+        db.session.rollback()
+        raise http_exc
+    except Exception as e:
+        abort(500, description=f"Error al actualizar la regla de cupo. Detalle: {str(e)}")
+
+# ELIMINAR
+@capacity_rules_bp.route('/<int:rule_id>', methods=['DELETE'])
+def delete_capacity_rule(rule_id):
+    try:
+        rule = db.session.get(CapacityRule, rule_id)
+        if rule is None:
+            abort(404, description="Regla de cupo no encontrada")
+        db.session.delete(rule)
+        db.session.commit()
+        capacity_rules.invalidate()
+        return {"message": "Regla de cupo eliminada"}, 200
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        abort(500, description=f"Error al eliminar la regla de cupo. Detalle: {str(e)}")
@@ -0,0 +1,94 @@
+"""Aggregated reports computed in the database."""
+
+from flask import Blueprint, request, abort
+from app.models import Reservation, Restaurant
+from app.extensions import db, replicas
+from app.serializers import compile_serializer
+from app.pagination import stream, stream_csv
+from app.validators import parse_date
+from sqlalchemy import distinct, func, select
+from werkzeug.exceptions import HTTPException
+
+reports_bp = Blueprint('reports', __name__, url_prefix='/reports')
+
+MAX_REPORT_DAYS = 366
+REPORT_FORMATS = ('json', 'ndjson', 'csv', 'columnar')
+
+RESERVATIONS = func.count().label('reservations')
+RESTAURANTS = func.count(distinct(Reservation.restaurant_id)).label('restaurants')
+DAYS = func.count(distinct(Reservation.date)).label('days')
+TABLES = func.count(distinct(Reservation.table_number)).label('tables')
+
+# Columnas de cada agrupación: primero las claves del GROUP BY, después los agregados
+OCCUPANCY_GROUPS = {
+    'restaurant': (
+        (Reservation.restaurant_id, Restaurant.name, Restaurant.city),
+        (RESERVATIONS, DAYS, TABLES),
+    ),
+    'city': ((Restaurant.city,), (RESTAURANTS, RESERVATIONS, DAYS)),
+    'day': ((Reservation.date,), (RESTAURANTS, RESERVATIONS)),
+}
+
+
+def _report_range():
+    """Read and validate the required ``from``/``to`` dates of a report."""
+
+    start = parse_date(request.args.get('from'), 'from')
+    end = parse_date(request.args.get('to'), 'to')
+    if end < start:
+        abort(400, description="'to' debe ser igual o posterior a 'from'")
+    if (end - start).days >= MAX_REPORT_DAYS:
+        abort(400, description=f"El rango no puede superar {MAX_REPORT_DAYS} días")
+    return start, end
+
+
+def occupancy_statement(group_by, start, end):
+    """One ``GROUP BY`` over the reservations of ``[start, end]``, joined to their restaurant."""
+
+    keys, aggregates = OCCUPANCY_GROUPS[group_by]
+    return (
+        select(*keys, *aggregates)
+        .join(Restaurant, Reservation.restaurant_id == Restaurant.id)
+        .where(Reservation.date.between(start, end))
+        .group_by(*keys)
+        .order_by(*keys)
+    )
+
+
+def _columnar(statement, columns):
+    """Return the rows as one array per column: ``{"column": [values...]}``."""
+
+    serialize = compile_serializer(columns)
+    data = {column.key: [] for column in columns}
+    for row in db.session.execute(statement):
+        for key, value in serialize(row).items():
+            data[key].append(value)
+    return data
+
+# OCUPACIÓN por restaurante, ciudad o día
+@reports_bp.route('/occupancy', methods=['GET'])
+@replicas.reads
+def occupancy_report():
+    for key in request.args.keys():
+        if key not in ('from', 'to', 'group_by', 'format'):
+            abort(400, description=f"Filtro no soportado: {key}")
+    start, end = _report_range()
+    group_by = request.args.get('group_by', 'restaurant')
+    if group_by not in OCCUPANCY_GROUPS:
+        abort(400, description=f"'group_by' debe ser uno de: {', '.join(OCCUPANCY_GROUPS)}")
+    output = request.args.get('format', 'json')
+    if output not in REPORT_FORMATS:
+        abort(400, description=f"Formato no soportado: {output}")
+    try:
+        statement = occupancy_statement(group_by, start, end)
+        keys, aggregates = OCCUPANCY_GROUPS[group_by]
+        columns = keys + aggregates
+        if output == 'csv':
+            return stream_csv(statement, [column.key for column in columns])
+        if output == 'columnar':
+            return _columnar(statement, columns), 200
+        return stream(statement, compile_serializer(columns), output)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        abort(500, description=f"Error al calcular el reporte de ocupación. Detalle: {str(e)}")
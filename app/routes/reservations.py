@@ -1,57 +1,74 @@
-from flask import Blueprint, request, jsonify, abort
-from app.models import Reservation, Restaurant
-from app.schemas import ReservationSchema
-from app.extensions import db
+from flask import Blueprint, Response, current_app, request, abort, stream_with_context
+from app.models import Hold, Reservation, Restaurant
+from app.schema_cache import cached_schema
+from app.serializers import (
+    RESERVATION_COLUMNS, restaurant_columns, serialize_change, serialize_hold, serialize_reservation,
+    serialize_reservation_with_restaurant,
+)
+from app.extensions import async_db, capacity_rules, db, group_commit, idempotency, replicas
+from app.async_db import variant_of
+from app.pagination import apage, astream, keyset, page, page_args, stream
+from app.validators import parse_date, parse_int
+from app.changes import changes_statement, latest_statement, next_cursor, sse_event
+from app.capacity import (
+    TABLE_RANGE, CapacityError, admit_many, admit_reservation, cancel_reservation,
+    confirm_hold, move_reservation, place_hold, release_hold,
+)
 from marshmallow import ValidationError
+from sqlalchemy import select
 from werkzeug.exceptions import HTTPException
+import asyncio
+import json
+import time
 import traceback
 
 reservations_bp = Blueprint('reservations', __name__, url_prefix='/reservations')
 
+MAX_BULK_ITEMS = 1000
+
+
+def _candidate(data):
+    """Validate a creation payload and return ``(restaurant_id, date, table_number)``.
+
+    Aborts with 400 on missing fields or an out-of-range table and raises
+    ``ValidationError`` for values of the wrong type.
+    """
+
+    if not isinstance(data, dict) or "restaurant_id" not in data or "date" not in data or "table_number" not in data:
+        abort(400, description="Debes enviar 'restaurant_id', 'date' y 'table_number'")
+
+    # Mismas comprobaciones de tipo que al actualizar (ver update_reservation)
+    data = dict(
+        data,
+        restaurant_id=parse_int(data['restaurant_id'], 'restaurant_id'),
+        table_number=parse_int(data['table_number'], 'table_number'),
+    )
+    candidate = cached_schema('ReservationSchema', transient=True).load(data)
+
+    # Validar número de mesa según las reglas del restaurante para esa fecha
+    max_tables = capacity_rules.current().tables(candidate.restaurant_id, candidate.date)
+    if not (1 <= candidate.table_number <= max_tables):
+        abort(400, description=TABLE_RANGE.format(max_tables=max_tables))
+    return candidate.restaurant_id, candidate.date, candidate.table_number
+
 # CREAR
 @reservations_bp.route('', methods=['POST'])
+@idempotency.idempotent
 def create_reservation():
     try:
-        data = request.json
-        if not data or "restaurant_id" not in data or "date" not in data or "table_number" not in data:
-            abort(400, description="Debes enviar 'restaurant_id', 'date' y 'table_number'")
-
-        restaurant_id = data['restaurant_id']
-        date = data['date']
-        table_number = data['table_number']
-
-        # Validar que el restaurante exista
-        restaurant = Restaurant.query.get(restaurant_id)
-        if not restaurant:
-            abort(400, description="El restaurante no existe")
-
-        # Validar número de mesa
-        if not isinstance(table_number, int) or not (1 <= table_number <= 15):
-            abort(400, description="El número de mesa debe estar entre 1 y 15")
-
-        # Validar que esa mesa no esté reservada ese día
-        existing_reservation = Reservation.query.filter_by(
-            restaurant_id=restaurant_id, date=date, table_number=table_number
-        ).first()
-        if existing_reservation:
-            abort(400, description=f"La mesa {table_number} ya está reservada para ese restaurante en esa fecha")
-
-        # Validar máximo 15 reservas por restaurante y día
-        count_by_rest = Reservation.query.filter_by(restaurant_id=restaurant_id, date=date).count()
-        if count_by_rest >= 15:
-            abort(400, description="No hay más cupo en este restaurante para esa fecha")
-
-        # Validar máximo 20 reservas globales por día
-        total_by_day = Reservation.query.filter_by(date=date).count()
-        if total_by_day >= 20:
-            abort(400, description="No hay más cupo total para esa fecha")
-
-        schema = ReservationSchema()
-        reservation = schema.load(data, session=db.session)
-        db.session.add(reservation)
-        db.session.commit()
-        return schema.dump(reservation), 201
+        restaurant_id, reservation_date, table_number = _candidate(request.json)
 
+        if group_commit.enabled:
+            # Se confirma junto con las demás reservas que llegan en la misma ventana
+            reservation = group_commit.admit(restaurant_id, reservation_date, table_number)
+        else:
+            # Reclamar el cupo en los contadores e insertar la reserva
+            reservation = admit_reservation(restaurant_id, reservation_date, table_number)
+            db.session.commit()
+        return serialize_reservation(reservation), 201
+
+    except CapacityError as err:
+        abort(400, description=err.description)
     except ValidationError as err:
         abort(400, description=err.messages)
     except HTTPException as http_exc:
@@ -60,64 +77,292 @@ def create_reservation():
         traceback.print_exc()
         abort(500, description=f"Error al crear la reserva. Detalle: {str(e)}")
 
+# RETENER: ocupa el cupo unos minutos mientras el cliente confirma
+@reservations_bp.route('/holds', methods=['POST'])
+@idempotency.idempotent
+def create_hold():
+    try:
+        restaurant_id, reservation_date, table_number = _candidate(request.json)
+        hold = place_hold(
+            restaurant_id, reservation_date, table_number, current_app.config['HOLD_TTL_SECONDS']
+        )
+        db.session.commit()
+        return serialize_hold(hold), 201
+
+    except CapacityError as err:
+        abort(400, description=err.description)
+    except ValidationError as err:
+        abort(400, description=err.messages)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        traceback.print_exc()
+        abort(500, description=f"Error al retener la mesa. Detalle: {str(e)}")
+
+# CONFIRMAR RETENCIÓN
+@reservations_bp.route('/holds/<int:hold_id>/confirm', methods=['POST'])
+def confirm_reservation_hold(hold_id):
+    try:
+        reservation = confirm_hold(hold_id)
+        if reservation is None:
+            db.session.rollback()
+            if db.session.get(Hold, hold_id) is None:
+                abort(404, description="Retención no encontrada")
+            abort(410, description="La retención expiró")
+        db.session.commit()
+        return serialize_reservation(reservation), 201
+
+    except CapacityError as err:
+        abort(400, description=err.description)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        traceback.print_exc()
+        abort(500, description=f"Error al confirmar la retención. Detalle: {str(e)}")
+
+# LIBERAR RETENCIÓN
+@reservations_bp.route('/holds/<int:hold_id>', methods=['DELETE'])
+def delete_hold(hold_id):
+    try:
+        if not release_hold(hold_id):
+            abort(404, description="Retención no encontrada")
+        db.session.commit()
+        return {"message": "Retención liberada"}, 200
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        traceback.print_exc()
+        abort(500, description=f"Error al liberar la retención. Detalle: {str(e)}")
+
+def _bulk_items():
+    """Read the batch as a JSON array or, with ``application/x-ndjson``, one object per line."""
+
+    if request.mimetype == 'application/x-ndjson':
+        items = []
+        for number, line in enumerate(request.stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                abort(400, description=f"Línea {number} no es JSON válido")
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            abort(400, description="Debes enviar una lista de reservas")
+    if not items or len(items) > MAX_BULK_ITEMS:
+        abort(400, description=f"La carga debe tener entre 1 y {MAX_BULK_ITEMS} reservas")
+    return items
+
+# CARGA MASIVA
+@reservations_bp.route('/bulk', methods=['POST'])
+def bulk_create_reservations():
+    try:
+        items = _bulk_items()
+        results = [None] * len(items)
+        candidates = []
+        positions = []
+        for index, data in enumerate(items):
+            try:
+                candidates.append(_candidate(data))
+                positions.append(index)
+            except HTTPException as err:
+                results[index] = {"index": index, "status": 400, "error": err.description}
+            except ValidationError as err:
+                results[index] = {"index": index, "status": 400, "error": err.messages}
+
+        # Un solo snapshot de los cupos y un solo executemany para toda la carga
+        outcomes = admit_many(candidates) if candidates else []
+        db.session.commit()
+        for index, outcome in zip(positions, outcomes):
+            if isinstance(outcome, str):
+                results[index] = {"index": index, "status": 400, "error": outcome}
+            else:
+                results[index] = {"index": index, "status": 201, "reservation": serialize_reservation(outcome)}
+
+        created = sum(1 for result in results if result["status"] == 201)
+        return {"created": created, "rejected": len(results) - created, "results": results}, 200
+
+    except CapacityError as err:
+        abort(409, description=err.description)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        traceback.print_exc()
+        abort(500, description=f"Error en la carga masiva de reservas. Detalle: {str(e)}")
+
+def _filtered_reservations():
+    """Build the ``GET /reservations`` query and its serializer from the query string."""
+
+    expand = request.args.get('expand')
+    if expand is None:
+        statement = select(*RESERVATION_COLUMNS)
+        serialize = serialize_reservation
+    elif expand == 'restaurant':
+        # El restaurante llega en la misma consulta (JOIN), sin una petición por reserva
+        statement = select(*RESERVATION_COLUMNS, *restaurant_columns()).join(
+            Restaurant, Reservation.restaurant_id == Restaurant.id
+        )
+        serialize = serialize_reservation_with_restaurant
+    else:
+        abort(400, description=f"Expansión no soportada: {expand}")
+    restaurant_id = request.args.get('restaurant_id', type=int)
+    reservation_date = request.args.get('date')
+    table_number = request.args.get('table_number', type=int)
+
+    if restaurant_id is not None:
+        statement = statement.where(Reservation.restaurant_id == restaurant_id)
+    if reservation_date:
+        statement = statement.where(Reservation.date == parse_date(reservation_date))
+    if table_number is not None:
+        statement = statement.where(Reservation.table_number == table_number)
+    return statement, serialize
+
 # LISTAR
 @reservations_bp.route('', methods=['GET'])
+@replicas.reads
 def list_reservations():
     try:
-        query = Reservation.query
-        restaurant_id = request.args.get('restaurant_id', type=int)
-        date = request.args.get('date')
-        table_number = request.args.get('table_number', type=int)
+        statement, serialize = _filtered_reservations()
 
-        if restaurant_id is not None:
-            query = query.filter_by(restaurant_id=restaurant_id)
-        if date:
-            query = query.filter_by(date=date)
-        if table_number is not None:
-            query = query.filter_by(table_number=table_number)
+        # Paginación por cursor (id) o streaming por bloques si no hay 'limit'
+        limit, after, output = page_args()
+        statement = keyset(statement, Reservation.id, after)
+        if limit is None:
+            return stream(statement, serialize, output)
+        return page(statement, Reservation.id, limit, serialize, output)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        traceback.print_exc()
+        abort(500, description=f"Error al listar las reservas. Detalle: {str(e)}")
 
-        reservations = query.all()
-        schema = ReservationSchema(many=True)
-        return jsonify(schema.dump(reservations)), 200
+# LISTAR (modo ASGI, con AsyncSession)
+@variant_of(list_reservations)
+@replicas.reads
+async def list_reservations_async():
+    try:
+        statement, serialize = _filtered_reservations()
+        limit, after, output = page_args()
+        statement = keyset(statement, Reservation.id, after)
+        if limit is None:
+            return astream(statement, serialize, output)
+        return await apage(statement, Reservation.id, limit, serialize, output)
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
         traceback.print_exc()
         abort(500, description=f"Error al listar las reservas. Detalle: {str(e)}")
 
+def _change_filters():
+    """Read ``since`` (or the SSE ``Last-Event-ID``), ``restaurant_id`` and ``date`` for the change feed."""
+
+    since = request.headers.get('Last-Event-ID', request.args.get('since'))
+    if since is not None:
+        if not since.isdigit():
+            abort(400, description="'since' debe ser un número de secuencia")
+        since = int(since)
+    reservation_date = request.args.get('date')
+    reservation_date = parse_date(reservation_date) if reservation_date else None
+    return since, request.args.get('restaurant_id', type=int), reservation_date
+
+# CAMBIOS desde una secuencia (sincronización incremental)
+@reservations_bp.route('/changes', methods=['GET'])
+def list_changes():
+    since, restaurant_id, reservation_date = _change_filters()
+    try:
+        head = db.session.scalar(latest_statement())
+        if since is None:
+            # Sin 'since' solo se devuelve la posición actual desde la que seguir
+            return {"changes": [], "last_seq": head}, 200
+        rows = db.session.execute(changes_statement(since, head, restaurant_id, reservation_date)).all()
+        return {"changes": [serialize_change(row) for row in rows], "last_seq": next_cursor(rows, head)}, 200
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        traceback.print_exc()
+        abort(500, description=f"Error al listar los cambios. Detalle: {str(e)}")
+
+# CAMBIOS como Server-Sent Events; el cliente se reconecta con Last-Event-ID al cerrarse
+@reservations_bp.route('/changes/stream', methods=['GET'])
+def stream_changes():
+    since, restaurant_id, reservation_date = _change_filters()
+    interval = current_app.config['CHANGES_POLL_INTERVAL']
+    deadline = time.monotonic() + current_app.config['CHANGES_STREAM_TIMEOUT']
+
+    def generate():
+        cursor = db.session.scalar(latest_statement()) if since is None else since
+        yield f"retry: {int(interval * 1000)}\n\n"
+        while True:
+            head = db.session.scalar(latest_statement())
+            rows = db.session.execute(changes_statement(cursor, head, restaurant_id, reservation_date)).all()
+            # No retener la conexión entre sondeos
+            db.session.close()
+            for row in rows:
+                yield sse_event(row)
+            cursor = next_cursor(rows, head)
+            if time.monotonic() >= deadline:
+                return
+            if not rows:
+                yield ": sin cambios\n\n"
+                time.sleep(interval)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+# CAMBIOS como Server-Sent Events (modo ASGI: esperar no ocupa un hilo)
+@variant_of(stream_changes)
+async def stream_changes_async():
+    since, restaurant_id, reservation_date = _change_filters()
+    interval = current_app.config['CHANGES_POLL_INTERVAL']
+    deadline = time.monotonic() + current_app.config['CHANGES_STREAM_TIMEOUT']
+
+    async def generate():
+        cursor = since
+        yield f"retry: {int(interval * 1000)}\n\n"
+        while True:
+            async with async_db.session() as session:
+                head = await session.scalar(latest_statement())
+                if cursor is None:
+                    cursor = head
+                rows = (await session.execute(
+                    changes_statement(cursor, head, restaurant_id, reservation_date)
+                )).all()
+            for row in rows:
+                yield sse_event(row)
+            cursor = next_cursor(rows, head)
+            if time.monotonic() >= deadline:
+                return
+            if not rows:
+                yield ": sin cambios\n\n"
+                await asyncio.sleep(interval)
+
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
 # ACTUALIZAR
 @reservations_bp.route('/<int:reservation_id>', methods=['PUT'])
 def update_reservation(reservation_id):
     try:
-        reservation = Reservation.query.get(reservation_id)
-        if not reservation:
-            abort(404, description="Reserva no encontrada")
-        data = request.json
-
-        if 'restaurant_id' in data:
-            reservation.restaurant_id = data['restaurant_id']
-        if 'date' in data:
-            reservation.date = data['date']
-        if 'table_number' in data:
-            table_number = data['table_number']
-            if not isinstance(table_number, int) or not (1 <= table_number <= 15):
-                abort(400, description="El número de mesa debe estar entre 1 y 15")
-            # Validar disponibilidad
-            existing_reservation = Reservation.query.filter_by(
-                restaurant_id=reservation.restaurant_id,
-                date=reservation.date,
-                table_number=table_number
-            ).filter(Reservation.id != reservation.id).first()
-            if existing_reservation:
-                abort(400, description=f"La mesa {table_number} ya está reservada para ese restaurante en esa fecha")
-            reservation.table_number = table_number
+        data = request.json or {}
+        if not isinstance(data, dict):
+            abort(400, description="Debes enviar un objeto JSON con los campos a cambiar")
+        restaurant_id = data.get('restaurant_id')
+        if restaurant_id is not None:
+            restaurant_id = parse_int(restaurant_id, 'restaurant_id')
+        reservation_date = parse_date(data['date']) if 'date' in data else None
+        table_number = data.get('table_number')
+        if table_number is not None:
+            table_number = parse_int(table_number, 'table_number')
 
+        # Mover la reserva libera su cupo y ocupa uno nuevo, con los mismos topes que al crear
+        reservation = move_reservation(reservation_id, restaurant_id, reservation_date, table_number)
+        if reservation is None:
+            abort(404, description="Reserva no encontrada")
         db.session.commit()
-        schema = ReservationSchema()
-        return schema.dump(reservation), 200
+        return serialize_reservation(reservation), 200
 
-    except ValidationError as err:
-        abort(400, description=err.messages)
+    except CapacityError as err:
+        abort(400, description=err.description)
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
@@ -128,10 +373,8 @@ def update_reservation(reservation_id):
 @reservations_bp.route('/<int:reservation_id>', methods=['DELETE'])
 def delete_reservation(reservation_id):
     try:
-        reservation = Reservation.query.get(reservation_id)
-        if not reservation:
+        if not cancel_reservation(reservation_id):
             abort(404, description="Reserva no encontrada")
-        db.session.delete(reservation)
         db.session.commit()
         return {"message": "Reserva eliminada"}, 200
     except HTTPException as http_exc:
@@ -1,48 +1,139 @@
 """Endpoints related to restaurant management."""
 
-from flask import Blueprint, request, jsonify, abort
-from app.models import Restaurant
-from app.schemas import RestaurantSchema
-from app.extensions import db
+from flask import Blueprint, request, abort
+from app.models import CapacityRule, DailyCapacity, Hold, Reservation, Restaurant
+from app.schema_cache import cached_schema
+from app.serializers import (
+    compile_serializer, restaurant_columns, serialize_restaurant, serialize_restaurant_instance,
+)
+from app.extensions import async_db, capacity_rules, db, replicas, response_cache
+from app.async_db import variant_of
+from app.capacity import availability, availability_days, availability_statement
+from app.pagination import DEFAULT_PAGE_SIZE, keyset, page, page_args, ranked_page, stream
+from app.search import index_restaurant, search_statement, search_terms, unindex_restaurant
+from app.validators import parse_date
 from marshmallow import ValidationError
+from sqlalchemy import delete, exists, func, select, update
 from werkzeug.exceptions import HTTPException
 
 restaurants_bp = Blueprint('restaurants', __name__, url_prefix='/restaurants')
 
-# LISTAR (con filtros)
+RESTAURANT_FIELDS = ('id', 'name', 'description', 'address', 'city', 'image_url')
+RESTAURANTS_CACHE = 'restaurants'
+MAX_AVAILABILITY_DAYS = 92
+INCLUDES = ('reservations_count',)
+
+# Subconsulta correlacionada: cuenta solo las reservas de los restaurantes de la página,
+# por el índice único (restaurant_id, date, table_number)
+RESERVATIONS_COUNT = (
+    select(func.count())
+    .where(Reservation.restaurant_id == Restaurant.id)
+    .correlate(Restaurant)
+    .scalar_subquery()
+    .label('reservations_count')
+)
+
+
+def _prefix_pattern(prefix):
+    """Build a ``LIKE`` pattern for names starting with ``prefix``.
+
+    The pattern is bound as a single parameter (instead of ``startswith``'s
+    ``:p || '%'``) so the backend can turn it into an index range scan.
+    """
+
+    escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"{escaped}%"
+
+
+def _projection(fields):
+    """Validate the ``fields`` parameter; ``id`` is always included for the cursor."""
+
+    if not fields:
+        return None
+    requested = [field for field in fields.split(',') if field]
+    unknown = [field for field in requested if field not in RESTAURANT_FIELDS]
+    if unknown:
+        abort(400, description=f"Campo no soportado: {', '.join(unknown)}")
+    return ['id'] + [field for field in requested if field != 'id']
+
+
+def _includes(include):
+    """Validate the ``include`` parameter and return the extra columns it adds."""
+
+    if not include:
+        return ()
+    requested = [name for name in include.split(',') if name]
+    unknown = [name for name in requested if name not in INCLUDES]
+    if unknown:
+        abort(400, description=f"Inclusión no soportada: {', '.join(unknown)}")
+    return (RESERVATIONS_COUNT,)
+
+
+# LISTAR (con filtros), cacheado hasta la próxima escritura; los conteos de
+# reservas cambian con cada reserva, así que 'include' no pasa por la caché,
+# y quien acaba de escribir tampoco (lee de la primaria, ver app/replicas.py)
 @restaurants_bp.route('', methods=['GET'])
+@response_cache.cached(RESTAURANTS_CACHE, unless=lambda: 'include' in request.args or replicas.pinned())
+@replicas.reads
 def list_restaurants():
-    allowed_filters = ['letra', 'ciudad']
+    allowed_filters = ['letra', 'ciudad', 'limit', 'after', 'format', 'fields', 'include']
     for key in request.args.keys():
         if key not in allowed_filters:
             abort(400, description=f"Filtro no soportado: {key}")
 
     letra = request.args.get('letra')
     ciudad = request.args.get('ciudad')
-    query = Restaurant.query
+    fields = _projection(request.args.get('fields'))
+    columns = restaurant_columns(fields) + _includes(request.args.get('include'))
+    limit, after, output = page_args()
+    # Solo se leen las columnas pedidas en 'fields'
+    statement = select(*columns)
     if letra:
-        query = query.filter(Restaurant.name.startswith(letra))
+        statement = statement.where(Restaurant.name.like(_prefix_pattern(letra), escape='\\'))
     if ciudad:
-        query = query.filter(Restaurant.city == ciudad)
+        statement = statement.where(Restaurant.city == ciudad)
     try:
-        restaurants = query.all()
-        schema = RestaurantSchema(many=True)
-        return jsonify(schema.dump(restaurants)), 200
+        statement = keyset(statement, Restaurant.id, after)
+        serialize = compile_serializer(columns)
+        if limit is None:
+            return stream(statement, serialize, output)
+        return page(statement, Restaurant.id, limit, serialize, output)
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
         abort(500, description="Error al listar los restaurantes. Detalle: " + str(e))
 
+# BUSCAR (texto completo en nombre, descripción y ciudad, por relevancia)
+@restaurants_bp.route('/search', methods=['GET'])
+@replicas.reads
+def search_restaurants():
+    for key in request.args.keys():
+        if key not in ('q', 'limit', 'after', 'format'):
+            abort(400, description=f"Filtro no soportado: {key}")
+    terms = search_terms(request.args.get('q'))
+    if not terms:
+        abort(400, description="Debes enviar 'q' con al menos una palabra")
+    limit, after, output = page_args()
+    try:
+        statement = search_statement(terms)
+        return ranked_page(statement, limit or DEFAULT_PAGE_SIZE, after, serialize_restaurant, output)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        abort(500, description=f"Error al buscar restaurantes. Detalle: {str(e)}")
+
 # CREAR
 @restaurants_bp.route('', methods=['POST'])
 def create_restaurant():
     try:
         data = request.json
-        schema = RestaurantSchema()
-        restaurant = schema.load(data, session=db.session)
+        restaurant = cached_schema('RestaurantSchema').load(data, session=db.session)
         db.session.add(restaurant)
+        db.session.flush()
+        index_restaurant(restaurant.id, restaurant.name, restaurant.description, restaurant.city)
         db.session.commit()
-        return schema.dump(restaurant), 201
+        response_cache.invalidate(RESTAURANTS_CACHE)
+        return serialize_restaurant_instance(restaurant), 201
     except ValidationError as err:
         abort(400, description=err.messages)
     except HTTPException as http_exc:
@@ -54,16 +145,20 @@ def create_restaurant():
 @restaurants_bp.route('/<int:restaurant_id>', methods=['PUT'])
 def update_restaurant(restaurant_id):
     try:
-        restaurant = Restaurant.query.get(restaurant_id)
-        if not restaurant:
+        data = request.json or {}
+        changes = {field: data[field] for field in RESTAURANT_FIELDS if field != 'id' and field in data}
+        statement = update(Restaurant.__table__).where(Restaurant.id == restaurant_id)
+        if changes:
+            statement = statement.values(**changes)
+        else:
+            statement = statement.values(id=Restaurant.id)
+        restaurant = db.session.execute(statement.returning(*restaurant_columns())).first()
+        if restaurant is None:
             abort(404, description="Restaurante no encontrado")
-        data = request.json
-        for field in ['name', 'description', 'address', 'city', 'image_url']:
-            if field in data:
-                setattr(restaurant, field, data[field])
+        index_restaurant(restaurant.id, restaurant.name, restaurant.description, restaurant.city)
         db.session.commit()
-        schema = RestaurantSchema()
-        return schema.dump(restaurant), 200
+        response_cache.invalidate(RESTAURANTS_CACHE)
+        return serialize_restaurant(restaurant), 200
     except ValidationError as err:
         abort(400, description=err.messages)
     except HTTPException as http_exc:
@@ -75,13 +170,74 @@ def update_restaurant(restaurant_id):
 @restaurants_bp.route('/<int:restaurant_id>', methods=['DELETE'])
 def delete_restaurant(restaurant_id):
     try:
-        restaurant = Restaurant.query.get(restaurant_id)
-        if not restaurant:
-            abort(404, description="Restaurante no encontrado")
-        db.session.delete(restaurant)
+        # Los contadores vacíos y las reglas de cupo se borran; si quedan reservas, el restaurante no se elimina
+        db.session.execute(
+            delete(DailyCapacity.__table__)
+            .where(DailyCapacity.restaurant_id == restaurant_id, DailyCapacity.booked_count == 0)
+        )
+        rules = db.session.execute(
+            delete(CapacityRule.__table__).where(CapacityRule.restaurant_id == restaurant_id)
+        ).rowcount
+        deleted = db.session.execute(
+            delete(Restaurant.__table__)
+            .where(Restaurant.id == restaurant_id)
+            .where(~exists().where(Reservation.restaurant_id == restaurant_id))
+            .where(~exists().where(Hold.restaurant_id == restaurant_id))
+            .returning(Restaurant.id)
+        ).first()
+        if deleted is None:
+            db.session.rollback()
+            if db.session.get(Restaurant, restaurant_id) is None:
+                abort(404, description="Restaurante no encontrado")
+            abort(409, description="El restaurante tiene reservas y no se puede eliminar")
+        unindex_restaurant(restaurant_id)
         db.session.commit()
+        response_cache.invalidate(RESTAURANTS_CACHE)
+        if rules:
+            capacity_rules.invalidate()
         return {"message": "Restaurante eliminado"}, 200
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
         abort(500, description=f"Error al eliminar el restaurante. Detalle: {str(e)}")
+
+def _availability_range():
+    """Read and validate the ``from``/``to`` dates of an availability query."""
+
+    start = parse_date(request.args.get('from'), 'from')
+    end = parse_date(request.args.get('to', request.args.get('from')), 'to')
+    if end < start:
+        abort(400, description="'to' debe ser igual o posterior a 'from'")
+    if (end - start).days >= MAX_AVAILABILITY_DAYS:
+        abort(400, description=f"El rango no puede superar {MAX_AVAILABILITY_DAYS} días")
+    return start, end
+
+# DISPONIBILIDAD
+@restaurants_bp.route('/<int:restaurant_id>/availability', methods=['GET'])
+@replicas.reads
+def restaurant_availability(restaurant_id):
+    start, end = _availability_range()
+    try:
+        if db.session.get(Restaurant, restaurant_id) is None:
+            abort(404, description="Restaurante no encontrado")
+        return {"restaurant_id": restaurant_id, "days": availability(restaurant_id, start, end)}, 200
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        abort(500, description=f"Error al consultar la disponibilidad. Detalle: {str(e)}")
+
+# DISPONIBILIDAD (modo ASGI, con AsyncSession)
+@variant_of(restaurant_availability)
+@replicas.reads
+async def restaurant_availability_async(restaurant_id):
+    start, end = _availability_range()
+    try:
+        async with async_db.session() as session:
+            if await session.get(Restaurant, restaurant_id) is None:
+                abort(404, description="Restaurante no encontrado")
+            rows = (await session.execute(availability_statement(restaurant_id, start, end))).all()
+        return {"restaurant_id": restaurant_id, "days": availability_days(restaurant_id, rows, start, end)}, 200
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        abort(500, description=f"Error al consultar la disponibilidad. Detalle: {str(e)}")
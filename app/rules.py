@@ -0,0 +1,141 @@
+"""Capacity rules per restaurant and per date, served from an in-memory cache.
+
+A rule sets any of ``max_tables``, ``max_per_restaurant`` and ``max_per_day``
+for a restaurant (``restaurant_id``), a date (``date``), both, or neither
+(the global default). Each limit is resolved independently from the most
+specific rule that sets it::
+
+    (restaurant, date) -> (restaurant, any date) -> (any restaurant, date) -> (any, any)
+
+falling back to the built-in defaults below. ``max_per_day`` is the global
+cap for a date, so it is only read from rules without a restaurant.
+
+The whole table is loaded into a :class:`RuleSet`, so lookups are a few dict
+probes. Writes call :meth:`CapacityRules.invalidate`, which bumps a version
+counter in the response-cache backend (shared between workers with Redis);
+every worker reloads when it sees a new version, or after
+``CAPACITY_RULES_MAX_AGE`` seconds at the latest. The version is only seen by
+other processes with a shared backend (``RESPONSE_CACHE_BACKEND='redis'``):
+with the default in-memory backend each process keeps its own counter, so a
+rule written through one worker reaches the others only after the max age.
+
+The version is read once per app context (a request, or a group-commit
+batch): :meth:`CapacityRules.current` keeps the resolved set in ``flask.g``,
+so a bulk request checks the backend once rather than once per reservation.
+"""
+
+import threading
+import time
+
+from flask import current_app, g
+from sqlalchemy import select
+
+MAX_TABLES = 15
+MAX_PER_RESTAURANT = 15
+MAX_PER_DAY = 20
+# tables_mask es un BIGINT con signo: solo hay 63 bits para mesas
+TABLE_BITS = 63
+
+VERSION_KEY = 'capacity_rules:version'
+
+
+class RuleSet:
+    """Immutable snapshot of the capacity rules."""
+
+    def __init__(self, rows=()):
+        self._rules = {
+            (restaurant_id, date): (max_tables, max_per_restaurant, max_per_day)
+            for restaurant_id, date, max_tables, max_per_restaurant, max_per_day in rows
+        }
+
+    def _resolve(self, position, keys, default):
+        for key in keys:
+            rule = self._rules.get(key)
+            if rule is not None and rule[position] is not None:
+                return rule[position]
+        return default
+
+    def tables(self, restaurant_id, date):
+        """Number of tables (numbered from 1) a restaurant has on ``date``."""
+
+        keys = ((restaurant_id, date), (restaurant_id, None), (None, date), (None, None))
+        return self._resolve(0, keys, MAX_TABLES)
+
+    def per_restaurant(self, restaurant_id, date):
+        """Maximum bookings of a restaurant on ``date``."""
+
+        keys = ((restaurant_id, date), (restaurant_id, None), (None, date), (None, None))
+        return self._resolve(1, keys, MAX_PER_RESTAURANT)
+
+    def per_day(self, date):
+        """Maximum bookings across every restaurant on ``date``."""
+
+        return self._resolve(2, ((None, date), (None, None)), MAX_PER_DAY)
+
+
+class RuleCache:
+    """The current :class:`RuleSet` of one app and the version it was loaded at."""
+
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self.rules = None
+        self.version = None
+        self.loaded_at = 0.0
+        self.lock = threading.Lock()
+
+    def stale(self, version):
+        return (
+            self.rules is None or self.version != version
+            or time.monotonic() - self.loaded_at > self.max_age
+        )
+
+
+class CapacityRules:
+    """Flask extension holding the rule cache of each app."""
+
+    def init_app(self, app):
+        app.extensions['capacity_rules'] = RuleCache(app.config.get('CAPACITY_RULES_MAX_AGE', 60))
+
+    def _version(self):
+        from .extensions import response_cache
+
+        return response_cache.backend.counter(VERSION_KEY)
+
+    def current(self):
+        """Return the current :class:`RuleSet`, resolved once per app context."""
+
+        rules = g.get('_capacity_rules')
+        if rules is None:
+            rules = g._capacity_rules = self._refresh()
+        return rules
+
+    def _refresh(self):
+        # Recarga la tabla si una escritura subió la versión o pasó el tiempo máximo
+        cache = current_app.extensions['capacity_rules']
+        version = self._version()
+        if cache.stale(version):
+            with cache.lock:
+                if cache.stale(version):
+                    cache.rules = self._load()
+                    cache.version = version
+                    cache.loaded_at = time.monotonic()
+        return cache.rules
+
+    def _load(self):
+        from .extensions import db
+        from .models import CapacityRule
+
+        # Las reglas deciden las escrituras: siempre se leen de la primaria
+        return RuleSet(db.session.execute(select(
+            CapacityRule.restaurant_id, CapacityRule.date, CapacityRule.max_tables,
+            CapacityRule.max_per_restaurant, CapacityRule.max_per_day,
+        ), bind_arguments={'bind': db.engine}))
+
+    def invalidate(self):
+        """Make every worker reload the rules on its next lookup."""
+
+        from .extensions import response_cache
+
+        response_cache.backend.incr(VERSION_KEY)
+        # La propia petición también ve las reglas nuevas
+        g.pop('_capacity_rules', None)
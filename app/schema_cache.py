@@ -0,0 +1,28 @@
+"""Shared schema instances, built on the first request that needs them."""
+
+from functools import lru_cache
+
+
+def build_schema(name, **options):
+    """Return a new ``app.schemas.<name>(**options)``, for loads that update an ``instance``.
+
+    ``app.schemas`` is imported here, on first use, so workers that never
+    validate a payload do not pay for marshmallow-sqlalchemy at startup.
+    """
+
+    from . import schemas
+
+    return getattr(schemas, name)(**options)
+
+
+@lru_cache(maxsize=None)
+def cached_schema(name, **options):
+    """Return a shared ``app.schemas.<name>(**options)`` instead of building one per request.
+
+    The instance is shared by every request of the process, so it must never
+    receive ``instance=``: marshmallow-sqlalchemy keeps it on the schema
+    (``self.instance``) while the load runs, and a concurrent load would
+    write its payload into that object. Use :func:`build_schema` for those.
+    """
+
+    return build_schema(name, **options)
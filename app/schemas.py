@@ -1,7 +1,19 @@
-"""Marshmallow schemas for serializing models."""
+"""Marshmallow schemas for serializing models.
 
-from .extensions import ma
-from .models import Restaurant, Reservation
+Building the auto schemas inspects the models and imports
+marshmallow-sqlalchemy, so routes get them through
+``app.schema_cache.cached_schema`` instead of importing this module.
+Loads always pass ``session=`` (or ``transient=True``), so ``ma`` is not
+bound to an app.
+"""
+
+from flask_marshmallow import Marshmallow
+from marshmallow import validate
+
+from .models import CapacityRule, Restaurant, Reservation
+from .rules import TABLE_BITS
+
+ma = Marshmallow()
 
 class RestaurantSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
@@ -14,3 +26,13 @@ class ReservationSchema(ma.SQLAlchemyAutoSchema):
         model = Reservation
         include_fk = True
         load_instance = True
+
+class CapacityRuleSchema(ma.SQLAlchemyAutoSchema):
+    class Meta:
+        model = CapacityRule
+        include_fk = True
+        load_instance = True
+
+    max_tables = ma.auto_field(validate=validate.Range(min=1, max=TABLE_BITS))
+    max_per_restaurant = ma.auto_field(validate=validate.Range(min=0))
+    max_per_day = ma.auto_field(validate=validate.Range(min=0))
@@ -0,0 +1,236 @@
+"""Ranked full-text search over restaurant name, description and city.
+
+On SQLite the text lives in the FTS5 table ``restaurants_fts`` (``rowid`` is
+the restaurant id), which the restaurant endpoints keep in sync inside their
+own transactions; ``flask restaurants reindex`` rebuilds it from scratch.
+Tokens are case- and accent-insensitive and every query term matches as a
+prefix, so ``"pizzeria bog"`` finds *Pizzería Bogotá*. Results are ordered
+by BM25, with name matches weighted highest.
+
+When no restaurant matches every term as a prefix, the search falls back to
+restaurants where every term is close to one of their words (a misspelling
+such as ``"pizeria"``): the share of the term's trigrams found in that word
+must be at least ``FUZZY_THRESHOLD``. The fallback costs more than the prefix
+match, so it only runs after a probe for an exact match comes back empty.
+On SQLite each term is first corrected against ``restaurants_fts_words``, the
+distinct indexed words under the ``trigram`` tokenizer, scored with the
+``word_similarity`` function this module registers on every SQLite
+connection; the corrected words then run through ``restaurants_fts`` as an
+ordinary ranked query. That word list only grows between reindexes: words of
+deleted restaurants stay in it and simply match nothing.
+
+On Postgres the same query runs against two GIN indexes (see ``models.py``)
+on the lowercased, ``unaccent``-ed text: its ``tsvector`` for the prefix
+matches and ``gin_trgm_ops`` for pg_trgm's ``<%`` (word similarity, with the
+default ``pg_trgm.word_similarity_threshold`` of 0.6), most similar first.
+Both need the ``unaccent`` and ``pg_trgm`` extensions, created with the table.
+"""
+
+import re
+import sqlite3
+import unicodedata
+from functools import lru_cache
+
+from sqlalchemy import DDL, column, event, func, literal, literal_column, select, table, text
+from sqlalchemy.engine import Engine
+
+from .extensions import db
+from .models import RESTAURANT_SEARCH_DOCUMENT, RESTAURANT_SEARCH_TEXT, Restaurant
+
+FTS_TABLE = 'restaurants_fts'
+VOCAB_TABLE = f'{FTS_TABLE}_vocab'
+WORDS_TABLE = f'{FTS_TABLE}_words'
+# Peso de name, description y city en el ranking BM25
+WEIGHTS = (10.0, 1.0, 5.0)
+MAX_TERMS = 8
+# Igual al pg_trgm.word_similarity_threshold por defecto de Postgres
+FUZZY_THRESHOLD = 0.6
+# Palabras parecidas que se prueban por cada término mal escrito
+MAX_CORRECTIONS = 20
+
+fts = table(FTS_TABLE, column('rowid'), column('name'), column('description'), column('city'))
+words = table(WORDS_TABLE, column('word'))
+
+CREATE_FTS = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, description, city, tokenize = 'unicode61 remove_diacritics 2')"
+)
+CREATE_VOCAB = f"CREATE VIRTUAL TABLE IF NOT EXISTS {VOCAB_TABLE} USING fts5vocab({FTS_TABLE}, 'row')"
+CREATE_WORDS = f"CREATE VIRTUAL TABLE IF NOT EXISTS {WORDS_TABLE} USING fts5(word, tokenize = 'trigram')"
+# Las palabras de menos de tres letras no tienen trigramas que buscar
+FILL_WORDS = f"INSERT INTO {WORDS_TABLE} (word) SELECT term FROM {VOCAB_TABLE} WHERE length(term) >= 3"
+# unaccent no es IMMUTABLE: esta envoltura fija el diccionario para poder indexarla
+CREATE_UNACCENT = (
+    "CREATE OR REPLACE FUNCTION search_unaccent(text) RETURNS text "
+    "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+    "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+)
+
+for statement in (CREATE_FTS, CREATE_VOCAB, CREATE_WORDS):
+    event.listen(Restaurant.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for name in (WORDS_TABLE, VOCAB_TABLE, FTS_TABLE):
+    event.listen(Restaurant.__table__, 'before_drop', DDL(f"DROP TABLE IF EXISTS {name}").execute_if(dialect='sqlite'))
+for statement in (
+    "CREATE EXTENSION IF NOT EXISTS unaccent", "CREATE EXTENSION IF NOT EXISTS pg_trgm", CREATE_UNACCENT,
+):
+    event.listen(Restaurant.__table__, 'before_create', DDL(statement).execute_if(dialect='postgresql'))
+
+
+def search_terms(query):
+    """Split ``query`` into at most ``MAX_TERMS`` word tokens, dropping punctuation."""
+
+    return re.findall(r'\w+', query or '')[:MAX_TERMS]
+
+
+def fold(value):
+    """Lowercase ``value`` and strip its accents, like ``search_unaccent(lower(...))`` on Postgres."""
+
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+@lru_cache(maxsize=4096)
+def _trigrams(word):
+    # Como pg_trgm: dos espacios delante y uno detrás de cada palabra
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def word_similarity(term, document):
+    """Share of the trigrams of ``term`` found in the closest word of ``document`` (0 to 1)."""
+
+    if not term or document is None:
+        return 0.0
+    wanted = _trigrams(term)
+    shared = max((len(wanted & _trigrams(word)) for word in re.findall(r'\w+', document)), default=0)
+    return shared / len(wanted)
+
+
+@event.listens_for(Engine, 'connect')
+def _register_word_similarity(dbapi_connection, connection_record):
+    # A nivel de clase: cubre la primaria y la réplica, que también sirve búsquedas
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function('word_similarity', 2, word_similarity, deterministic=True)
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def search_statement(terms):
+    """Restaurants matching every term as a prefix, best ranked first; if none does, those close to every term."""
+
+    terms = [fold(term) for term in terms]
+    restaurants = Restaurant.__table__
+    if _dialect() == 'postgresql':
+        document = literal_column(RESTAURANT_SEARCH_DOCUMENT)
+        search_text = literal_column(RESTAURANT_SEARCH_TEXT)
+        query = func.to_tsquery('simple', ' & '.join(f"{term}:*" for term in terms))
+        exact = (
+            select(*restaurants.c)
+            .where(document.op('@@')(query))
+            .order_by(func.ts_rank(document, query).desc(), Restaurant.id)
+        )
+        if _found(exact):
+            return exact
+        similarity = func.word_similarity(terms[0], search_text)
+        for term in terms[1:]:
+            similarity = similarity + func.word_similarity(term, search_text)
+        return (
+            select(*restaurants.c)
+            .where(*(literal(term).op('<%')(search_text) for term in terms))
+            .order_by(similarity.desc(), Restaurant.id)
+        )
+
+    exact = _ranked(' '.join('"{}"*'.format(term) for term in terms))
+    if _found(exact):
+        return exact
+    # Cada término pasa a ser cualquiera de sus palabras parecidas; sin ninguna, no hay resultados
+    return _ranked(' AND '.join(_corrections(term) for term in terms))
+
+
+def _ranked(match):
+    ranked = (
+        select(fts.c.rowid, func.bm25(literal_column(FTS_TABLE), *WEIGHTS).label('rank'))
+        .where(literal_column(FTS_TABLE).op('MATCH')(match))
+        .subquery()
+    )
+    return (
+        select(*Restaurant.__table__.c)
+        .join(ranked, ranked.c.rowid == Restaurant.id)
+        .order_by(ranked.c.rank, Restaurant.id)
+    )
+
+
+def _found(statement):
+    return db.session.execute(statement.limit(1)).first() is not None
+
+
+def _corrections(term):
+    """FTS5 query matching any indexed word close to ``term``, or ``term`` itself as a prefix."""
+
+    grams = sorted(gram for gram in _trigrams(term) if ' ' not in gram)
+    if not grams:
+        return '"{}"*'.format(term)
+    similarity = func.word_similarity(term, words.c.word)
+    close = db.session.scalars(
+        select(words.c.word)
+        .where(literal_column(WORDS_TABLE).op('MATCH')(' OR '.join(f'"{gram}"' for gram in grams)))
+        .where(similarity >= FUZZY_THRESHOLD)
+        .order_by(similarity.desc(), words.c.word)
+        .limit(MAX_CORRECTIONS)
+    ).all()
+    return '({})'.format(' OR '.join(f'"{word}"' for word in close) or '"{}"'.format(term))
+
+
+def _add_words(name, description, city):
+    # Solo las palabras nuevas: la tabla de palabras no tiene claves únicas
+    found = {
+        word for word in re.findall(r'[^\W_]+', fold(' '.join(value or '' for value in (name, description, city))))
+        if len(word) >= 3
+    }
+    if not found:
+        return
+    known = db.session.scalars(
+        select(words.c.word)
+        .where(literal_column(WORDS_TABLE).op('MATCH')(' OR '.join(f'"{word}"' for word in sorted(found))))
+        .where(words.c.word.in_(found))
+    ).all()
+    new = sorted(found.difference(known))
+    if new:
+        db.session.execute(words.insert(), [{'word': word} for word in new])
+
+
+def index_restaurant(restaurant_id, name, description, city):
+    """Add or replace a restaurant in the search index. The caller commits."""
+
+    if _dialect() != 'sqlite':
+        return
+    unindex_restaurant(restaurant_id)
+    db.session.execute(fts.insert().values(rowid=restaurant_id, name=name, description=description, city=city))
+    _add_words(name, description, city)
+
+
+def unindex_restaurant(restaurant_id):
+    """Remove a restaurant from the search index. The caller commits."""
+
+    if _dialect() != 'sqlite':
+        return
+    db.session.execute(fts.delete().where(fts.c.rowid == restaurant_id))
+
+
+def rebuild_index():
+    """Rebuild the whole search index from ``restaurants``; returns the rows indexed. The caller commits."""
+
+    if _dialect() != 'sqlite':
+        return db.session.scalar(select(func.count()).select_from(Restaurant))
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    indexed = db.session.execute(
+        fts.insert().from_select(
+            ['rowid', 'name', 'description', 'city'],
+            select(Restaurant.id, Restaurant.name, Restaurant.description, Restaurant.city),
+        )
+    ).rowcount
+    db.session.execute(text(f"DELETE FROM {WORDS_TABLE}"))
+    db.session.execute(text(FILL_WORDS))
+    return indexed
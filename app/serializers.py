@@ -0,0 +1,68 @@
+"""Precompiled row-to-dict serializers for the hot endpoints.
+
+``schema.dump`` walks every field through marshmallow's generic machinery on
+each call. These functions are generated once per column set and unpack Core
+rows positionally (or read the attributes of ORM instances), producing the
+same JSON as the auto schemas.
+"""
+
+from functools import lru_cache
+
+from sqlalchemy import Date, DateTime
+
+from .models import Hold, Reservation, ReservationChange, Restaurant
+
+
+def _iso(value):
+    return None if value is None else value.isoformat()
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(columns, instances=False):
+    """Generate ``serialize(row) -> dict`` for a tuple of table columns.
+
+    Rows must have exactly ``columns``, in order; with ``instances=True`` the
+    function reads attributes of ORM instances instead.
+    """
+
+    items = []
+    for position, column in enumerate(columns):
+        access = f"row.{column.key}" if instances else f"c{position}"
+        if isinstance(column.type, (Date, DateTime)):
+            access = f"_iso({access})"
+        items.append(f"{column.key!r}: {access}")
+    unpack = "" if instances else "".join(f"c{i}, " for i in range(len(columns))) + "= row\n    "
+    source = "def serialize(row):\n    " + unpack + "return {" + ", ".join(items) + "}\n"
+    namespace = {'_iso': _iso}
+    exec(source, namespace)
+    return namespace['serialize']
+
+
+def restaurant_columns(fields=None):
+    """Columns of ``restaurants`` to select, optionally limited to ``fields``."""
+
+    table = Restaurant.__table__
+    return tuple(table.c[field] for field in fields) if fields else tuple(table.c)
+
+
+def restaurant_serializer(fields=None):
+    return compile_serializer(restaurant_columns(fields))
+
+
+RESERVATION_COLUMNS = tuple(Reservation.__table__.c)
+serialize_reservation = compile_serializer(RESERVATION_COLUMNS)
+serialize_reservation_instance = compile_serializer(RESERVATION_COLUMNS, instances=True)
+serialize_restaurant = restaurant_serializer()
+serialize_restaurant_instance = compile_serializer(restaurant_columns(), instances=True)
+HOLD_COLUMNS = tuple(Hold.__table__.c)
+serialize_hold = compile_serializer(HOLD_COLUMNS)
+CHANGE_COLUMNS = tuple(ReservationChange.__table__.c)
+serialize_change = compile_serializer(CHANGE_COLUMNS)
+
+
+def serialize_reservation_with_restaurant(row):
+    """Serialize a row of ``RESERVATION_COLUMNS`` followed by every restaurant column."""
+
+    item = serialize_reservation(row[:len(RESERVATION_COLUMNS)])
+    item['restaurant'] = serialize_restaurant(row[len(RESERVATION_COLUMNS):])
+    return item
@@ -0,0 +1,27 @@
+"""Parsing helpers shared by the route modules."""
+
+from datetime import date
+
+from flask import abort
+
+
+def parse_date(value, name='date'):
+    """Parse an ISO ``YYYY-MM-DD`` date or abort with 400."""
+
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        abort(400, description=f"'{name}' debe tener el formato YYYY-MM-DD")
+
+
+def parse_int(value, name):
+    """Return a JSON integer (``2`` or ``2.0``) as ``int`` or abort with 400.
+
+    Booleans, fractions and numeric strings are rejected rather than coerced.
+    """
+
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        abort(400, description=f"'{name}' debe ser un número entero")
+    return value
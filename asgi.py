@@ -0,0 +1,9 @@
+"""Entry point for serving the API from an ASGI server::
+
+    uvicorn asgi:app
+"""
+
+from app import create_app
+from app.asgi import AsyncApp
+
+app = AsyncApp(create_app())
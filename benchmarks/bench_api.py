@@ -0,0 +1,264 @@
+"""Latency percentiles of the reservations API, usable as a merge gate.
+
+Seeds N restaurants and M reservations (with their capacity counters) in a
+SQLite file and runs each scenario with concurrent clients: ``create``,
+``list`` (with filters), ``update``, ``delete`` and ``contention`` (every
+client booking the same date). Requests go through the Flask test client,
+or to a running server with ``--url`` (start it on the ``--database`` file)::
+
+    python -m benchmarks.bench_api --restaurants 50 --reservations 20000 --clients 16
+    python -m benchmarks.bench_api --save baseline.json
+    python -m benchmarks.bench_api --baseline baseline.json --tolerance 1.25
+    python -m benchmarks.bench_api --max-p95 create=50 --max-p95 list=20
+
+The exit status is 1 when a gate fails: a p95 above ``--max-p95`` or above
+the baseline's p95 times ``--tolerance``, or an error in a scenario.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.capacity import MAX_PER_DAY, MAX_TABLES, table_bit
+from app.models import DailyCapacity, DailyTotal, Reservation, Restaurant
+
+FIRST_DAY = date(2030, 1, 1)
+SCENARIOS = ('create', 'list', 'update', 'delete', 'contention')
+
+
+def seed(restaurants, reservations):
+    """Fill the database day by day up to the global cap; return the first free day."""
+
+    db.session.execute(insert(Restaurant), [
+        {'name': f"Bench {n}", 'city': f"City {n % 10}"} for n in range(restaurants)
+    ])
+    per_day = min(MAX_PER_DAY, MAX_TABLES * restaurants)
+    rows, counters, totals = [], [], []
+    day = FIRST_DAY
+    while len(rows) < reservations:
+        booked = min(per_day, reservations - len(rows))
+        masks = {}
+        for k in range(booked):
+            restaurant_id, table = k % restaurants + 1, k // restaurants + 1
+            rows.append({'restaurant_id': restaurant_id, 'date': day, 'table_number': table})
+            masks[restaurant_id] = masks.get(restaurant_id, 0) | table_bit(table)
+        counters.extend(
+            {'restaurant_id': rid, 'date': day, 'booked_count': bin(mask).count('1'), 'tables_mask': mask}
+            for rid, mask in masks.items()
+        )
+        totals.append({'date': day, 'booked_count': booked})
+        day += timedelta(days=1)
+    if rows:
+        db.session.execute(insert(Reservation), rows)
+        db.session.execute(insert(DailyCapacity), counters)
+        db.session.execute(insert(DailyTotal), totals)
+    db.session.commit()
+    return day
+
+
+class TestClientTarget:
+    """Send requests through one Flask test client per thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def __call__(self, method, path, body=None):
+        if not hasattr(self.local, 'client'):
+            self.local.client = self.app.test_client()
+        resp = self.local.client.open(path, method=method, json=body)
+        return resp.status_code, resp.get_json(silent=True)
+
+
+class HttpTarget:
+    """Send requests to a running server, one connection per thread."""
+
+    def __init__(self, url):
+        self.address = urlsplit(url).netloc
+        self.local = threading.local()
+
+    def __call__(self, method, path, body=None):
+        if not hasattr(self.local, 'conn'):
+            self.local.conn = http.client.HTTPConnection(self.address, timeout=60)
+        payload = json.dumps(body) if body is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        self.local.conn.request(method, path, body=payload, headers=headers)
+        resp = self.local.conn.getresponse()
+        data = resp.read()
+        try:
+            return resp.status, json.loads(data)
+        except ValueError:
+            return resp.status, None
+
+
+def run(target, clients, requests):
+    """Run ``(method, path, body, expected)`` requests on ``clients`` threads.
+
+    Returns the sorted latencies, the responses and the number of requests
+    whose status was not in ``expected``.
+    """
+
+    def timed(request):
+        method, path, body, expected = request
+        started = time.perf_counter()
+        status, data = target(method, path, body)
+        return time.perf_counter() - started, status in expected, data
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(timed, requests))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for latency, _, _ in results)
+    errors = sum(1 for _, ok, _ in results if not ok)
+    return latencies, [data for _, _, data in results], errors, len(results) / elapsed
+
+
+def percentile(latencies, fraction):
+    return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000
+
+
+def scenarios(target, args, first_free_day):
+    """Yield ``(name, latencies, errors, rate)`` for every scenario, in order."""
+
+    restaurants, requests = args.restaurants, args.requests
+    seeded_days = (first_free_day - FIRST_DAY).days
+
+    # Cada reserva nueva cae en su propio día libre para que ningún tope la rechace
+    creates = [
+        ('POST', '/reservations', {
+            'restaurant_id': n % restaurants + 1,
+            'date': (first_free_day + timedelta(days=n)).isoformat(),
+            'table_number': 1,
+        }, {201})
+        for n in range(requests)
+    ]
+    latencies, created, errors, rate = run(target, args.clients, creates)
+    ids = [data['id'] for data in created if data and 'id' in data]
+    yield 'create', latencies, errors, rate
+
+    lists = []
+    for _ in range(requests):
+        day = (FIRST_DAY + timedelta(days=random.randrange(max(seeded_days, 1)))).isoformat()
+        rid = random.randint(1, restaurants)
+        query = random.choice((
+            f"restaurant_id={rid}&date={day}", f"date={day}", f"restaurant_id={rid}",
+        ))
+        lists.append(('GET', f"/reservations?{query}&limit=50", None, {200}))
+    latencies, _, errors, rate = run(target, args.clients, lists)
+    yield 'list', latencies, errors, rate
+
+    updates = [('PUT', f"/reservations/{rid}", {'table_number': 2}, {200}) for rid in ids]
+    latencies, _, errors, rate = run(target, args.clients, updates)
+    yield 'update', latencies, errors, rate
+
+    deletes = [('DELETE', f"/reservations/{rid}", None, {200}) for rid in ids]
+    latencies, _, errors, rate = run(target, args.clients, deletes)
+    yield 'delete', latencies, errors, rate
+
+    # Todos los clientes compiten por la misma fecha: solo MAX_PER_DAY pueden entrar
+    busy_day = (first_free_day + timedelta(days=requests + 1)).isoformat()
+    contention = [
+        ('POST', '/reservations', {
+            'restaurant_id': random.randint(1, restaurants),
+            'date': busy_day,
+            'table_number': random.randint(1, MAX_TABLES),
+        }, {201, 400})
+        for _ in range(requests)
+    ]
+    latencies, booked, errors, rate = run(target, args.clients, contention)
+    accepted = sum(1 for data in booked if data and 'id' in data)
+    if accepted > MAX_PER_DAY:
+        errors += accepted - MAX_PER_DAY
+    yield 'contention', latencies, errors, rate
+
+
+def gate(results, args):
+    """Return the list of gate failures for ``results``."""
+
+    failures = []
+    limits = dict(item.split('=', 1) for item in args.max_p95)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+    for name, result in results.items():
+        if result['errors']:
+            failures.append(f"{name}: {result['errors']} unexpected responses")
+        if name in limits and result['p95'] > float(limits[name]):
+            failures.append(f"{name}: p95 {result['p95']:.1f} ms > {limits[name]} ms")
+        if name in baseline and result['p95'] > baseline[name]['p95'] * args.tolerance:
+            failures.append(
+                f"{name}: p95 {result['p95']:.1f} ms > baseline {baseline[name]['p95']:.1f} ms "
+                f"x {args.tolerance}"
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--restaurants', type=int, default=50)
+    parser.add_argument('--reservations', type=int, default=20_000)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500, help="requests per scenario")
+    parser.add_argument('--url', help="run against a server instead of the test client")
+    parser.add_argument('--database', help="SQLite file to seed (default: a temporary one)")
+    parser.add_argument('--save', help="write the results as JSON, e.g. as a baseline")
+    parser.add_argument('--baseline', help="JSON written by --save to compare against")
+    parser.add_argument('--tolerance', type=float, default=1.25)
+    parser.add_argument('--max-p95', action='append', default=[], metavar='SCENARIO=MS')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.database or os.path.join(tmp, 'bench.db')
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.abspath(path)}",
+            'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': args.clients, 'connect_args': {'timeout': 60}},
+            'METRICS_ENABLED': False,
+        })
+        with app.app_context():
+            db.create_all()
+            first_free_day = seed(args.restaurants, args.reservations)
+        target = HttpTarget(args.url) if args.url else TestClientTarget(app)
+
+        results = {}
+        print(f"{'scenario':<12}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+              f"{'p99 ms':>9}{'max ms':>9}{'errors':>8}")
+        for name, latencies, errors, rate in scenarios(target, args, first_free_day):
+            if not latencies:
+                continue
+            results[name] = {
+                'requests': len(latencies), 'rate': rate, 'errors': errors,
+                'p50': percentile(latencies, 0.50), 'p95': percentile(latencies, 0.95),
+                'p99': percentile(latencies, 0.99), 'max': latencies[-1] * 1000,
+            }
+            r = results[name]
+            print(f"{name:<12}{r['requests']:>9}{rate:>9.0f}{r['p50']:>9.1f}{r['p95']:>9.1f}"
+                  f"{r['p99']:>9.1f}{r['max']:>9.1f}{errors:>8}")
+        with app.app_context():
+            db.engine.dispose()
+
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump(results, fh, indent=2)
+    failures = gate(results, args)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Write throughput of POST /reservations with and without group commit.
+
+Many threads book reservations through the Flask test client against a
+temporary database file with the default ``SQLITE_PRAGMAS``; every request
+uses its own date so the capacity caps never reject it::
+
+    python -m benchmarks.bench_group_commit --clients 50 --requests 40
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Restaurant
+
+
+def run(group_commit, window_ms, clients, requests):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': clients, 'connect_args': {'timeout': 60}},
+            'GROUP_COMMIT_ENABLED': group_commit,
+            'GROUP_COMMIT_WINDOW_MS': window_ms,
+        })
+        with app.app_context():
+            db.create_all()
+            db.session.add(Restaurant(name="Bench"))
+            db.session.commit()
+
+        errors = []
+        latencies = []
+        barrier = threading.Barrier(clients + 1)
+
+        def worker(offset):
+            client = app.test_client()
+            barrier.wait()
+            for i in range(requests):
+                day = date(2030, 1, 1) + timedelta(days=offset * requests + i)
+                started = time.perf_counter()
+                resp = client.post('/reservations', json={
+                    "restaurant_id": 1, "date": day.isoformat(), "table_number": 1
+                })
+                latencies.append(time.perf_counter() - started)
+                if resp.status_code != 201:
+                    errors.append(resp.status_code)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(clients)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        with app.app_context():
+            db.engine.dispose()
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    return clients * requests / elapsed, p95, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--window-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    for label, enabled in (("one commit per request", False), ("group commit", True)):
+        rate, p95, errors = run(enabled, args.window_ms, args.clients, args.requests)
+        print(f"{label:<24}{rate:>10.0f} writes/s   p95 {p95:>7.1f} ms   errors: {errors}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Compare reservation list/create latency on the legacy and indexed schemas.
+
+The legacy layout stores ``date`` as ``VARCHAR(20)`` without indexes; the
+current one uses the ``reservations`` table from :mod:`app.models` (typed
+``Date``, unique ``(restaurant_id, date, table_number)`` and a ``date``
+index). Both are seeded with the same rows in a temporary SQLite file::
+
+    python -m benchmarks.bench_reservation_schema --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sqlalchemy as sa
+
+from app.models import Reservation, Restaurant
+
+RESTAURANTS = 200
+TABLES_PER_DAY = 5
+START = date(2020, 1, 1)
+
+
+def legacy_table(metadata):
+    return sa.Table(
+        'reservations', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('restaurant_id', sa.Integer, nullable=False),
+        sa.Column('date', sa.String(20), nullable=False),
+        sa.Column('table_number', sa.Integer, nullable=False),
+        sa.Column('created_at', sa.DateTime, server_default=sa.func.now()),
+    )
+
+
+def current_table(metadata):
+    Restaurant.__table__.to_metadata(metadata)
+    return Reservation.__table__.to_metadata(metadata)
+
+
+def seed(engine, table, rows, as_text):
+    per_day = RESTAURANTS * TABLES_PER_DAY
+    batch = []
+    with engine.begin() as conn:
+        for i in range(rows):
+            day = START + timedelta(days=i // per_day)
+            batch.append({
+                'restaurant_id': (i // TABLES_PER_DAY) % RESTAURANTS + 1,
+                'date': day.isoformat() if as_text else day,
+                'table_number': i % TABLES_PER_DAY + 1,
+            })
+            if len(batch) == 50_000:
+                conn.execute(table.insert(), batch)
+                batch.clear()
+        if batch:
+            conn.execute(table.insert(), batch)
+    return (rows - 1) // per_day + 1
+
+
+def timed(fn, samples):
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def measure(engine, table, days, as_text, samples):
+    rng = random.Random(42)
+    c = table.c
+
+    def pick_day():
+        day = START + timedelta(days=rng.randrange(days))
+        return day.isoformat() if as_text else day
+
+    def list_by_restaurant_and_date():
+        with engine.connect() as conn:
+            conn.execute(sa.select(table).where(
+                c.restaurant_id == rng.randint(1, RESTAURANTS), c.date == pick_day()
+            )).all()
+
+    def list_by_date():
+        with engine.connect() as conn:
+            conn.execute(sa.select(table).where(c.date == pick_day())).all()
+
+    def create():
+        day = pick_day()
+        restaurant_id = rng.randint(1, RESTAURANTS)
+        table_number = rng.randint(TABLES_PER_DAY + 1, 15)
+        with engine.begin() as conn:
+            conn.execute(sa.select(c.id).where(
+                c.restaurant_id == restaurant_id, c.date == day, c.table_number == table_number
+            ).limit(1)).first()
+            conn.execute(sa.select(sa.func.count()).where(
+                c.restaurant_id == restaurant_id, c.date == day
+            )).scalar()
+            conn.execute(sa.select(sa.func.count()).where(c.date == day)).scalar()
+            conn.execute(table.delete().where(
+                c.restaurant_id == restaurant_id, c.date == day, c.table_number == table_number
+            ))
+            conn.execute(table.insert().values(
+                restaurant_id=restaurant_id, date=day, table_number=table_number
+            ))
+
+    return {
+        'list restaurant+date': timed(list_by_restaurant_and_date, samples),
+        'list date': timed(list_by_date, samples),
+        'create (checks + insert)': timed(create, samples),
+    }
+
+
+def run(label, build_table, rows, samples, as_text):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = sa.create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        metadata = sa.MetaData()
+        table = build_table(metadata)
+        metadata.create_all(engine)
+        started = time.perf_counter()
+        days = seed(engine, table, rows, as_text)
+        print(f"{label}: seeded {rows} rows in {time.perf_counter() - started:.1f}s")
+        results = measure(engine, table, days, as_text, samples)
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--samples', type=int, default=20)
+    args = parser.parse_args()
+
+    before = run('legacy', legacy_table, args.rows, args.samples, as_text=True)
+    after = run('indexed', current_table, args.rows, args.samples, as_text=False)
+    print(f"\n{'median ms':<26}{'legacy':>10}{'indexed':>10}")
+    for name in before:
+        print(f"{name:<26}{before[name]:>10.2f}{after[name]:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Restaurant search: FTS5 index against a ``LIKE '%term%'`` scan.
+
+Seeds a temporary SQLite database with ``--restaurants`` generated
+restaurants, builds the search index and times the same queries through
+``search_statement`` and through a ``LIKE`` over name, description and city,
+then misspelled words through ``search_statement``'s trigram fallback::
+
+    python -m benchmarks.bench_search --restaurants 100000 --queries 200
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert, or_, select
+
+from app import create_app, db
+from app.models import Restaurant
+from app.search import rebuild_index, search_statement, search_terms
+
+KINDS = [
+    "arepa", "pizzería", "sushi", "parrilla", "asadero", "café", "panadería", "marisquería",
+    "taquería", "bistró", "fonda", "cevichería", "hamburguesas", "empanadas", "wok", "tapas",
+]
+SYLLABLES = ["ca", "ma", "lo", "ri", "ta", "ne", "gu", "so", "pe", "la", "mi", "do", "ra", "vi", "te", "zu"]
+CITIES = ["Bogotá", "Medellín", "Cali", "Barranquilla", "Cartagena", "Pasto", "Manizales", "Pereira"]
+PAGE = 20
+
+
+def vocabulary(rng, size):
+    """``size`` distinct made-up words, so most terms match only a few restaurants."""
+
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(3, 4))))
+    return sorted(words)
+
+
+def seed(count, words, rng):
+    rows = [
+        {
+            "name": f"{rng.choice(KINDS)} {rng.choice(words)}".title(),
+            "description": " ".join(rng.choices(words, k=12)),
+            "city": rng.choice(CITIES),
+        }
+        for _ in range(count)
+    ]
+    db.session.execute(insert(Restaurant), rows)
+    started = time.perf_counter()
+    rebuild_index()
+    db.session.commit()
+    return time.perf_counter() - started
+
+
+def like_statement(terms):
+    statement = select(*Restaurant.__table__.c)
+    for term in terms:
+        pattern = f"%{term}%"
+        statement = statement.where(or_(
+            Restaurant.name.like(pattern), Restaurant.description.like(pattern), Restaurant.city.like(pattern),
+        ))
+    return statement.order_by(Restaurant.id)
+
+
+def misspell(rng, word):
+    """``word`` with two neighbouring letters swapped."""
+
+    i = rng.randrange(len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def timed(build, queries):
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        db.session.execute(build(search_terms(query)).limit(PAGE)).all()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--restaurants', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = vocabulary(rng, 20_000)
+    # Una palabra completa, un prefijo, o una palabra y una ciudad
+    queries = [
+        rng.choice((
+            rng.choice(words),
+            rng.choice(words)[:5],
+            f"{rng.choice(words)} {rng.choice(CITIES)}",
+        ))
+        for _ in range(args.queries)
+    ]
+    # Palabras mal escritas: sin coincidencia por prefijo, pasan a la búsqueda por trigramas
+    typos = [misspell(rng, rng.choice(words)) for _ in range(args.queries)]
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}"})
+        with app.app_context():
+            db.create_all()
+            build = seed(args.restaurants, words, rng)
+            print(f"{args.restaurants} restaurants, index built in {build:.2f} s, {args.queries} queries")
+            for label, statement, batch in (
+                ("FTS5 (ranked)", search_statement, queries),
+                ("LIKE scan", like_statement, queries),
+                ("FTS5 typos", search_statement, typos),
+            ):
+                mean, p95 = timed(statement, batch)
+                print(f"{label:<16}mean {mean:>8.2f} ms   p95 {p95:>8.2f} ms")
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Rows/second of the precompiled serializers against ``schema.dump``.
+
+Measures serialization alone (rows already in memory) and the full list
+path (fetch + serialize) on an in-memory SQLite database::
+
+    python -m benchmarks.bench_serializers --rows 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert, select
+
+from app import create_app, db
+from app.models import Reservation, Restaurant
+from app.schemas import ReservationSchema
+from app.serializers import RESERVATION_COLUMNS, serialize_reservation, serialize_reservation_instance
+
+
+def seed(rows):
+    db.session.add(Restaurant(name="Bench"))
+    db.session.flush()
+    start = date(2020, 1, 1)
+    db.session.execute(insert(Reservation), [
+        {'restaurant_id': 1, 'date': start + timedelta(days=i // 15), 'table_number': i % 15 + 1}
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+
+def rate(label, rows, fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40}{rows / elapsed:>14,.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50_000)
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        db.create_all()
+        seed(args.rows)
+        schema = ReservationSchema(many=True)
+        objects = Reservation.query.all()
+        core_rows = db.session.execute(select(*RESERVATION_COLUMNS)).all()
+
+        rate("schema.dump (ORM objects)", args.rows, lambda: schema.dump(objects))
+        rate("serialize_reservation_instance (ORM)", args.rows,
+             lambda: [serialize_reservation_instance(obj) for obj in objects])
+        rate("serialize_reservation (Core rows)", args.rows,
+             lambda: [serialize_reservation(row) for row in core_rows])
+
+        db.session.expunge_all()
+        rate("query.all + schema.dump", args.rows,
+             lambda: schema.dump(Reservation.query.all()))
+        db.session.expunge_all()
+        rate("Core select + serialize_reservation", args.rows, lambda: [
+            serialize_reservation(row)
+            for row in db.session.execute(select(*RESERVATION_COLUMNS))
+        ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Concurrent write throughput on SQLite with and without ``SQLITE_PRAGMAS``.
+
+Many threads book reservations through the Flask test client against a
+temporary database file; every request uses its own date so the capacity
+caps never reject it::
+
+    python -m benchmarks.bench_sqlite_pragmas --clients 16 --requests 100
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import Restaurant
+from config import Config
+
+
+def run(pragmas, clients, requests):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': clients, 'connect_args': {'timeout': 60}},
+            'SQLITE_PRAGMAS': pragmas,
+        })
+        with app.app_context():
+            db.create_all()
+            db.session.add(Restaurant(name="Bench"))
+            db.session.commit()
+
+        errors = []
+        barrier = threading.Barrier(clients + 1)
+
+        def worker(offset):
+            client = app.test_client()
+            barrier.wait()
+            for i in range(requests):
+                day = date(2030, 1, 1) + timedelta(days=offset * requests + i)
+                resp = client.post('/reservations', json={
+                    "restaurant_id": 1, "date": day.isoformat(), "table_number": 1
+                })
+                if resp.status_code != 201:
+                    errors.append(resp.status_code)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(clients)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        with app.app_context():
+            db.engine.dispose()
+    return clients * requests / elapsed, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=100)
+    args = parser.parse_args()
+
+    for label, pragmas in (("default (rollback journal)", {}), ("SQLITE_PRAGMAS", Config.SQLITE_PRAGMAS)):
+        rate, errors = run(pragmas, args.clients, args.requests)
+        print(f"{label:<28}{rate:>10.0f} writes/s   errors: {errors}")
+
+
+if __name__ == '__main__':
+    main()
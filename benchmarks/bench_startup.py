@@ -0,0 +1,73 @@
+"""Cold start: import, ``create_app()`` and first request, each in a fresh interpreter.
+
+Every run is a new ``python`` process, as an autoscaled worker would be, so
+nothing is warm except the OS file cache. The first request is a
+``GET /reservations?limit=1`` against a throwaway SQLite file. Exits with
+status 1 if the median total is over ``--max-ms``::
+
+    python -m benchmarks.bench_startup --runs 10 --max-ms 850
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Código que mide cada proceso; imprime los tiempos en JSON
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[1]})
+created = time.perf_counter()
+assert app.test_client().get('/reservations?limit=1').status_code == 200
+served = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': created - imported,
+                  'first_request': served - created, 'total': served - started}))
+"""
+# Objetivo medido en un contenedor de 1 CPU: mediana de ~750 ms con Flask-Migrate y
+# marshmallow-sqlalchemy cargados al primer uso (~1050 ms cuando se importaban al arrancar)
+DEFAULT_MAX_MS = 850
+
+
+def run_once(url):
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE, url], cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, default=DEFAULT_MAX_MS)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from app import create_app, db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+        with app.app_context():
+            db.create_all()
+            db.engine.dispose()
+
+        runs = [run_once(url) for _ in range(args.runs)]
+
+    medians = {phase: statistics.median(run[phase] for run in runs) * 1000 for phase in runs[0]}
+    for phase, value in medians.items():
+        print(f"{phase:<14}{value:>8.1f} ms (median of {args.runs})")
+    if medians['total'] > args.max_ms:
+        print(f"FAIL: cold start {medians['total']:.0f} ms > {args.max_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
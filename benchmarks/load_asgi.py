@@ -0,0 +1,148 @@
+"""Requests per second of the WSGI and ASGI serving modes under concurrent clients.
+
+Seeds a temporary SQLite database, starts the API once with Werkzeug's
+threaded server (``manage.py``'s mode) and once with uvicorn (``asgi.py``),
+and drives both with concurrent clients (one connection per request) that read
+reservation pages and availability::
+
+    python -m benchmarks.load_asgi --clients 200 --seconds 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from app import create_app, db
+from app.models import Reservation, Restaurant
+
+SERVERS = {
+    'wsgi': [
+        sys.executable, '-c',
+        "import logging, sys; from werkzeug.serving import run_simple; from manage import app; "
+        "logging.getLogger('werkzeug').setLevel(logging.ERROR); "
+        "run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=True)",
+    ],
+    'asgi': [
+        sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+        '--log-level', 'warning', '--no-access-log', '--port',
+    ],
+}
+
+
+def seed(uri, restaurants, days):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri})
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(Restaurant(name=f"R{i}", city="Bench") for i in range(restaurants))
+        db.session.flush()
+        db.session.add_all(
+            Reservation(restaurant_id=rid, date=date(2030, 1, 1) + timedelta(days=day), table_number=table)
+            for rid in range(1, restaurants + 1) for day in range(days) for table in range(1, 6)
+        )
+        db.session.commit()
+        db.engine.dispose()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+async def fetch(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n".encode())
+        response = await reader.read()
+    finally:
+        writer.close()
+    if not response:
+        raise ConnectionResetError("Server closed the connection")
+    return int(response.split(b' ', 2)[1])
+
+
+async def client(port, restaurants, days, deadline, latencies, errors):
+    while time.monotonic() < deadline:
+        rid = random.randint(1, restaurants)
+        if random.random() < 0.5:
+            path = f"/reservations?restaurant_id={rid}&limit=50"
+        else:
+            start = date(2030, 1, 1) + timedelta(days=random.randrange(days))
+            path = f"/restaurants/{rid}/availability?from={start}&to={start + timedelta(days=6)}"
+        started = time.perf_counter()
+        try:
+            if await fetch(port, path) != 200:
+                errors.append(path)
+            latencies.append(time.perf_counter() - started)
+        except OSError:
+            # Conexión rechazada o cerrada por el servidor
+            errors.append(path)
+
+
+async def load(port, clients, seconds, restaurants, days):
+    latencies, errors = [], []
+    deadline = time.monotonic() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(port, restaurants, days, deadline, latencies, errors) for _ in range(clients)
+    ))
+    return latencies, errors, time.perf_counter() - started
+
+
+def run(mode, uri, args):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=uri, APP_ENV='production')
+    server = subprocess.Popen(SERVERS[mode] + [str(port)], cwd=ROOT, env=env)
+    try:
+        wait_for(port)
+        latencies, errors, elapsed = asyncio.run(
+            load(port, args.clients, args.seconds, args.restaurants, args.days)
+        )
+    finally:
+        server.terminate()
+        server.wait()
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{mode:<6}{len(latencies) / elapsed:>10.0f} req/s   p50 {p50:7.1f} ms   "
+          f"p99 {p99:7.1f} ms   errors: {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--restaurants', type=int, default=50)
+    parser.add_argument('--days', type=int, default=60)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+        seed(uri, args.restaurants, args.days)
+        for mode in ('wsgi', 'asgi'):
+            run(mode, uri, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,73 @@ import os
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///reservas.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # PRAGMAs aplicados a cada conexión SQLite nueva (ver app/database.py)
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+    }
+    # 'memory' (por worker) o 'redis' (compartida entre workers)
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_REDIS_URL = os.getenv('RESPONSE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '60'))
+    RESPONSE_CACHE_MAXSIZE = 256
+    # Segundos que una retención (POST /reservations/holds) guarda su cupo
+    HOLD_TTL_SECONDS = int(os.getenv('HOLD_TTL_SECONDS', '300'))
+    # Vida de las respuestas guardadas por 'Idempotency-Key' y tamaño de su LRU en memoria
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', '86400'))
+    # Segundos tras los que una clave sin respuesta se da por abandonada (más que el timeout del servidor)
+    IDEMPOTENCY_LEASE = int(os.getenv('IDEMPOTENCY_LEASE', '60'))
+    IDEMPOTENCY_CACHE_SIZE = 1024
+    # Sondeo del stream de cambios (SSE) y duración máxima de cada conexión
+    CHANGES_POLL_INTERVAL = float(os.getenv('CHANGES_POLL_INTERVAL', '1'))
+    CHANGES_STREAM_TIMEOUT = float(os.getenv('CHANGES_STREAM_TIMEOUT', '300'))
+    # Las reservas con fecha de hace más de estos días se mueven a reservations_archive
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '365'))
+    # Agrupa los commits de POST /reservations en lotes (ver app/group_commit.py)
+    GROUP_COMMIT_ENABLED = os.getenv('GROUP_COMMIT_ENABLED', '0') == '1'
+    GROUP_COMMIT_WINDOW_MS = float(os.getenv('GROUP_COMMIT_WINDOW_MS', '5'))
+    GROUP_COMMIT_MAX_BATCH = 200
+    # Réplica de solo lectura para listados, disponibilidad y reportes (ver app/replicas.py)
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {'replica': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+    # Tras escribir, el cliente lee de la primaria durante estos segundos
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '10'))
+    # Segundos máximos que un worker usa sus reglas de cupo sin recargarlas
+    # (con el backend 'memory' es lo que tarda un cambio en llegar a los demás procesos)
+    CAPACITY_RULES_MAX_AGE = int(os.getenv('CAPACITY_RULES_MAX_AGE', '60'))
+    # Latencia y SQL por endpoint en /metrics (ver app/metrics.py)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+    METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', '0') == '1'
+    METRICS_PROFILE_SAMPLE_RATE = float(os.getenv('METRICS_PROFILE_SAMPLE_RATE', '0'))
+    METRICS_PROFILE_THRESHOLD_MS = float(os.getenv('METRICS_PROFILE_THRESHOLD_MS', '200'))
+    METRICS_PROFILE_DIR = os.getenv('METRICS_PROFILE_DIR', 'profiles')
 
 class DevConfig(Config):
-    DEBUG = True
\ No newline at end of file
+    DEBUG = True
+
+class ProductionConfig(Config):
+    DEBUG = False
+    # El pool solo aplica a Postgres; SQLite usa sus PRAGMAs
+    SQLALCHEMY_ENGINE_OPTIONS = {} if Config.SQLALCHEMY_DATABASE_URI.startswith('sqlite') else {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_pre_ping': True,
+    }
+
+CONFIGS = {
+    'development': DevConfig,
+    'production': ProductionConfig,
+}
+
+def get_config():
+    """Pick the configuration class from ``APP_ENV`` (or ``FLASK_ENV``), defaulting to development."""
+
+    name = os.getenv('APP_ENV') or os.getenv('FLASK_ENV') or 'development'
+    try:
+        return CONFIGS[name]
+    except KeyError:
+        raise RuntimeError(f"Unknown APP_ENV: {name}")
@@ -7,11 +7,31 @@ import pydoc
 MODULES = [
     "app",
     "app.models",
+    "app.cache",
+    "app.metrics",
+    "app.capacity",
+    "app.rules",
+    "app.pagination",
+    "app.serializers",
     "app.routes.restaurants",
     "app.routes.reservations",
+    "app.routes.capacity_rules",
+    "app.routes.reports",
     "app.schemas",
+    "app.schema_cache",
     "app.extensions",
+    "app.async_db",
+    "app.asgi",
+    "app.database",
+    "app.validators",
     "app.error_handlers",
+    "app.commands",
+    "app.idempotency",
+    "app.archive",
+    "app.search",
+    "app.changes",
+    "app.group_commit",
+    "app.replicas",
     "config",
     "manage",
 ]
@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+from app.search import FTS_TABLE
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -51,6 +53,24 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_name(name, type_, parent_names):
+    # The FTS5 search index and its shadow tables are managed by app/search.py,
+    # not by the models: autogenerate must not drop them
+    if type_ == 'table' and name.startswith(FTS_TABLE):
+        return False
+    return True
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Autogenerate ignores Index.ddl_if(dialect=...): an index meant for another
+    # dialect would show up as a pending add_index on this one
+    ddl_if = getattr(object, '_ddl_if', None)
+    if type_ == 'index' and not reflected and ddl_if is not None and ddl_if.dialect is not None:
+        dialects = (ddl_if.dialect,) if isinstance(ddl_if.dialect, str) else ddl_if.dialect
+        return context.get_context().dialect.name in dialects
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +85,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_name=include_name, include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -93,6 +114,8 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_name", include_name)
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
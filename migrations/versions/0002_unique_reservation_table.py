@@ -0,0 +1,31 @@
+"""Unique (restaurant_id, date, table_number) on reservations
+
+Existing duplicate bookings must be resolved before upgrading, otherwise the
+constraint cannot be created.
+
+Revision ID: 0002_unique_reservation_table
+Revises: 0001_initial_schema
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_unique_reservation_table'
+down_revision = '0001_initial_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.create_unique_constraint(
+            'uq_reservations_table', ['restaurant_id', 'date', 'table_number']
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.drop_constraint('uq_reservations_table', type_='unique')
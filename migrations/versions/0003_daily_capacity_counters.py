@@ -0,0 +1,49 @@
+"""Daily capacity counters with backfill from existing reservations
+
+Revision ID: 0003_daily_capacity_counters
+Revises: 0002_unique_reservation_table
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_daily_capacity_counters'
+down_revision = '0002_unique_reservation_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'daily_capacity',
+        sa.Column('restaurant_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.String(length=20), nullable=False),
+        sa.Column('booked_count', sa.Integer(), nullable=False),
+        sa.Column('tables_mask', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['restaurant_id'], ['restaurants.id']),
+        sa.PrimaryKeyConstraint('restaurant_id', 'date'),
+    )
+    op.create_table(
+        'daily_totals',
+        sa.Column('date', sa.String(length=20), nullable=False),
+        sa.Column('booked_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('date'),
+    )
+    # (restaurant_id, date, table_number) es único, así que SUM de los bits equivale a OR
+    op.execute(
+        "INSERT INTO daily_capacity (restaurant_id, date, booked_count, tables_mask) "
+        "SELECT restaurant_id, date, COUNT(*), SUM(CAST(1 AS BIGINT) << (table_number - 1)) "
+        "FROM reservations GROUP BY restaurant_id, date"
+    )
+    op.execute(
+        "INSERT INTO daily_totals (date, booked_count) "
+        "SELECT date, COUNT(*) FROM reservations GROUP BY date"
+    )
+
+
+def downgrade():
+    op.drop_table('daily_totals')
+    op.drop_table('daily_capacity')
@@ -0,0 +1,51 @@
+"""Typed Date column and date index for reservations and counters
+
+Revision ID: 0004_typed_reservation_date
+Revises: 0003_daily_capacity_counters
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_typed_reservation_date'
+down_revision = '0003_daily_capacity_counters'
+branch_labels = None
+depends_on = None
+
+# tabla -> si 'date' forma parte de la clave primaria
+TABLES = {'reservations': False, 'daily_capacity': True, 'daily_totals': True}
+
+
+def upgrade():
+    for table, in_primary_key in TABLES.items():
+        # En SQLite la columna ya guarda texto ISO; reflejarla como Date evita
+        # que el modo batch copie los datos con CAST(date AS DATE), que la
+        # convertiría en un número.
+        reflect_args = [sa.Column('date', sa.Date(), nullable=False, primary_key=in_primary_key)]
+        with op.batch_alter_table(table, reflect_args=reflect_args) as batch_op:
+            batch_op.alter_column(
+                'date',
+                existing_type=sa.String(length=20),
+                type_=sa.Date(),
+                existing_nullable=False,
+                postgresql_using='date::date',
+            )
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.create_index('ix_reservations_date', ['date'])
+
+
+def downgrade():
+    with op.batch_alter_table('reservations') as batch_op:
+        batch_op.drop_index('ix_reservations_date')
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(
+                'date',
+                existing_type=sa.Date(),
+                type_=sa.String(length=20),
+                existing_nullable=False,
+                postgresql_using="to_char(date, 'YYYY-MM-DD')",
+            )
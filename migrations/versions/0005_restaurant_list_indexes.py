@@ -0,0 +1,37 @@
+"""Indexes for the restaurant city and name-prefix filters
+
+Revision ID: 0005_restaurant_list_indexes
+Revises: 0004_typed_reservation_date
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_restaurant_list_indexes'
+down_revision = '0004_typed_reservation_date'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_restaurants_city', 'restaurants', ['city'])
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.create_index('ix_restaurants_name_nocase', 'restaurants', [sa.text('name COLLATE NOCASE')])
+    elif dialect == 'postgresql':
+        op.create_index(
+            'ix_restaurants_name_pattern', 'restaurants', ['name'],
+            postgresql_ops={'name': 'varchar_pattern_ops'},
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.drop_index('ix_restaurants_name_nocase', table_name='restaurants')
+    elif dialect == 'postgresql':
+        op.drop_index('ix_restaurants_name_pattern', table_name='restaurants')
+    op.drop_index('ix_restaurants_city', table_name='restaurants')
@@ -0,0 +1,35 @@
+"""Holds: capacity slots claimed for a few minutes before confirmation
+
+Revision ID: 0006_reservation_holds
+Revises: 0005_restaurant_list_indexes
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_reservation_holds'
+down_revision = '0005_restaurant_list_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'holds',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('restaurant_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('table_number', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['restaurant_id'], ['restaurants.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_holds_expires_at', 'holds', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_holds_expires_at', table_name='holds')
+    op.drop_table('holds')
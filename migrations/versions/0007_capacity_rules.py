@@ -0,0 +1,36 @@
+"""Capacity rules per restaurant and per date
+
+Revision ID: 0007_capacity_rules
+Revises: 0006_reservation_holds
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_capacity_rules'
+down_revision = '0006_reservation_holds'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'capacity_rules',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('restaurant_id', sa.Integer(), nullable=True),
+        sa.Column('date', sa.Date(), nullable=True),
+        sa.Column('max_tables', sa.Integer(), nullable=True),
+        sa.Column('max_per_restaurant', sa.Integer(), nullable=True),
+        sa.Column('max_per_day', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['restaurant_id'], ['restaurants.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_capacity_rules_restaurant_id', 'capacity_rules', ['restaurant_id'])
+
+
+def downgrade():
+    op.drop_index('ix_capacity_rules_restaurant_id', table_name='capacity_rules')
+    op.drop_table('capacity_rules')
@@ -0,0 +1,36 @@
+"""Archive table for reservations moved out of the live table
+
+Revision ID: 0009_reservations_archive
+Revises: 0008_idempotency_keys
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_reservations_archive'
+down_revision = '0008_idempotency_keys'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # En Postgres la tabla se particiona por año; las particiones las crea
+    # 'flask reservations archive' a medida que las necesita
+    op.create_table(
+        'reservations_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('restaurant_id', sa.Integer(), nullable=False),
+        sa.Column('table_number', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id', 'date'),
+        postgresql_partition_by='RANGE (date)',
+    )
+
+
+def downgrade():
+    op.drop_table('reservations_archive')
@@ -0,0 +1,68 @@
+"""Full-text search index for restaurants
+
+Revision ID: 0010_restaurant_search
+Revises: 0009_reservations_archive
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_restaurant_search'
+down_revision = '0009_reservations_archive'
+branch_labels = None
+depends_on = None
+
+SEARCH_TEXT = (
+    "search_unaccent(lower(coalesce(name, '') || ' ' || "
+    "coalesce(description, '') || ' ' || coalesce(city, '')))"
+)
+SEARCH_DOCUMENT = f"to_tsvector('simple'::regconfig, {SEARCH_TEXT})"
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE restaurants_fts USING fts5("
+            "name, description, city, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "INSERT INTO restaurants_fts (rowid, name, description, city) "
+            "SELECT id, name, description, city FROM restaurants"
+        )
+        # Palabras distintas del índice, por trigramas, para corregir términos mal escritos
+        op.execute("CREATE VIRTUAL TABLE restaurants_fts_vocab USING fts5vocab(restaurants_fts, 'row')")
+        op.execute("CREATE VIRTUAL TABLE restaurants_fts_words USING fts5(word, tokenize = 'trigram')")
+        op.execute(
+            "INSERT INTO restaurants_fts_words (word) "
+            "SELECT term FROM restaurants_fts_vocab WHERE length(term) >= 3"
+        )
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE OR REPLACE FUNCTION search_unaccent(text) RETURNS text "
+            "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+            "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+        )
+        op.create_index(
+            'ix_restaurants_search', 'restaurants', [sa.text(SEARCH_DOCUMENT)], postgresql_using='gin',
+        )
+        op.execute(
+            f"CREATE INDEX ix_restaurants_search_trgm ON restaurants USING gin ({SEARCH_TEXT} gin_trgm_ops)"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE restaurants_fts_words")
+        op.execute("DROP TABLE restaurants_fts_vocab")
+        op.execute("DROP TABLE restaurants_fts")
+    elif dialect == 'postgresql':
+        op.drop_index('ix_restaurants_search_trgm', table_name='restaurants')
+        op.drop_index('ix_restaurants_search', table_name='restaurants')
+        op.execute("DROP FUNCTION search_unaccent(text)")
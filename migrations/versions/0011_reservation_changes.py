@@ -0,0 +1,37 @@
+"""Append-only change log of reservations
+
+Revision ID: 0011_reservation_changes
+Revises: 0010_restaurant_search
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011_reservation_changes'
+down_revision = '0010_restaurant_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'reservation_changes',
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('operation', sa.String(length=6), nullable=False),
+        sa.Column('reservation_id', sa.Integer(), nullable=False),
+        sa.Column('restaurant_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('table_number', sa.Integer(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('seq'),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_reservation_changes_restaurant', 'reservation_changes', ['restaurant_id', 'seq'])
+
+
+def downgrade():
+    op.drop_index('ix_reservation_changes_restaurant', table_name='reservation_changes')
+    op.drop_table('reservation_changes')
@@ -0,0 +1,165 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('asgiref')
+pytest.importorskip('aiosqlite')
+
+from app import create_app, db
+from app.asgi import AsyncApp
+from app.models import Restaurant
+from app.replicas import STICKY_COOKIE, sync_sqlite_replica
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'asgi.db'}",
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(Restaurant(name="Async", city="Test City"))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+
+
+def call(asgi, method, path, query='', body=None, cookie=None):
+    """Run one request through the ASGI app and return ``(status, headers, body)``."""
+
+    payload = json.dumps(body).encode() if body is not None else b''
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(payload)).encode()),
+    ] if body is not None else []
+    if cookie is not None:
+        headers.append((b'cookie', cookie.encode()))
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'root_path': '',
+        'query_string': query.encode(), 'headers': headers, 'http_version': '1.1',
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': payload, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await asgi(scope, receive, send)
+        with asgi.app.app_context():
+            from app.extensions import async_db
+            await async_db.dispose()
+
+    asyncio.run(run())
+    start = messages[0]
+    return (
+        start['status'],
+        {name.decode(): value.decode() for name, value in start['headers']},
+        b''.join(message.get('body', b'') for message in messages[1:]),
+    )
+
+
+def test_async_views_match_sync_views(app):
+    asgi = AsyncApp(app)
+    client = app.test_client()
+    for table in (1, 2, 3):
+        # Las escrituras pasan por WsgiToAsgi y la vista síncrona
+        status, _, _ = call(asgi, 'POST', '/reservations', body={
+            "restaurant_id": 1, "date": "2024-09-01", "table_number": table
+        })
+        assert status == 201
+
+    for query in ('limit=2', 'limit=2&after=2', '', 'format=ndjson', 'date=2024-09-01&limit=5'):
+        status, headers, body = call(asgi, 'GET', '/reservations', query)
+        expected = client.get(f'/reservations?{query}')
+        assert status == 200
+        assert body == expected.data
+        assert headers.get('x-next-cursor') == expected.headers.get('X-Next-Cursor')
+
+    status, _, body = call(asgi, 'GET', '/restaurants/1/availability', 'from=2024-09-01&to=2024-09-02')
+    assert status == 200
+    assert json.loads(body) == client.get('/restaurants/1/availability?from=2024-09-01&to=2024-09-02').json
+
+
+def test_async_views_use_error_handlers(app):
+    asgi = AsyncApp(app)
+    status, _, body = call(asgi, 'GET', '/restaurants/99/availability', 'from=2024-09-01')
+    assert status == 404
+    assert json.loads(body) == {"error": "Restaurante no encontrado"}
+
+    status, _, body = call(asgi, 'GET', '/reservations', 'limit=0')
+    assert status == 400
+    assert "limit" in json.loads(body)["error"]
+
+def test_async_change_stream(app):
+    app.config['CHANGES_STREAM_TIMEOUT'] = 0
+    asgi = AsyncApp(app)
+    client = app.test_client()
+    client.post('/reservations', json={"restaurant_id": 1, "date": "2024-09-03", "table_number": 1})
+    client.put('/reservations/1', json={"table_number": 2})
+
+    status, headers, body = call(asgi, 'GET', '/reservations/changes/stream', 'since=0')
+    assert status == 200
+    assert headers['content-type'].startswith('text/event-stream')
+    assert body.decode() == client.get('/reservations/changes/stream?since=0').get_data(as_text=True)
+    assert "id: 2\nevent: update\n" in body.decode()
+
+
+def test_async_streams_are_measured_after_the_body(app):
+    asgi = AsyncApp(app)
+    for table in (1, 2, 3):
+        call(asgi, 'POST', '/reservations', body={"restaurant_id": 1, "date": "2024-09-01", "table_number": table})
+    status, _, body = call(asgi, 'GET', '/reservations')
+    assert status == 200 and len(json.loads(body)) == 3
+
+    metrics = app.test_client().get('/metrics').get_data(as_text=True)
+    labels = 'endpoint="reservations.list_reservations",method="GET"'
+    assert f'http_request_sql_statements_sum{{{labels}}} 1' in metrics
+    assert f'http_request_sql_statements_bucket{{{labels},le="0"}} 0' in metrics
+
+
+def test_async_reads_use_the_replica(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primary.db'}",
+        'SQLALCHEMY_BINDS': {'replica': f"sqlite:///{tmp_path / 'replica.db'}"},
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(Restaurant(name="Async", city="Test City"))
+        db.session.commit()
+        sync_sqlite_replica()
+    asgi = AsyncApp(app)
+    status, headers, _ = call(asgi, 'POST', '/reservations', body={
+        "restaurant_id": 1, "date": "2024-09-01", "table_number": 4
+    })
+    assert status == 201 and STICKY_COOKIE in headers['set-cookie']
+
+    # La réplica todavía no tiene la reserva
+    assert json.loads(call(asgi, 'GET', '/reservations', 'limit=10')[2]) == []
+    _, _, body = call(asgi, 'GET', '/reservations')
+    assert json.loads(body) == []
+    _, _, body = call(asgi, 'GET', '/restaurants/1/availability', 'from=2024-09-01')
+    assert json.loads(body)["days"][0]["restaurant_remaining"] == 15
+
+    # Quien acaba de escribir lee de la primaria
+    _, _, body = call(asgi, 'GET', '/reservations', 'limit=10', cookie=f"{STICKY_COOKIE}=1")
+    assert [r["table_number"] for r in json.loads(body)] == [4]
+    _, _, body = call(asgi, 'GET', '/restaurants/1/availability', 'from=2024-09-01', cookie=f"{STICKY_COOKIE}=1")
+    assert json.loads(body)["days"][0]["restaurant_remaining"] == 14
+
+    with app.app_context():
+        sync_sqlite_replica()
+        for engine in db.engines.values():
+            engine.dispose()
+    assert [r["table_number"] for r in json.loads(call(asgi, 'GET', '/reservations', 'limit=10')[2])] == [4]
@@ -0,0 +1,145 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from datetime import date
+from app import create_app, db
+from app.extensions import capacity_rules
+from app.models import Restaurant
+from app.rules import RuleSet
+
+
+@pytest.fixture
+def client():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            db.session.add(Restaurant(name="Reglas", city="Test City"))
+            db.session.add(Restaurant(name="Otro", city="Test City"))
+            db.session.commit()
+        yield client
+        with app.app_context():
+            db.drop_all()
+
+def book(client, restaurant_id, day, table_number):
+    return client.post('/reservations', json={
+        "restaurant_id": restaurant_id,
+        "date": day,
+        "table_number": table_number
+    })
+
+def test_rule_resolution_order():
+    rules = RuleSet([
+        (None, None, None, None, 30),
+        (None, date(2024, 12, 31), 10, None, 40),
+        (1, None, 20, 18, None),
+        (1, date(2024, 12, 31), None, 5, None),
+    ])
+    assert rules.tables(1, date(2024, 12, 31)) == 20
+    assert rules.per_restaurant(1, date(2024, 12, 31)) == 5
+    assert rules.per_restaurant(1, date(2024, 12, 30)) == 18
+    assert rules.tables(2, date(2024, 12, 31)) == 10
+    assert rules.per_restaurant(2, date(2024, 12, 31)) == 15
+    assert rules.per_day(date(2024, 12, 31)) == 40
+    assert rules.per_day(date(2024, 12, 30)) == 30
+
+def test_restaurant_table_count(client):
+    resp = client.post('/capacity-rules', json={"restaurant_id": 1, "max_tables": 20, "max_per_restaurant": 18})
+    assert resp.status_code == 201
+    assert book(client, 1, "2024-09-01", 20).status_code == 201
+    resp = book(client, 1, "2024-09-01", 21)
+    assert resp.status_code == 400
+    assert "entre 1 y 20" in resp.get_json()["error"]
+    # El otro restaurante mantiene los 15 por defecto
+    assert book(client, 2, "2024-09-01", 16).status_code == 400
+
+    days = client.get('/restaurants/1/availability?from=2024-09-01').get_json()["days"]
+    assert days[0]["free_tables"] == list(range(1, 20))
+    assert days[0]["restaurant_remaining"] == 17
+
+def test_date_overrides(client):
+    client.post('/capacity-rules', json={"date": "2024-12-24", "max_per_day": 2})
+    client.post('/capacity-rules', json={"restaurant_id": 2, "date": "2024-12-25", "max_per_restaurant": 0})
+    assert book(client, 1, "2024-12-24", 1).status_code == 201
+    assert book(client, 2, "2024-12-24", 1).status_code == 201
+    resp = book(client, 1, "2024-12-24", 2)
+    assert resp.status_code == 400
+    assert "No hay más cupo total" in resp.get_json()["error"]
+
+    resp = book(client, 2, "2024-12-25", 1)
+    assert resp.status_code == 400
+    assert "No hay más cupo en este restaurante" in resp.get_json()["error"]
+    assert book(client, 1, "2024-12-25", 1).status_code == 201
+
+def test_rule_changes_refresh_the_cache(client):
+    resp = client.post('/capacity-rules', json={"restaurant_id": 1, "max_tables": 20})
+    rule_id = resp.get_json()["id"]
+    with client.application.app_context():
+        first = capacity_rules.current()
+        assert capacity_rules.current() is first
+    assert book(client, 1, "2024-09-02", 18).status_code == 201
+
+    assert client.put(f'/capacity-rules/{rule_id}', json={"max_tables": 16}).status_code == 200
+    assert book(client, 1, "2024-09-02", 17).status_code == 400
+    # Mover una reserva también respeta las mesas del destino
+    resp = client.put('/reservations/1', json={"table_number": 17})
+    assert resp.status_code == 400
+    assert "entre 1 y 16" in resp.get_json()["error"]
+
+    assert client.delete(f'/capacity-rules/{rule_id}').status_code == 200
+    assert book(client, 1, "2024-09-02", 16).status_code == 400
+    assert client.get('/capacity-rules').get_json() == []
+
+def test_rules_are_resolved_once_per_request(client, monkeypatch):
+    from app.rules import VERSION_KEY
+    backend = client.application.extensions['response_cache']
+    real_counter = backend.counter
+    reads = []
+
+    def counter(key):
+        reads.append(key)
+        return real_counter(key)
+
+    monkeypatch.setattr(backend, 'counter', counter)
+    items = [{"restaurant_id": 1, "date": "2024-09-03", "table_number": n} for n in range(1, 6)]
+    resp = client.post('/reservations/bulk', json=items)
+    assert resp.get_json()["created"] == 5
+    assert reads.count(VERSION_KEY) == 1
+
+    # Una escritura de reglas en la misma petición descarta el conjunto ya resuelto
+    with client.application.test_request_context():
+        before = capacity_rules.current()
+        capacity_rules.invalidate()
+        assert capacity_rules.current() is not before
+
+def test_invalid_rules(client):
+    assert client.post('/capacity-rules', json={"max_tables": 64}).status_code == 400
+    assert client.post('/capacity-rules', json={"restaurant_id": 1}).status_code == 400
+    assert client.post('/capacity-rules', json={"restaurant_id": 1, "max_per_day": 5}).status_code == 400
+    assert client.post('/capacity-rules', json={"restaurant_id": 9, "max_tables": 5}).status_code == 400
+    assert client.post('/capacity-rules', json={"date": "2024-12-31", "max_per_day": 30}).status_code == 201
+    resp = client.post('/capacity-rules', json={"date": "2024-12-31", "max_per_day": 40})
+    assert resp.status_code == 409
+    assert client.put('/capacity-rules/99', json={"max_per_day": 1}).status_code == 404
+
+def test_concurrent_update_does_not_leak_instance(client, monkeypatch):
+    from app.schemas import CapacityRuleSchema
+    assert client.post('/capacity-rules', json={"max_per_day": 30}).status_code == 201
+    real_make_instance = CapacityRuleSchema.make_instance
+    other = client.application.test_client()
+    created = []
+
+    def make_instance(self, data, **kwargs):
+        # Mientras el PUT valida, llega un POST que usa el esquema compartido
+        if self.instance is not None and not created:
+            created.append(other.post('/capacity-rules', json={"date": "2025-01-01", "max_per_day": 5}))
+        return real_make_instance(self, data, **kwargs)
+
+    monkeypatch.setattr(CapacityRuleSchema, 'make_instance', make_instance)
+    assert client.put('/capacity-rules/1', json={"max_per_day": 25}).status_code == 200
+    assert created[0].status_code == 201
+    rules = {rule["id"]: rule for rule in client.get('/capacity-rules').get_json()}
+    assert rules[1]["date"] is None and rules[1]["max_per_day"] == 25
+    assert rules[2]["date"] == "2025-01-01" and rules[2]["max_per_day"] == 5
@@ -0,0 +1,19 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from config import DevConfig, ProductionConfig, get_config
+
+
+def test_config_selected_by_environment(monkeypatch):
+    monkeypatch.delenv('APP_ENV', raising=False)
+    monkeypatch.delenv('FLASK_ENV', raising=False)
+    assert get_config() is DevConfig
+    monkeypatch.setenv('FLASK_ENV', 'production')
+    assert get_config() is ProductionConfig
+    monkeypatch.setenv('APP_ENV', 'development')
+    assert get_config() is DevConfig
+    monkeypatch.setenv('APP_ENV', 'staging')
+    with pytest.raises(RuntimeError):
+        get_config()
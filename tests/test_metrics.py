@@ -0,0 +1,90 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from app import create_app, db
+
+
+def make_app(tmp_path, **config):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'metrics.db'}",
+        **config,
+    })
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    yield app
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+
+
+def test_metrics_record_latency_and_sql_per_endpoint(app):
+    client = app.test_client()
+    client.post('/restaurants', json={"name": "Métricas", "city": "Bogotá"})
+    client.get('/reservations?limit=10')
+    client.get('/reservations?limit=10')
+
+    resp = client.get('/metrics')
+    assert resp.status_code == 200
+    assert resp.content_type.startswith('text/plain; version=0.0.4')
+    body = resp.get_data(as_text=True)
+    labels = 'endpoint="reservations.list_reservations",method="GET"'
+    assert f'http_requests_total{{{labels},status="200"}} 2' in body
+    assert f'http_request_duration_seconds_count{{{labels}}} 2' in body
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in body
+    # Una consulta por página
+    assert f'http_request_sql_statements_sum{{{labels}}} 2' in body
+    assert 'http_request_sql_duration_seconds_sum{endpoint="restaurants.create_restaurant",method="POST"}' in body
+
+
+def test_server_timing_header(tmp_path):
+    app = make_app(tmp_path, METRICS_SERVER_TIMING=True)
+    resp = app.test_client().get('/reservations?limit=5')
+    assert resp.headers['Server-Timing'].startswith('app;dur=')
+    assert 'db;dur=' in resp.headers['Server-Timing']
+    assert 'desc="1 queries"' in resp.headers['Server-Timing']
+
+
+def test_slow_requests_are_profiled(tmp_path):
+    app = make_app(
+        tmp_path, METRICS_PROFILE_SAMPLE_RATE=1.0, METRICS_PROFILE_THRESHOLD_MS=0,
+        METRICS_PROFILE_DIR=str(tmp_path / 'profiles'),
+    )
+    app.test_client().get('/reservations?limit=5')
+    dumps = os.listdir(tmp_path / 'profiles')
+    assert len(dumps) == 1
+    assert dumps[0].startswith('reservations.list_reservations-')
+
+
+def test_metrics_can_be_disabled(tmp_path):
+    app = make_app(tmp_path, METRICS_ENABLED=False)
+    assert app.test_client().get('/metrics').status_code == 404
+
+
+def test_streamed_responses_are_recorded_after_the_body(tmp_path):
+    app = make_app(tmp_path, METRICS_SERVER_TIMING=True)
+    client = app.test_client()
+    client.post('/restaurants', json={"name": "Stream", "city": "Bogotá"})
+    for table in (1, 2, 3):
+        client.post('/reservations', json={"restaurant_id": 1, "date": "2024-09-01", "table_number": table})
+
+    resp = client.get('/reservations')
+    assert len(resp.get_json()) == 3
+    # Las cabeceras salen antes que el cuerpo: no hay cifras que enviar todavía
+    assert 'Server-Timing' not in resp.headers
+    # El servidor WSGI cierra la respuesta al terminar de enviarla
+    resp.close()
+
+    body = client.get('/metrics').get_data(as_text=True)
+    labels = 'endpoint="reservations.list_reservations",method="GET"'
+    assert f'http_requests_total{{{labels},status="200"}} 1' in body
+    assert f'http_request_sql_statements_sum{{{labels}}} 1' in body
+    assert f'http_request_sql_statements_bucket{{{labels},le="0"}} 0' in body
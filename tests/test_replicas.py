@@ -0,0 +1,102 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from app import create_app, db
+from app.extensions import capacity_rules
+from app.models import Restaurant
+from app.replicas import STICKY_COOKIE, sync_sqlite_replica
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primary.db'}",
+        'SQLALCHEMY_BINDS': {'replica': f"sqlite:///{tmp_path / 'replica.db'}"},
+        'REPLICA_STICKY_SECONDS': 5,
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(Restaurant(name="Primaria", city="Test City"))
+        db.session.commit()
+        sync_sqlite_replica()
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+def book(client, table_number, day="2024-05-01"):
+    return client.post('/reservations', json={"restaurant_id": 1, "date": day, "table_number": table_number})
+
+def test_reads_use_the_replica(app):
+    writer, reader = app.test_client(), app.test_client()
+    assert book(writer, 4).status_code == 201
+
+    # La réplica todavía no tiene la reserva
+    assert reader.get('/reservations?limit=10').get_json() == []
+    days = reader.get('/restaurants/1/availability?from=2024-05-01&to=2024-05-01').get_json()["days"]
+    assert days[0]["restaurant_remaining"] == 15
+    assert reader.get('/reports/occupancy?from=2024-05-01&to=2024-05-01').get_json() == []
+
+    with app.app_context():
+        sync_sqlite_replica()
+    assert [r["table_number"] for r in reader.get('/reservations?limit=10').get_json()] == [4]
+
+def test_writer_reads_its_own_writes(app):
+    writer = app.test_client()
+    assert writer.get_cookie(STICKY_COOKIE) is None
+    resp = book(writer, 4)
+    assert "Max-Age=5" in resp.headers["Set-Cookie"]
+    assert [r["table_number"] for r in writer.get('/reservations?limit=10').get_json()] == [4]
+
+    resp = writer.post('/restaurants', json={"name": "Nueva", "city": "Otra"})
+    assert resp.status_code == 201
+    names = [r["name"] for r in writer.get('/restaurants?limit=10').get_json()]
+    assert names == ["Primaria", "Nueva"]
+    # Las lecturas y los errores no renuevan la cookie
+    assert "Set-Cookie" not in writer.get('/restaurants').headers
+    assert "Set-Cookie" not in book(writer, 99).headers
+
+def test_capacity_checks_stay_on_the_primary(app):
+    writer, other = app.test_client(), app.test_client()
+    assert book(writer, 4).status_code == 201
+    resp = book(other, 4)
+    assert resp.status_code == 400
+    assert "ya está reservada" in resp.get_json()["error"]
+
+    # Una lectura de la réplica recarga las reglas, pero desde la primaria
+    assert writer.post('/capacity-rules', json={"restaurant_id": 1, "max_tables": 20}).status_code == 201
+    other.get('/restaurants/1/availability?from=2024-05-01&to=2024-05-01')
+    with app.app_context():
+        assert capacity_rules.current().tables(1, None) == 20
+    assert book(other, 20).status_code == 201
+
+def test_cache_is_not_filled_from_a_lagging_replica(app):
+    writer, reader = app.test_client(), app.test_client()
+    assert [r["name"] for r in reader.get('/restaurants').get_json()] == ["Primaria"]
+    assert writer.post('/restaurants', json={"name": "Nueva", "city": "Otra"}).status_code == 201
+
+    # La réplica aún no tiene el restaurante: se responde, pero no se cachea
+    assert [r["name"] for r in reader.get('/restaurants').get_json()] == ["Primaria"]
+    with app.app_context():
+        sync_sqlite_replica()
+    for client in (reader, app.test_client()):
+        assert [r["name"] for r in client.get('/restaurants').get_json()] == ["Primaria", "Nueva"]
+
+def test_sync_command(app):
+    app.test_client().post('/restaurants', json={"name": "Nueva", "city": "Otra"})
+    result = app.test_cli_runner().invoke(args=['replica', 'sync'])
+    assert result.exit_code == 0
+    assert "replica.db" in result.output
+    names = [r["name"] for r in app.test_client().get('/restaurants?limit=10').get_json()]
+    assert names == ["Primaria", "Nueva"]
+
+def test_without_replica_no_cookie():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        db.create_all()
+    resp = app.test_client().post('/restaurants', json={"name": "Sola", "city": "Test City"})
+    assert resp.status_code == 201
+    assert "Set-Cookie" not in resp.headers
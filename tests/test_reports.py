@@ -0,0 +1,77 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from app import create_app, db
+from app.models import Restaurant
+
+
+@pytest.fixture
+def client():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            db.session.add(Restaurant(name="Norte", city="Cali"))
+            db.session.add(Restaurant(name="Sur", city="Cali"))
+            db.session.add(Restaurant(name="Centro", city="Pasto"))
+            db.session.commit()
+        for restaurant_id, day, table in [
+            (1, "2024-05-01", 1), (1, "2024-05-01", 2), (1, "2024-05-02", 1),
+            (2, "2024-05-01", 4), (3, "2024-05-02", 7), (3, "2024-06-10", 1),
+        ]:
+            client.post('/reservations', json={"restaurant_id": restaurant_id, "date": day, "table_number": table})
+        yield client
+        with app.app_context():
+            db.drop_all()
+
+def report(client, query):
+    return client.get(f'/reports/occupancy?from=2024-05-01&to=2024-05-31&{query}')
+
+def test_occupancy_by_restaurant(client):
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    with client.application.app_context():
+        engine = db.engine
+    db.event.listen(engine, "before_cursor_execute", record)
+    resp = report(client, "")
+    db.event.remove(engine, "before_cursor_execute", record)
+    assert resp.status_code == 200
+    assert resp.get_json() == [
+        {"restaurant_id": 1, "name": "Norte", "city": "Cali", "reservations": 3, "days": 2, "tables": 2},
+        {"restaurant_id": 2, "name": "Sur", "city": "Cali", "reservations": 1, "days": 1, "tables": 1},
+        {"restaurant_id": 3, "name": "Centro", "city": "Pasto", "reservations": 1, "days": 1, "tables": 1},
+    ]
+    # Una sola consulta agregada
+    assert len(statements) == 1
+    assert "GROUP BY" in statements[0]
+
+def test_occupancy_by_city_and_day(client):
+    assert report(client, "group_by=city").get_json() == [
+        {"city": "Cali", "restaurants": 2, "reservations": 4, "days": 2},
+        {"city": "Pasto", "restaurants": 1, "reservations": 1, "days": 1},
+    ]
+    resp = client.get('/reports/occupancy?from=2024-05-01&to=2024-06-30&group_by=day&format=columnar')
+    assert resp.get_json() == {
+        "date": ["2024-05-01", "2024-05-02", "2024-06-10"],
+        "restaurants": [2, 2, 1],
+        "reservations": [3, 2, 1],
+    }
+
+def test_occupancy_csv(client):
+    resp = report(client, "group_by=city&format=csv")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/csv"
+    assert resp.get_data(as_text=True).splitlines() == [
+        "city,restaurants,reservations,days",
+        "Cali,2,4,2",
+        "Pasto,1,1,1",
+    ]
+
+def test_occupancy_invalid(client):
+    assert client.get('/reports/occupancy?from=2024-05-01').status_code == 400
+    assert client.get('/reports/occupancy?from=2024-05-01&to=2025-06-01').status_code == 400
+    assert report(client, "group_by=mesa").status_code == 400
+    assert report(client, "format=xlsx").status_code == 400
+    assert report(client, "ciudad=Cali").status_code == 400
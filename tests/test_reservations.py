@@ -3,15 +3,14 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pytest
+from datetime import date, datetime, timedelta
 from app import create_app, db
 from app.models import Restaurant
 
 
 @pytest.fixture
 def client():
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
     with app.test_client() as client:
         with app.app_context():
             db.create_all()
@@ -171,6 +170,38 @@ def test_update_reservation_not_found(client):
     assert resp.status_code == 404
     assert "Reserva no encontrada" in resp.get_json()["error"]
 
+def test_update_reservation_rejects_non_object_body(client):
+    client.post('/reservations', json={
+        "restaurant_id": 1,
+        "date": "2024-07-28",
+        "table_number": 5
+    })
+    for body in ([1], "texto", 3):
+        resp = client.put('/reservations/1', json=body)
+        assert resp.status_code == 400
+        assert "objeto JSON" in resp.get_json()["error"]
+
+def test_integer_fields_are_validated_alike(client):
+    assert client.post('/reservations', json={"restaurant_id": 1, "date": "2024-07-29", "table_number": 5}).status_code == 201
+    bad_values = (True, 1.7, "1")
+    for field in ("restaurant_id", "table_number"):
+        for value in bad_values:
+            item = {"restaurant_id": 1, "date": "2024-07-30", "table_number": 6, field: value}
+            message = f"'{field}' debe ser un número entero"
+            resp = client.post('/reservations', json=item)
+            assert resp.status_code == 400 and resp.get_json()["error"] == message
+            result = client.post('/reservations/bulk', json=[item]).get_json()["results"][0]
+            assert result["status"] == 400 and result["error"] == message
+            resp = client.put('/reservations/1', json={field: value})
+            assert resp.status_code == 400 and resp.get_json()["error"] == message
+
+    # Un número entero escrito como 2.0 sigue siendo válido
+    resp = client.post('/reservations', json={"restaurant_id": 1.0, "date": "2024-07-30", "table_number": 6.0})
+    assert resp.status_code == 201
+    assert resp.get_json()["table_number"] == 6
+    resp = client.put('/reservations/1', json={"table_number": 7.0})
+    assert resp.status_code == 200 and resp.get_json()["table_number"] == 7
+
 def test_delete_reservation(client):
     client.post('/reservations', json={
         "restaurant_id": 1,
@@ -185,3 +216,544 @@ def test_delete_reservation_not_found(client):
     resp = client.delete('/reservations/999')
     assert resp.status_code == 404
     assert "Reserva no encontrada" in resp.get_json()["error"]
+
+def test_capacity_counters_follow_crud(client):
+    from app.models import DailyCapacity, DailyTotal
+    client.post('/reservations', json={
+        "restaurant_id": 1,
+        "date": "2024-07-29",
+        "table_number": 1
+    })
+    client.post('/reservations', json={
+        "restaurant_id": 1,
+        "date": "2024-07-29",
+        "table_number": 2
+    })
+    client.put('/reservations/2', json={"table_number": 5})
+    with client.application.app_context():
+        counter = db.session.get(DailyCapacity, (1, date(2024, 7, 29)))
+        assert counter.booked_count == 2
+        assert counter.tables_mask == 0b10001
+        assert db.session.get(DailyTotal, date(2024, 7, 29)).booked_count == 2
+    client.delete('/reservations/1')
+    with client.application.app_context():
+        counter = db.session.get(DailyCapacity, (1, date(2024, 7, 29)))
+        assert counter.booked_count == 1
+        assert counter.tables_mask == 0b10000
+        assert db.session.get(DailyTotal, date(2024, 7, 29)).booked_count == 1
+    # La mesa liberada vuelve a estar disponible
+    resp = client.post('/reservations', json={
+        "restaurant_id": 1,
+        "date": "2024-07-29",
+        "table_number": 1
+    })
+    assert resp.status_code == 201
+
+def test_invalid_date(client):
+    resp = client.post('/reservations', json={
+        "restaurant_id": 1,
+        "date": "22/07/2024",
+        "table_number": 4
+    })
+    assert resp.status_code == 400
+    assert "date" in resp.get_json()["error"]
+    resp = client.get('/reservations?date=mañana')
+    assert resp.status_code == 400
+    assert "YYYY-MM-DD" in resp.get_json()["error"]
+
+def test_list_reservations_keyset_pagination(client):
+    for table in range(1, 6):
+        client.post('/reservations', json={
+            "restaurant_id": 1,
+            "date": "2024-07-30",
+            "table_number": table
+        })
+    resp = client.get('/reservations?limit=2')
+    assert resp.status_code == 200
+    assert [r["table_number"] for r in resp.get_json()] == [1, 2]
+    cursor = resp.headers["X-Next-Cursor"]
+    resp = client.get(f'/reservations?limit=2&after={cursor}')
+    assert [r["table_number"] for r in resp.get_json()] == [3, 4]
+    cursor = resp.headers["X-Next-Cursor"]
+    resp = client.get(f'/reservations?limit=2&after={cursor}')
+    assert [r["table_number"] for r in resp.get_json()] == [5]
+    assert "X-Next-Cursor" not in resp.headers
+    resp = client.get('/reservations?limit=0')
+    assert resp.status_code == 400
+
+def test_list_reservations_ndjson_stream(client):
+    import json
+    for table in range(1, 4):
+        client.post('/reservations', json={
+            "restaurant_id": 1,
+            "date": "2024-07-31",
+            "table_number": table
+        })
+    resp = client.get('/reservations?format=ndjson&date=2024-07-31')
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/x-ndjson"
+    lines = resp.get_data(as_text=True).splitlines()
+    assert [json.loads(line)["table_number"] for line in lines] == [1, 2, 3]
+
+def test_list_reservations_streams_in_chunks(client, monkeypatch):
+    monkeypatch.setattr("app.pagination.STREAM_CHUNK_SIZE", 2)
+    for table in range(1, 6):
+        client.post('/reservations', json={
+            "restaurant_id": 1,
+            "date": "2024-08-01",
+            "table_number": table
+        })
+    resp = client.get('/reservations')
+    assert [r["table_number"] for r in resp.get_json()] == [1, 2, 3, 4, 5]
+
+def test_restaurant_availability(client):
+    for table in (2, 3):
+        client.post('/reservations', json={
+            "restaurant_id": 1,
+            "date": "2024-08-02",
+            "table_number": table
+        })
+    resp = client.get('/restaurants/1/availability?from=2024-08-01&to=2024-08-02')
+    assert resp.status_code == 200
+    days = resp.get_json()["days"]
+    assert [d["date"] for d in days] == ["2024-08-01", "2024-08-02"]
+    assert days[0]["free_tables"] == list(range(1, 16))
+    assert days[0]["restaurant_remaining"] == 15
+    assert days[1]["free_tables"] == [1] + list(range(4, 16))
+    assert days[1]["restaurant_remaining"] == 13
+    assert days[1]["global_remaining"] == 18
+
+def test_restaurant_availability_invalid(client):
+    assert client.get('/restaurants/1/availability').status_code == 400
+    resp = client.get('/restaurants/1/availability?from=2024-08-02&to=2024-08-01')
+    assert resp.status_code == 400
+    resp = client.get('/restaurants/999/availability?from=2024-08-01')
+    assert resp.status_code == 404
+
+def test_bulk_create_reservations(client):
+    client.post('/reservations', json={
+        "restaurant_id": 1,
+        "date": "2024-08-03",
+        "table_number": 1
+    })
+    resp = client.post('/reservations/bulk', json=[
+        {"restaurant_id": 1, "date": "2024-08-03", "table_number": 2},
+        {"restaurant_id": 1, "date": "2024-08-03", "table_number": 1},
+        {"restaurant_id": 1, "date": "2024-08-03", "table_number": 2},
+        {"restaurant_id": 999, "date": "2024-08-03", "table_number": 3},
+        {"restaurant_id": 1, "date": "2024-08-03", "table_number": 40},
+        {"restaurant_id": 1, "date": "2024-08-03"},
+        {"restaurant_id": 1, "date": "2024-08-04", "table_number": 2},
+    ])
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["created"] == 2
+    assert body["rejected"] == 5
+    results = body["results"]
+    assert [r["status"] for r in results] == [201, 400, 400, 400, 400, 400, 201]
+    assert results[0]["reservation"]["table_number"] == 2
+    assert "ya está reservada" in results[1]["error"]
+    assert "ya está reservada" in results[2]["error"]
+    assert results[3]["error"] == "El restaurante no existe"
+    assert "entre 1 y 15" in results[4]["error"]
+    assert "table_number" in results[5]["error"]
+    resp = client.get('/restaurants/1/availability?from=2024-08-03')
+    assert resp.get_json()["days"][0]["restaurant_remaining"] == 13
+
+def test_bulk_respects_caps(client):
+    import json
+    lines = "\n".join(json.dumps({
+        "restaurant_id": 1,
+        "date": "2024-08-05",
+        "table_number": table
+    }) for table in range(1, 16))
+    resp = client.post('/reservations/bulk', data=lines + "\n",
+                       content_type='application/x-ndjson')
+    assert resp.get_json()["created"] == 15
+    with client.application.app_context():
+        db.session.add(Restaurant(name="R2", city="b"))
+        db.session.commit()
+    resp = client.post('/reservations/bulk', json=[
+        {"restaurant_id": 2, "date": "2024-08-05", "table_number": table}
+        for table in range(1, 8)
+    ])
+    results = resp.get_json()["results"]
+    assert [r["status"] for r in results] == [201] * 5 + [400] * 2
+    assert results[5]["error"] == "No hay más cupo total para esa fecha"
+
+def test_bulk_invalid_payload(client):
+    assert client.post('/reservations/bulk', json={"restaurant_id": 1}).status_code == 400
+    assert client.post('/reservations/bulk', json=[]).status_code == 400
+    resp = client.post('/reservations/bulk', data="{no json}\n",
+                       content_type='application/x-ndjson')
+    assert resp.status_code == 400
+
+class _StatementCounter:
+    """Count the SQL statements sent to the engine while active."""
+
+    def __init__(self, app):
+        with app.app_context():
+            self.engine = db.engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        db.event.listen(self.engine, "before_cursor_execute", self._record)
+        return self.statements
+
+    def __exit__(self, *exc):
+        db.event.remove(self.engine, "before_cursor_execute", self._record)
+
+def test_update_and_delete_statement_counts(client):
+    client.post('/reservations', json={
+        "restaurant_id": 1,
+        "date": "2024-08-06",
+        "table_number": 1
+    })
+    with _StatementCounter(client.application) as statements:
+        resp = client.put('/reservations/1', json={"table_number": 2})
+    assert resp.status_code == 200
+    # Bloqueo y lectura, cambio de mesa en el mapa de bits, UPDATE ... RETURNING y el registro de cambios
+    assert len(statements) == 4
+    with _StatementCounter(client.application) as statements:
+        resp = client.put('/reservations/1', json={"date": "2024-08-07"})
+    assert resp.status_code == 200
+    assert resp.get_json()["date"] == "2024-08-07"
+    assert len(statements) == 7
+    with _StatementCounter(client.application) as statements:
+        resp = client.delete('/reservations/1')
+    assert resp.status_code == 200
+    # DELETE ... RETURNING, la liberación de los dos contadores y el registro de cambios
+    assert len(statements) == 4
+
+def test_move_locks_counters_in_key_order():
+    from sqlalchemy.dialects import postgresql
+    from app.capacity import counter_locks
+    d1, d2 = date(2024, 7, 1), date(2024, 7, 2)
+    # d1->d2 y d2->d1 piden los mismos bloqueos en el mismo orden
+    forward = counter_locks({(1, d1), (2, d2)}, {d1, d2})
+    backward = counter_locks({(2, d2), (1, d1)}, {d2, d1})
+    for statements in (forward, backward):
+        restaurants, days = (
+            str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+            for statement in statements
+        )
+        assert restaurants.endswith(
+            "ORDER BY daily_capacity.restaurant_id, daily_capacity.date FOR UPDATE"
+        )
+        assert "(1, '2024-07-01'), (2, '2024-07-02')" in restaurants
+        assert days.endswith("ORDER BY daily_totals.date FOR UPDATE")
+
+def test_update_reservation_enforces_caps(client):
+    for table in range(1, 16):
+        client.post('/reservations', json={
+            "restaurant_id": 1,
+            "date": "2024-08-08",
+            "table_number": table
+        })
+    client.post('/reservations', json={
+        "restaurant_id": 1,
+        "date": "2024-08-09",
+        "table_number": 15
+    })
+    resp = client.put('/reservations/16', json={"date": "2024-08-08", "table_number": 1})
+    assert resp.status_code == 400
+    assert "ya está reservada" in resp.get_json()["error"]
+    with client.application.app_context():
+        db.session.add(Restaurant(name="R2", city="b"))
+        db.session.commit()
+    for table in range(1, 6):
+        client.post('/reservations', json={
+            "restaurant_id": 2,
+            "date": "2024-08-08",
+            "table_number": table
+        })
+    resp = client.put('/reservations/16', json={"restaurant_id": 2, "date": "2024-08-08"})
+    assert resp.status_code == 400
+    assert "No hay más cupo total" in resp.get_json()["error"]
+    # La reserva rechazada sigue donde estaba y su cupo intacto
+    resp = client.get('/restaurants/1/availability?from=2024-08-09')
+    assert resp.get_json()["days"][0]["free_tables"] == list(range(1, 15))
+
+def test_delete_restaurant_with_reservations(client):
+    client.post('/reservations', json={
+        "restaurant_id": 1,
+        "date": "2024-08-10",
+        "table_number": 1
+    })
+    resp = client.delete('/restaurants/1')
+    assert resp.status_code == 409
+    client.delete('/reservations/1')
+    assert client.delete('/restaurants/1').status_code == 200
+
+def test_hold_then_confirm(client):
+    from app.models import DailyCapacity
+    resp = client.post('/reservations/holds', json={
+        "restaurant_id": 1,
+        "date": "2024-08-11",
+        "table_number": 3
+    })
+    assert resp.status_code == 201
+    hold = resp.get_json()
+    assert hold["expires_at"] > "2024"
+    # La mesa retenida no se puede reservar mientras la retención esté viva
+    resp = client.post('/reservations', json={
+        "restaurant_id": 1,
+        "date": "2024-08-11",
+        "table_number": 3
+    })
+    assert resp.status_code == 400
+
+    resp = client.post(f'/reservations/holds/{hold["id"]}/confirm')
+    assert resp.status_code == 201
+    assert resp.get_json()["table_number"] == 3
+    assert client.post(f'/reservations/holds/{hold["id"]}/confirm').status_code == 404
+    with client.application.app_context():
+        counter = db.session.get(DailyCapacity, (1, date(2024, 8, 11)))
+        assert counter.booked_count == 1
+        assert counter.tables_mask == 0b100
+
+def test_expired_holds_are_swept(client):
+    from app.models import DailyCapacity, DailyTotal, Hold
+    for table in (1, 2):
+        client.post('/reservations/holds', json={
+            "restaurant_id": 1,
+            "date": "2024-08-12",
+            "table_number": table
+        })
+    with client.application.app_context():
+        db.session.execute(db.update(Hold).values(expires_at=datetime(2000, 1, 1)))
+        db.session.commit()
+    assert client.post('/reservations/holds/1/confirm').status_code == 410
+
+    result = client.application.test_cli_runner().invoke(args=['holds', 'sweep', '--batch-size', '1'])
+    assert result.exit_code == 0
+    assert "Released 2 expired holds" in result.output
+    with client.application.app_context():
+        assert db.session.get(DailyCapacity, (1, date(2024, 8, 12))).booked_count == 0
+        assert db.session.get(DailyTotal, date(2024, 8, 12)).booked_count == 0
+    resp = client.get('/restaurants/1/availability?from=2024-08-12')
+    assert resp.get_json()["days"][0]["free_tables"] == list(range(1, 16))
+
+def test_holds_count_against_caps(client):
+    for table in range(1, 16):
+        resp = client.post('/reservations/holds', json={
+            "restaurant_id": 1,
+            "date": "2024-08-13",
+            "table_number": table
+        })
+        assert resp.status_code == 201
+    resp = client.post('/reservations/holds', json={
+        "restaurant_id": 1,
+        "date": "2024-08-13",
+        "table_number": 1
+    })
+    assert resp.status_code == 400
+    assert client.delete('/reservations/holds/15').status_code == 200
+    assert client.delete('/reservations/holds/15').status_code == 404
+    resp = client.post('/reservations', json={
+        "restaurant_id": 1,
+        "date": "2024-08-13",
+        "table_number": 15
+    })
+    assert resp.status_code == 201
+
+def test_idempotent_retry_replays_response(client):
+    payload = {"restaurant_id": 1, "date": "2024-08-14", "table_number": 3}
+    headers = {"Idempotency-Key": "retry-1"}
+    first = client.post('/reservations', json=payload, headers=headers)
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+
+    # Sin la LRU en memoria la respuesta sale de la tabla
+    client.application.extensions['idempotency'] = type(client.application.extensions['idempotency'])()
+    for _ in range(2):
+        retry = client.post('/reservations', json=payload, headers=headers)
+        assert retry.status_code == 201
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert retry.get_json() == first.get_json()
+    assert len(client.get('/reservations').get_json()) == 1
+
+    resp = client.post('/reservations', json={**payload, "table_number": 4}, headers=headers)
+    assert resp.status_code == 422
+    # La misma clave en otro endpoint tampoco se acepta
+    assert client.post('/reservations/holds', json=payload, headers=headers).status_code == 422
+
+def test_idempotent_errors_are_replayed(client):
+    payload = {"restaurant_id": 1, "date": "2024-08-15", "table_number": 16}
+    headers = {"Idempotency-Key": "retry-2"}
+    first = client.post('/reservations', json=payload, headers=headers)
+    assert first.status_code == 400
+    retry = client.post('/reservations', json=payload, headers=headers)
+    assert retry.status_code == 400
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.get_json() == first.get_json()
+    assert client.post('/reservations', json=payload, headers={"Idempotency-Key": ""}).status_code == 400
+
+def test_abandoned_idempotency_claims_are_reclaimed(client, monkeypatch):
+    from app.idempotency import Idempotency, _now
+    from app.models import IdempotencyKey
+    payload = {"restaurant_id": 1, "date": "2024-08-17", "table_number": 16}
+    headers = {"Idempotency-Key": "crash-1"}
+    # El worker muere tras reclamar la clave, antes de guardar la respuesta
+    monkeypatch.setattr(Idempotency, '_store', lambda self, key, response: None)
+    client.post('/reservations', json=payload, headers=headers)
+    monkeypatch.undo()
+    client.application.extensions['idempotency'] = type(client.application.extensions['idempotency'])()
+    assert client.post('/reservations', json=payload, headers=headers).status_code == 409
+
+    with client.application.app_context():
+        db.session.execute(db.update(IdempotencyKey).values(created_at=_now() - timedelta(seconds=61)))
+        db.session.commit()
+    assert client.post('/reservations', json={**payload, "table_number": 15}, headers=headers).status_code == 422
+    retry = client.post('/reservations', json=payload, headers=headers)
+    assert retry.status_code == 400
+    assert "Idempotent-Replayed" not in retry.headers
+    assert client.post('/reservations', json=payload, headers=headers).headers["Idempotent-Replayed"] == "true"
+
+def test_expired_idempotency_keys_are_purged(client):
+    from app.models import IdempotencyKey
+    for key in ("a", "b", "c"):
+        client.post('/reservations/holds', json={
+            "restaurant_id": 1,
+            "date": "2024-08-16",
+            "table_number": ord(key) - 96
+        }, headers={"Idempotency-Key": key})
+    with client.application.app_context():
+        db.session.execute(
+            db.update(IdempotencyKey).where(IdempotencyKey.key != "c").values(created_at=datetime(2000, 1, 1))
+        )
+        db.session.commit()
+
+    result = client.application.test_cli_runner().invoke(args=['idempotency', 'purge', '--batch-size', '1'])
+    assert result.exit_code == 0
+    assert "Purged 2 expired idempotency keys" in result.output
+    with client.application.app_context():
+        assert db.session.scalars(db.select(IdempotencyKey.key)).all() == ["c"]
+
+def test_expand_restaurant_in_constant_queries(client):
+    def listed(path):
+        with _StatementCounter(client.application) as statements:
+            resp = client.get(path)
+        assert resp.status_code == 200
+        return resp.get_json(), len(statements)
+
+    client.post('/reservations', json={"restaurant_id": 1, "date": "2024-08-17", "table_number": 1})
+    reservations, few = listed('/reservations?expand=restaurant')
+    assert reservations[0]["restaurant"]["name"] == "Restaurante Test"
+
+    with client.application.app_context():
+        db.session.add_all(Restaurant(name=f"Extra {i}", city="Cali") for i in range(5))
+        db.session.commit()
+    for restaurant_id in range(2, 7):
+        for table in (1, 2):
+            client.post('/reservations', json={
+                "restaurant_id": restaurant_id,
+                "date": "2024-08-17",
+                "table_number": table
+            })
+    reservations, many = listed('/reservations?expand=restaurant')
+    assert len(reservations) == 11
+    assert many == few
+    assert {r["restaurant"]["id"] for r in reservations} == set(range(1, 7))
+    assert all(r["restaurant"]["id"] == r["restaurant_id"] for r in reservations)
+
+    page_, count = listed('/reservations?expand=restaurant&limit=4&after=2')
+    assert [r["id"] for r in page_] == [3, 4, 5, 6]
+    assert page_[0]["restaurant"]["name"] == "Extra 0"
+    assert count == few
+    assert client.get('/reservations?expand=mesa').status_code == 400
+
+def test_archive_old_reservations(client):
+    from app.models import ArchivedReservation, DailyCapacity
+    for day, table in [("2020-01-10", 1), ("2020-01-10", 2), ("2021-03-05", 1), ("2020-02-01", 3)]:
+        client.post('/reservations', json={"restaurant_id": 1, "date": day, "table_number": table})
+    client.post('/reservations', json={"restaurant_id": 1, "date": date.today().isoformat(), "table_number": 1})
+
+    result = client.application.test_cli_runner().invoke(
+        args=['reservations', 'archive', '--older-than', '30', '--batch-size', '2']
+    )
+    assert result.exit_code == 0
+    assert "Archived 4 reservations" in result.output
+    assert [r["id"] for r in client.get('/reservations').get_json()] == [5]
+    with client.application.app_context():
+        archived = db.session.scalars(db.select(ArchivedReservation).order_by(ArchivedReservation.id)).all()
+        assert [(r.id, r.date.isoformat(), r.table_number) for r in archived] == [
+            (1, "2020-01-10", 1), (2, "2020-01-10", 2), (3, "2021-03-05", 1), (4, "2020-02-01", 3),
+        ]
+        assert all(r.archived_at is not None for r in archived)
+        # Los contadores no cambian: las mesas archivadas siguen ocupadas
+        assert db.session.get(DailyCapacity, (1, date(2020, 1, 10))).booked_count == 2
+    resp = client.post('/reservations', json={"restaurant_id": 1, "date": "2020-01-10", "table_number": 1})
+    assert resp.status_code == 400
+
+def test_archive_keeps_newest_reservation(client):
+    client.post('/reservations', json={"restaurant_id": 1, "date": "2020-01-10", "table_number": 1})
+    result = client.application.test_cli_runner().invoke(args=['reservations', 'archive'])
+    assert "Archived 0 reservations" in result.output
+    assert len(client.get('/reservations').get_json()) == 1
+
+def test_change_feed(client):
+    assert client.get('/reservations/changes').get_json() == {"changes": [], "last_seq": 0}
+    client.post('/reservations', json={"restaurant_id": 1, "date": "2024-08-20", "table_number": 1})
+    client.post('/reservations/bulk', json=[{"restaurant_id": 1, "date": "2024-08-20", "table_number": 2}])
+    client.put('/reservations/1', json={"table_number": 3})
+    client.put('/reservations/2', json={"date": "2024-08-21"})
+    client.delete('/reservations/1')
+
+    changes = client.get('/reservations/changes?since=0').get_json()
+    assert changes["last_seq"] == 6
+    assert [(c["seq"], c["operation"], c["reservation_id"], c["date"], c["table_number"]) for c in changes["changes"]] == [
+        (1, "insert", 1, "2024-08-20", 1),
+        (2, "insert", 2, "2024-08-20", 2),
+        (3, "update", 1, "2024-08-20", 3),
+        # Al cambiar de fecha se avisa primero en la fecha de origen
+        (4, "delete", 2, "2024-08-20", 2),
+        (5, "update", 2, "2024-08-21", 2),
+        (6, "delete", 1, "2024-08-20", 3),
+    ]
+    resp = client.get('/reservations/changes?since=3&date=2024-08-20').get_json()
+    assert [c["seq"] for c in resp["changes"]] == [4, 6]
+    assert resp["last_seq"] == 6
+    # Un cambio rechazado no deja rastro en el registro
+    client.post('/reservations', json={"restaurant_id": 1, "date": "2024-08-21", "table_number": 2})
+    assert client.get('/reservations/changes?since=6').get_json() == {"changes": [], "last_seq": 6}
+    assert client.get('/reservations/changes?since=abc').status_code == 400
+
+def test_changes_are_appended_at_commit(client):
+    from app.changes import INSERT, record_changes
+    from app.models import ReservationChange
+    client.post('/reservations', json={"restaurant_id": 1, "date": "2024-08-23", "table_number": 1})
+    with _StatementCounter(client.application) as statements:
+        assert client.put('/reservations/1', json={"table_number": 2}).status_code == 200
+    # El registro se escribe justo antes del COMMIT, después de todo lo demás
+    assert statements[-1].startswith("INSERT INTO reservation_changes")
+    assert sum("reservation_changes" in statement for statement in statements) == 1
+
+    with client.application.app_context():
+        record_changes([(INSERT, 9, 1, date(2024, 8, 23), 5)])
+        assert db.session.scalar(db.select(db.func.count()).select_from(ReservationChange)) == 2
+        db.session.rollback()
+        db.session.commit()
+        assert db.session.scalar(db.select(db.func.count()).select_from(ReservationChange)) == 2
+
+def test_change_stream(client):
+    client.application.config['CHANGES_STREAM_TIMEOUT'] = 0
+    client.post('/reservations', json={"restaurant_id": 1, "date": "2024-08-22", "table_number": 1})
+    client.post('/reservations', json={"restaurant_id": 1, "date": "2024-08-22", "table_number": 2})
+
+    resp = client.get('/reservations/changes/stream?since=0')
+    assert resp.mimetype == "text/event-stream"
+    events = resp.get_data(as_text=True).split("\n\n")
+    assert events[0] == "retry: 1000"
+    assert events[1].startswith('id: 1\nevent: insert\ndata: {"seq": 1, "operation": "insert"')
+    assert events[2].startswith("id: 2\n")
+
+    # Al reconectar, Last-Event-ID continúa donde se quedó el cliente
+    resp = client.get('/reservations/changes/stream', headers={"Last-Event-ID": "1"})
+    assert "id: 1\n" not in resp.get_data(as_text=True)
+    assert "id: 2\n" in resp.get_data(as_text=True)
+    resp = client.get('/reservations/changes/stream')
+    assert resp.get_data(as_text=True) == "retry: 1000\n\n"
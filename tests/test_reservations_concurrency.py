@@ -0,0 +1,220 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+from collections import Counter
+from datetime import date
+
+import pytest
+from app import create_app, db
+from app.extensions import group_commit
+from app.models import Restaurant, Reservation
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'stress.db'}",
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 40, 'connect_args': {'timeout': 30}},
+    })
+    with app.app_context():
+        db.create_all()
+        for i in range(2):
+            db.session.add(Restaurant(name=f"R{i}", city="Test City"))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+
+
+def test_concurrent_bookings_respect_caps(app):
+    # Cada mesa de ambos restaurantes se pide dos veces en paralelo para la misma fecha
+    attempts = [(rid, table) for rid in (1, 2) for table in range(1, 16)] * 2
+    statuses = []
+    barrier = threading.Barrier(len(attempts))
+
+    def book(restaurant_id, table_number):
+        client = app.test_client()
+        barrier.wait()
+        resp = client.post('/reservations', json={
+            "restaurant_id": restaurant_id,
+            "date": "2024-02-14",
+            "table_number": table_number
+        })
+        statuses.append(resp.status_code)
+
+    threads = [threading.Thread(target=book, args=args) for args in attempts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(statuses) <= {201, 400}
+    assert statuses.count(201) == 20
+    with app.app_context():
+        rows = Reservation.query.filter_by(date=date(2024, 2, 14)).all()
+    assert len(rows) == 20
+    per_restaurant = Counter(r.restaurant_id for r in rows)
+    assert all(count <= 15 for count in per_restaurant.values())
+    assert len({(r.restaurant_id, r.table_number) for r in rows}) == len(rows)
+
+
+def test_group_commit_batches_concurrent_bookings(app, monkeypatch):
+    import app.capacity as capacity
+    app.config.update(GROUP_COMMIT_ENABLED=True, GROUP_COMMIT_WINDOW_MS=50)
+    group_commit.init_app(app)
+    batches = []
+
+    def recording_admit_many(candidates):
+        batches.append(len(candidates))
+        return real_admit_many(candidates)
+
+    real_admit_many = capacity.admit_many
+    monkeypatch.setattr(capacity, 'admit_many', recording_admit_many)
+
+    attempts = [(rid, table) for rid in (1, 2) for table in range(1, 16)] * 2
+    responses = []
+    barrier = threading.Barrier(len(attempts))
+
+    def book(restaurant_id, table_number):
+        client = app.test_client()
+        barrier.wait()
+        responses.append(client.post('/reservations', json={
+            "restaurant_id": restaurant_id,
+            "date": "2024-02-14",
+            "table_number": table_number
+        }))
+
+    threads = [threading.Thread(target=book, args=args) for args in attempts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Mismas reglas que sin agrupar, pero en menos transacciones que peticiones
+    statuses = [resp.status_code for resp in responses]
+    assert set(statuses) <= {201, 400}
+    assert statuses.count(201) == 20
+    assert sum(batches) == len(attempts)
+    assert len(batches) < len(attempts)
+    created = [resp.get_json()["id"] for resp in responses if resp.status_code == 201]
+    with app.app_context():
+        rows = Reservation.query.filter_by(date=date(2024, 2, 14)).all()
+    assert sorted(created) == sorted(r.id for r in rows)
+    assert len({(r.restaurant_id, r.table_number) for r in rows}) == len(rows)
+
+
+def test_group_commit_falls_back_to_single_commits(app, monkeypatch):
+    import app.capacity as capacity
+    app.config['GROUP_COMMIT_ENABLED'] = True
+    group_commit.init_app(app)
+
+    def conflicting_admit_many(candidates):
+        raise capacity.CapacityError(capacity.BULK_CONFLICT)
+
+    monkeypatch.setattr(capacity, 'admit_many', conflicting_admit_many)
+    client = app.test_client()
+    resp = client.post('/reservations', json={"restaurant_id": 1, "date": "2024-03-01", "table_number": 3})
+    assert resp.status_code == 201
+    resp = client.post('/reservations', json={"restaurant_id": 1, "date": "2024-03-01", "table_number": 3})
+    assert resp.status_code == 400
+    assert "ya está reservada" in resp.get_json()["error"]
+
+
+def test_group_commit_fallback_isolates_errors(app, monkeypatch):
+    import app.capacity as capacity
+    app.config['GROUP_COMMIT_ENABLED'] = True
+    group_commit.init_app(app)
+    real_admit = capacity.admit_reservation
+
+    def conflicting_admit_many(candidates):
+        raise capacity.CapacityError(capacity.BULK_CONFLICT)
+
+    def failing_admit(restaurant_id, date, table_number):
+        if table_number == 2:
+            raise RuntimeError("fallo de la base de datos")
+        return real_admit(restaurant_id, date, table_number)
+
+    monkeypatch.setattr(capacity, 'admit_many', conflicting_admit_many)
+    monkeypatch.setattr(capacity, 'admit_reservation', failing_admit)
+    day = date(2024, 3, 2)
+    with app.app_context():
+        outcomes = app.extensions['group_commit']._flush([(1, day, 1), (1, day, 2), (1, day, 3)])
+    # Solo falla la reserva con error; las demás quedan confirmadas
+    assert isinstance(outcomes[1], RuntimeError)
+    assert [outcomes[0].table_number, outcomes[2].table_number] == [1, 3]
+    with app.app_context():
+        assert sorted(r.table_number for r in Reservation.query.filter_by(date=day)) == [1, 3]
+
+
+def test_bulk_claims_counters_in_key_order(app, monkeypatch):
+    import app.capacity as capacity
+    claimed = []
+    real_restaurant, real_day = capacity._claim_restaurant_slots, capacity._claim_day_slots
+
+    def claim_restaurant(restaurant_id, date, mask, count=1):
+        claimed.append((restaurant_id, date))
+        return real_restaurant(restaurant_id, date, mask, count)
+
+    def claim_day(date, count=1):
+        claimed.append(date)
+        return real_day(date, count)
+
+    monkeypatch.setattr(capacity, '_claim_restaurant_slots', claim_restaurant)
+    monkeypatch.setattr(capacity, '_claim_day_slots', claim_day)
+    resp = app.test_client().post('/reservations/bulk', json=[
+        {"restaurant_id": 2, "date": "2024-06-02", "table_number": 1},
+        {"restaurant_id": 1, "date": "2024-06-02", "table_number": 1},
+        {"restaurant_id": 2, "date": "2024-06-01", "table_number": 1},
+    ])
+    assert resp.get_json()["created"] == 3
+    # El orden de llegada no decide el orden de los bloqueos
+    assert claimed == [
+        (1, date(2024, 6, 2)), (2, date(2024, 6, 1)), (2, date(2024, 6, 2)),
+        date(2024, 6, 1), date(2024, 6, 2),
+    ]
+
+
+def test_bulk_replans_when_counters_move(app, monkeypatch):
+    import app.capacity as capacity
+    client = app.test_client()
+    client.post('/reservations', json={"restaurant_id": 1, "date": "2024-12-31", "table_number": 1})
+
+    real_snapshot = capacity._bulk_snapshot
+    calls = []
+
+    def stale_snapshot(candidates):
+        # La primera lectura no ve la reserva ya hecha, como si llegara en paralelo
+        calls.append(candidates)
+        existing, counters, totals = real_snapshot(candidates)
+        if len(calls) == 1:
+            return existing, {}, {}
+        return existing, counters, totals
+
+    monkeypatch.setattr(capacity, '_bulk_snapshot', stale_snapshot)
+    resp = client.post('/reservations/bulk', json=[
+        {"restaurant_id": 1, "date": "2024-12-31", "table_number": 1},
+        {"restaurant_id": 1, "date": "2024-12-31", "table_number": 2},
+    ])
+    assert len(calls) == 2
+    assert [r["status"] for r in resp.get_json()["results"]] == [400, 201]
+    with app.app_context():
+        assert Reservation.query.filter_by(date=date(2024, 12, 31)).count() == 2
+
+
+def test_sqlite_pragmas_applied(app):
+    with app.app_context():
+        assert db.session.execute(db.text("PRAGMA journal_mode")).scalar() == "wal"
+        assert db.session.execute(db.text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert db.session.execute(db.text("PRAGMA busy_timeout")).scalar() == 5000
+
+
+def test_unsupported_database_fails_at_startup():
+    from sqlalchemy import create_mock_engine
+    from app.database import check_dialects
+    check_dialects([create_mock_engine('sqlite://', None), create_mock_engine('postgresql://', None)])
+    with pytest.raises(RuntimeError, match="Unsupported database 'mysql'"):
+        check_dialects([create_mock_engine('mysql://', None)])
@@ -8,9 +8,7 @@ from app import create_app, db
 
 @pytest.fixture
 def client():
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
     with app.test_client() as client:
         with app.app_context():
             db.create_all()
@@ -110,3 +108,177 @@ def test_create_restaurant_invalid(client):
     })
     assert resp.status_code == 400
     assert "name" in resp.get_json()["error"]
+
+def test_list_restaurants_keyset_pagination(client):
+    for name in ["Uno", "Dos", "Tres"]:
+        client.post('/restaurants', json={"name": name, "city": "Cali"})
+    resp = client.get('/restaurants?limit=2')
+    assert resp.status_code == 200
+    assert [r["name"] for r in resp.get_json()] == ["Uno", "Dos"]
+    resp = client.get(f'/restaurants?limit=2&after={resp.headers["X-Next-Cursor"]}')
+    assert [r["name"] for r in resp.get_json()] == ["Tres"]
+    assert "X-Next-Cursor" not in resp.headers
+
+def test_list_restaurants_fields_projection(client):
+    client.post('/restaurants', json={
+        "name": "Ligero",
+        "description": "Un texto muy largo",
+        "city": "Pasto"
+    })
+    resp = client.get('/restaurants?fields=name,city')
+    assert resp.status_code == 200
+    assert resp.get_json() == [{"id": 1, "name": "Ligero", "city": "Pasto"}]
+    resp = client.get('/restaurants?fields=secreto')
+    assert resp.status_code == 400
+    assert "Campo no soportado" in resp.get_json()["error"]
+
+def test_letra_filter_escapes_wildcards(client):
+    client.post('/restaurants', json={"name": "100% Arepa"})
+    client.post('/restaurants', json={"name": "1000 Sabores"})
+    resp = client.get('/restaurants?letra=100%25')
+    assert [r["name"] for r in resp.get_json()] == ["100% Arepa"]
+
+def test_letra_filter_uses_name_index(client):
+    from app.models import Restaurant
+    with client.application.app_context():
+        query = Restaurant.query.filter(Restaurant.name.like("A%", escape="\\"))
+        sql = str(query.statement.compile(db.engine))
+        plan = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", ("A%",)).all()
+    assert "SEARCH restaurants USING INDEX ix_restaurants_name_nocase" in str(plan)
+
+def test_list_restaurants_cached_until_write(client):
+    from app.models import Restaurant
+    client.post('/restaurants', json={"name": "Primero", "city": "Cali"})
+    assert len(client.get('/restaurants').get_json()) == 1
+    # Una escritura fuera de la API no invalida la caché
+    with client.application.app_context():
+        db.session.add(Restaurant(name="Fantasma", city="Cali"))
+        db.session.commit()
+    assert len(client.get('/restaurants').get_json()) == 1
+    # Crear por la API sí la invalida
+    client.post('/restaurants', json={"name": "Tercero", "city": "Cali"})
+    assert len(client.get('/restaurants').get_json()) == 3
+    client.put('/restaurants/1', json={"name": "Renombrado"})
+    assert client.get('/restaurants').get_json()[0]["name"] == "Renombrado"
+    client.delete('/restaurants/3')
+    assert len(client.get('/restaurants').get_json()) == 2
+
+def test_list_restaurants_etag(client):
+    client.post('/restaurants', json={"name": "Etiquetado"})
+    resp = client.get('/restaurants?ciudad=Cali')
+    etag = resp.headers["ETag"]
+    resp = client.get('/restaurants?ciudad=Cali', headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    client.post('/restaurants', json={"name": "Otro", "city": "Cali"})
+    resp = client.get('/restaurants?ciudad=Cali', headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+def test_redis_cache_backend_shared_between_apps():
+    from app import create_app
+    from app.cache import RedisBackend
+
+    class DictRedis:
+        """Minimal stand-in with the subset of the redis client API the backend uses."""
+
+        def __init__(self):
+            self.data = {}
+
+        def get(self, key):
+            return self.data.get(key)
+
+        def set(self, key, value, ex=None):
+            self.data[key] = value
+
+        def incr(self, key):
+            self.data[key] = int(self.data.get(key, 0)) + 1
+            return self.data[key]
+
+    backend = RedisBackend(DictRedis())
+    config = {'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'RESPONSE_CACHE_BACKEND': backend}
+    worker_a, worker_b = create_app(config), create_app(config)
+    with worker_a.app_context():
+        db.create_all()
+    try:
+        worker_a.test_client().post('/restaurants', json={"name": "Compartido"})
+        etag = worker_a.test_client().get('/restaurants').headers["ETag"]
+        # El segundo worker responde desde la caché compartida sin tener las tablas
+        resp = worker_b.test_client().get('/restaurants', headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+    finally:
+        with worker_a.app_context():
+            db.drop_all()
+
+def test_list_restaurants_reservations_count(client):
+    for name in ["Lleno", "Vacio"]:
+        client.post('/restaurants', json={"name": name, "city": "Cali"})
+    for table in (1, 2, 3):
+        client.post('/reservations', json={"restaurant_id": 1, "date": "2024-07-01", "table_number": table})
+    resp = client.get('/restaurants?include=reservations_count&fields=name')
+    assert resp.get_json() == [
+        {"id": 1, "name": "Lleno", "reservations_count": 3},
+        {"id": 2, "name": "Vacio", "reservations_count": 0},
+    ]
+    # Los conteos no se sirven desde la caché de restaurantes
+    client.post('/reservations', json={"restaurant_id": 2, "date": "2024-07-01", "table_number": 1})
+    resp = client.get('/restaurants?include=reservations_count&limit=1&after=1')
+    assert resp.get_json()[0]["reservations_count"] == 1
+    assert client.get('/restaurants?include=reseñas').status_code == 400
+
+def test_search_restaurants(client):
+    client.post('/restaurants', json={"name": "Pizzería Bogotá", "description": "Horno de leña", "city": "Medellín"})
+    client.post('/restaurants', json={"name": "Arepas", "description": "La mejor pizza de la ciudad", "city": "Bogotá"})
+    client.post('/restaurants', json={"name": "Sushi", "city": "Cali"})
+
+    # Sin tildes, por prefijo y con el nombre mejor ponderado que la descripción
+    resp = client.get('/restaurants/search?q=pizz')
+    assert resp.status_code == 200
+    assert [r["name"] for r in resp.get_json()] == ["Pizzería Bogotá", "Arepas"]
+    assert [r["id"] for r in client.get('/restaurants/search?q=bogota leña').get_json()] == [1]
+    resp = client.get('/restaurants/search?q=pizz&limit=1')
+    assert [r["id"] for r in resp.get_json()] == [1]
+    resp = client.get(f'/restaurants/search?q=pizz&limit=1&after={resp.headers["X-Next-Cursor"]}')
+    assert [r["id"] for r in resp.get_json()] == [2]
+    assert "X-Next-Cursor" not in resp.headers
+
+    # El índice sigue las escrituras de la API
+    client.put('/restaurants/3', json={"description": "Pizza japonesa"})
+    # BM25: la descripción más corta pesa más
+    assert [r["id"] for r in client.get('/restaurants/search?q=pizza').get_json()] == [3, 2]
+    client.delete('/restaurants/2')
+    assert [r["id"] for r in client.get('/restaurants/search?q=pizza').get_json()] == [3]
+
+    assert client.get('/restaurants/search?q=%22*').status_code == 400
+    assert client.get('/restaurants/search').status_code == 400
+
+def test_search_tolerates_typos_and_accents(client):
+    client.post('/restaurants', json={"name": "Café Bogotá", "city": "Medellín"})
+    client.post('/restaurants', json={"name": "Pizzería Napolitana", "description": "Horno de leña", "city": "Cali"})
+    client.post('/restaurants', json={"name": "Sushi", "city": "Pereira"})
+
+    assert [r["id"] for r in client.get('/restaurants/search?q=cafe').get_json()] == [1]
+    assert [r["id"] for r in client.get('/restaurants/search?q=CAFÉ medellin').get_json()] == [1]
+    # Con errores de escritura: coincidencia por trigramas
+    assert [r["id"] for r in client.get('/restaurants/search?q=pizeria').get_json()] == [2]
+    assert [r["id"] for r in client.get('/restaurants/search?q=napolitna lena').get_json()] == [2]
+    assert [r["id"] for r in client.get('/restaurants/search?q=bogta').get_json()] == [1]
+    # Si algo coincide como prefijo, no se buscan términos parecidos
+    client.post('/restaurants', json={"name": "Pizeria Roma", "city": "Cali"})
+    assert [r["id"] for r in client.get('/restaurants/search?q=pizeria').get_json()] == [4]
+    client.post('/restaurants', json={"name": "Pizzería Verona", "city": "Pasto"})
+    # Las aproximadas también se ordenan por relevancia
+    assert [r["id"] for r in client.get('/restaurants/search?q=pizzerai').get_json()] == [5, 2]
+    assert client.get('/restaurants/search?q=xyzzy').get_json() == []
+    assert client.get('/restaurants/search?q=sus').get_json()[0]["id"] == 3
+
+def test_search_reindex_command(client):
+    from app.models import Restaurant
+    with client.application.app_context():
+        db.session.add(Restaurant(name="Fuera de la API", city="Cali"))
+        db.session.commit()
+    assert client.get('/restaurants/search?q=api').get_json() == []
+    result = client.application.test_cli_runner().invoke(args=['restaurants', 'reindex'])
+    assert result.exit_code == 0
+    assert "Indexed 1 restaurants" in result.output
+    assert [r["name"] for r in client.get('/restaurants/search?q=api').get_json()] == ["Fuera de la API"]
+    assert [r["name"] for r in client.get('/restaurants/search?q=fuerra').get_json()] == ["Fuera de la API"]
@@ -0,0 +1,35 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import date, datetime
+
+from app import create_app, db
+from app.models import Reservation, Restaurant
+from app.schemas import ReservationSchema, RestaurantSchema
+from app.serializers import (
+    restaurant_serializer, serialize_reservation, serialize_reservation_instance,
+    serialize_restaurant_instance,
+)
+
+
+def test_serializers_match_schema_dump():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        db.create_all()
+        restaurant = Restaurant(name="Paridad", description=None, city="Cali")
+        db.session.add(restaurant)
+        db.session.flush()
+        reservation = Reservation(
+            restaurant_id=restaurant.id, date=date(2024, 7, 22), table_number=3,
+            created_at=datetime(2024, 7, 1, 12, 30, 15),
+        )
+        db.session.add(reservation)
+        db.session.commit()
+
+        assert serialize_restaurant_instance(restaurant) == RestaurantSchema().dump(restaurant)
+        assert serialize_reservation_instance(reservation) == ReservationSchema().dump(reservation)
+        row = db.session.execute(db.select(*Reservation.__table__.c)).one()
+        assert serialize_reservation(row) == ReservationSchema().dump(reservation)
+        assert restaurant_serializer(['id', 'city'])((1, 'Cali')) == {"id": 1, "city": "Cali"}
+        db.drop_all()
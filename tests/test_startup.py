@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import subprocess
+
+import pytest
+from app import create_app, db
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Módulos que un worker no debe importar al arrancar ni al servir lecturas
+LAZY_MODULES = ('flask_migrate', 'alembic', 'flask_marshmallow', 'marshmallow_sqlalchemy')
+
+
+def imported_modules(code):
+    """Run ``code`` in a fresh interpreter and return the modules ``-X importtime`` saw."""
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return {
+        line.rsplit('|', 1)[1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith('import time:') and '|' in line
+    }
+
+
+@pytest.fixture
+def client():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.drop_all()
+
+def test_read_path_skips_lazy_modules():
+    modules = imported_modules(
+        "from app import create_app, db\n"
+        "app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})\n"
+        "with app.app_context():\n"
+        "    db.create_all()\n"
+        "assert app.test_client().get('/reservations?limit=1').status_code == 200\n"
+    )
+    assert 'app.routes.reservations' in modules
+    for module in LAZY_MODULES:
+        assert module not in modules, f"{module} is imported at startup"
+
+def test_schemas_load_on_first_write(client):
+    assert 'app.schemas' not in imported_modules("import app")
+    resp = client.post('/restaurants', json={"name": "Perezoso"})
+    assert resp.status_code == 201
+
+def test_migrate_commands_load_on_demand(client):
+    result = client.application.test_cli_runner().invoke(args=['db', 'heads'])
+    assert result.exit_code == 0, result.output
+    assert '(head)' in result.output
+    assert 'migrate' in client.application.extensions